@@ -1,11 +1,14 @@
 """認証・ユーザー管理 API — Clerkとの連携"""
 import logging
 from fastapi import APIRouter, HTTPException, Request, Depends
+from fastapi.responses import Response
 from pydantic import BaseModel
 from typing import Optional
 
 from app.core.database import get_supabase_client
 from app.core.auth import verify_clerk_token
+from app.utils.http_cache import REVALIDATE, etag_matches, weak_etag
+from app.utils.json_codec import FastJSONResponse
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
@@ -34,10 +37,21 @@ async def _get_user_from_request(request: Request) -> dict:
 async def get_user_info(request: Request):
     user = await _get_user_from_request(request)
     db = get_supabase_client()
+    # profile_image を含むので、変更が無ければ updated_at だけ読んで 304 を返す
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match:
+        version = db.table("users").select("id,updated_at").eq("id", user["user_id"]).execute()
+        if not version.data:
+            raise HTTPException(status_code=404, detail="ユーザーが見つかりません")
+        etag = weak_etag(version.data[0]["id"], version.data[0]["updated_at"])
+        if etag_matches(if_none_match, etag):
+            return Response(status_code=304, headers={"ETag": etag, "Cache-Control": REVALIDATE})
+
     result = db.table("users").select("*").eq("id", user["user_id"]).single().execute()
     if not result.data:
         raise HTTPException(status_code=404, detail="ユーザーが見つかりません")
-    return result.data
+    etag = weak_etag(result.data["id"], result.data["updated_at"])
+    return FastJSONResponse(result.data, headers={"ETag": etag, "Cache-Control": REVALIDATE})
 
 
 @router.get("/user-profile")
@@ -1,37 +1,30 @@
 """ラボラトリー: マルチモデルAIチャット API"""
 import logging
 from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import StreamingResponse
 
+from app.config.settings import get_settings
 from app.core.auth import verify_clerk_token
 from app.core.database import get_supabase_client
-from app.config.settings import get_settings
-from app.clients.anthropic_client import AnthropicClient
-from app.clients.openai_client import OpenAIClient
-from app.clients.google_client import GoogleClient
-from app.models.chat import ChatRequest, ChatResponse
+from app.clients import get_ai_clients
+from app.models.chat import ChatCompareRequest, ChatRequest, ChatResponse, ChatStreamRequest
+from app.services.chat_service import ChatService
+from app.utils.json_codec import sse_event
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
 
-_clients: dict | None = None
+_chat_service: ChatService | None = None
 
 
-def _get_clients() -> dict:
-    global _clients
-    if _clients is None:
-        s = get_settings()
-        _clients = {}
-        if s.anthropic_api_key:
-            _clients["claude"] = AnthropicClient(s.anthropic_api_key)
-        if s.openai_api_key:
-            _clients["openai"] = OpenAIClient(s.openai_api_key)
-        if s.google_api_key:
-            _clients["gemini"] = GoogleClient(s.google_api_key)
-    return _clients
+def _get_chat_service() -> ChatService:
+    global _chat_service
+    if _chat_service is None:
+        _chat_service = ChatService()
+    return _chat_service
 
 
-@router.post("/chat", response_model=ChatResponse)
-async def chat(body: ChatRequest, request: Request):
+async def _require_admin(request: Request) -> dict:
     user = await verify_clerk_token(request)
     if not user or not user.get("user_id"):
         raise HTTPException(status_code=401, detail="認証が必要です")
@@ -41,8 +34,14 @@ async def chat(body: ChatRequest, request: Request):
     user_data = db.table("users").select("role").eq("id", user["user_id"]).single().execute()
     if not user_data.data or user_data.data.get("role") != "admin":
         raise HTTPException(status_code=403, detail="管理者権限が必要です")
+    return user
+
 
-    clients = _get_clients()
+@router.post("/chat", response_model=ChatResponse)
+async def chat(body: ChatRequest, request: Request):
+    await _require_admin(request)
+
+    clients = get_ai_clients()
     client = clients.get(body.api)
     if not client:
         raise HTTPException(status_code=400, detail=f"APIプロバイダー '{body.api}' が設定されていません")
@@ -62,3 +61,53 @@ async def chat(body: ChatRequest, request: Request):
     except Exception as e:
         logger.exception("Chat failed")
         return ChatResponse(success=False, error=str(e))
+
+
+@router.post("/chat/stream")
+async def chat_stream(body: ChatStreamRequest, request: Request):
+    """応答を delta イベントで逐次返す。履歴はサーバー側のセッションに残るので、送るのは新しいメッセージだけ"""
+    user = await _require_admin(request)
+    if body.api not in get_ai_clients():
+        raise HTTPException(status_code=400, detail=f"APIプロバイダー '{body.api}' が設定されていません")
+
+    svc = _get_chat_service()
+
+    async def event_stream():
+        async for event in svc.stream_chat(
+            user["user_id"], body.message, api=body.api, model=body.model, session_id=body.session_id,
+        ):
+            yield sse_event(event)
+
+    return StreamingResponse(event_stream(), media_type="text/event-stream")
+
+
+@router.post("/chat/compare")
+async def chat_compare(body: ChatCompareRequest, request: Request):
+    """同じメッセージと履歴を複数の provider / model に同時に送り、モデルごとの結果を終わった順に返す"""
+    await _require_admin(request)
+    max_targets = get_settings().chat_compare_max_targets
+    if not body.targets or len(body.targets) > max_targets:
+        raise HTTPException(status_code=400, detail=f"比較するモデルは1〜{max_targets}件で指定してください")
+    clients = get_ai_clients()
+    missing = sorted({t.api for t in body.targets} - clients.keys())
+    if missing:
+        raise HTTPException(status_code=400, detail=f"APIプロバイダー '{', '.join(missing)}' が設定されていません")
+
+    svc = _get_chat_service()
+    history = [{"role": m.role, "content": m.content} for m in body.history or []]
+
+    async def event_stream():
+        async for event in svc.compare_models(
+            body.message, [(t.api, t.model) for t in body.targets], history=history,
+        ):
+            yield sse_event(event)
+
+    return StreamingResponse(event_stream(), media_type="text/event-stream")
+
+
+@router.delete("/chat/sessions/{session_id}")
+async def delete_chat_session(session_id: str, request: Request):
+    user = await _require_admin(request)
+    if not _get_chat_service().sessions.delete(user["user_id"], session_id):
+        raise HTTPException(status_code=404, detail="セッションが見つかりません")
+    return {"success": True}
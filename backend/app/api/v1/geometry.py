@@ -1,28 +1,146 @@
-from fastapi import APIRouter, HTTPException
-from app.models.geometry import GeometryDrawRequest, CustomGeometryRequest, PythonExecuteRequest
-from app.services.geometry_service import GeometryService
+import base64
+
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import Response, StreamingResponse
+
+from app.core.auth import verify_clerk_token
+from app.models.geometry import (
+    RENDERERS,
+    GeometryDrawRequest,
+    CustomGeometryRequest,
+    CustomGeometryResponse,
+    PythonExecuteRequest,
+    GeometryBatchRequest,
+    GeometryBatchResult,
+    GeometryBatchResponse,
+)
+from app.services.render_pool import get_render_pool
+from app.utils.image_formats import negotiate_format, parse_image_specs, wants_raw_image
+from app.utils.json_codec import sse_event
 
 router = APIRouter()
-_geo_service = GeometryService()
+
+BATCH_MAX_JOBS = 100
+
+
+def _geo_service():
+    # matplotlib の読み込みとフォント設定は、最初に描画するまで遅らせる
+    from app.services.geometry_service import get_geometry_service
+
+    return get_geometry_service()
+
+
+async def _require_user(request: Request) -> dict:
+    user = await verify_clerk_token(request)
+    if not user or not user.get("user_id"):
+        raise HTTPException(status_code=401, detail="認証が必要です")
+    return user
+
+
+def _negotiate(request: Request, image_format: str, image_size: str, variants: list[str] | None) -> tuple[str, bool]:
+    """Acceptで画像を要求された場合は形式を決め直し、バイト列で返すかどうかを返す"""
+    accept = request.headers.get("accept")
+    raw = wants_raw_image(accept)
+    if raw:
+        image_format = negotiate_format(accept, ("svg", "webp", "png"), default=image_format)
+        if image_format is None:
+            raise HTTPException(status_code=406, detail="対応していない画像形式です")
+    try:
+        parse_image_specs(image_format, image_size, variants)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return image_format, raw
+
+
+def _image_response(result, raw: bool):
+    if raw:
+        return Response(content=base64.b64decode(result.image_base64), media_type=result.mime_type)
+    return result
 
 
 @router.post("/draw-geometry")
-async def draw_geometry(req: GeometryDrawRequest):
-    result = await _geo_service.generate_geometry(req.shape_type, req.parameters, req.labels)
+async def draw_geometry(req: GeometryDrawRequest, request: Request):
+    if req.renderer not in RENDERERS:
+        raise HTTPException(status_code=400, detail=f"未対応のレンダラーです: {req.renderer}")
+    image_format, raw = _negotiate(request, req.image_format, req.image_size, req.variants)
+    result = await _geo_service().generate_geometry(
+        req.shape_type, req.parameters, req.labels,
+        image_format=image_format, image_size=req.image_size, variants=req.variants,
+        renderer=req.renderer,
+    )
     if not result.success:
         raise HTTPException(status_code=500, detail=result.error or "図形生成に失敗しました")
-    return result
+    return _image_response(result, raw)
+
+
+@router.post("/draw-geometry/batch")
+async def draw_geometry_batch(req: GeometryBatchRequest, request: Request):
+    """複数の図形・コードを描画ワーカーで並列に描画する。stream=true なら完了順に SSE で返す"""
+    await _require_user(request)
+    if not req.jobs:
+        raise HTTPException(status_code=400, detail="ジョブが必要です")
+    if len(req.jobs) > BATCH_MAX_JOBS:
+        raise HTTPException(status_code=400, detail=f"一度に描画できるのは{BATCH_MAX_JOBS}件までです")
+    for i, job in enumerate(req.jobs):
+        if (job.shape_type is None) == (job.python_code is None):
+            raise HTTPException(status_code=400, detail=f"jobs[{i}]: shape_type と python_code のどちらか一方を指定してください")
+        if job.renderer not in RENDERERS:
+            raise HTTPException(status_code=400, detail=f"jobs[{i}]: 未対応のレンダラーです: {job.renderer}")
+        try:
+            parse_image_specs(job.image_format, job.image_size, job.variants)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=f"jobs[{i}]: {e}")
+
+    pool = get_render_pool()
+    jobs = [job.model_dump() for job in req.jobs]
+
+    if not req.stream:
+        results = await pool.render_many(jobs)
+        return GeometryBatchResponse(results=[_batch_result(i, r) for i, r in enumerate(results)])
+
+    async def event_stream():
+        succeeded = 0
+        async for i, r in pool.render_as_completed(jobs):
+            result = _batch_result(i, r)
+            succeeded += result.success
+            event = {"event": "result", "data": result.model_dump()}
+            yield sse_event(event)
+        event = {"event": "complete", "data": {"total": len(jobs), "succeeded": succeeded}}
+        yield sse_event(event)
+
+    return StreamingResponse(event_stream(), media_type="text/event-stream")
+
+
+def _batch_result(index: int, result: dict) -> GeometryBatchResult:
+    return GeometryBatchResult(
+        index=index,
+        success=result.get("success", False),
+        image_base64=result.get("image_base64"),
+        mime_type=result.get("mime_type", "image/png"),
+        variants=result.get("variants"),
+        error=result.get("error"),
+        precheck_errors=result.get("precheck_errors"),
+    )
 
 
 @router.post("/draw-custom-geometry")
-async def draw_custom_geometry(req: CustomGeometryRequest):
-    result = await _geo_service.generate_custom_geometry(req.python_code, req.problem_text)
+async def draw_custom_geometry(req: CustomGeometryRequest, request: Request):
+    image_format, raw = _negotiate(request, req.image_format, req.image_size, req.variants)
+    # 投稿されたコードはイベントループの外、タイムアウトで止められる描画ワーカーで実行する
+    rendered = await get_render_pool().render({
+        "python_code": req.python_code, "problem_text": req.problem_text,
+        "image_format": image_format, "image_size": req.image_size, "variants": req.variants,
+    })
+    result = CustomGeometryResponse(**{"problem_text": req.problem_text, **rendered})
+    if result.precheck_errors:
+        raise HTTPException(status_code=400, detail={"error": result.error, "precheck_errors": result.precheck_errors})
     if not result.success:
         raise HTTPException(status_code=500, detail=result.error or "カスタム図形生成に失敗しました")
-    return result
+    return _image_response(result, raw)
 
 
 @router.post("/execute-python")
-async def execute_python(req: PythonExecuteRequest):
-    result = await _geo_service.execute_python_code(req.python_code)
+async def execute_python(req: PythonExecuteRequest, request: Request):
+    await _require_user(request)
+    result = await _geo_service().execute_python_code(req.python_code)
     return result
@@ -1,14 +1,118 @@
-from fastapi import APIRouter, HTTPException
-from app.models.pdf import PDFGenerateRequest
-from app.services.pdf_service import PDFService
+import asyncio
+import logging
+import re
+from urllib.parse import quote
+
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import Response, StreamingResponse
+
+from app.core.auth import verify_clerk_token
+from app.core.database import get_supabase_client
+from app.models.pdf import PDFGenerateRequest, PDFBookletRequest
+from app.utils.http_cache import IMMUTABLE, etag_matches
 
 router = APIRouter()
-_pdf_service = PDFService()
+logger = logging.getLogger(__name__)
+
+BOOKLET_MAX_PROBLEMS = 100
+_STREAM_CHUNK_SIZE = 64 * 1024
+_PDF_KEY = re.compile(r"[0-9a-f]{64}")
+
+
+def _pdf_service():
+    # ReportLab の読み込みとフォント登録は、最初にPDFを作るまで遅らせる
+    from app.services.pdf_service import get_pdf_service
+
+    return get_pdf_service()
+
+
+async def _require_user(request: Request) -> dict:
+    user = await verify_clerk_token(request)
+    if not user or not user.get("user_id"):
+        raise HTTPException(status_code=401, detail="認証が必要です")
+    return user
+
+
+def _pdf_path(request: Request, key: str) -> str:
+    return request.app.url_path_for("get_pdf", key=key)
 
 
 @router.post("/generate-pdf")
-async def generate_pdf(req: PDFGenerateRequest):
-    result = await _pdf_service.generate_pdf(req.problem_text, req.image_base64, req.solution_text)
+async def generate_pdf(req: PDFGenerateRequest, request: Request):
+    """PDFを作って base64 で返す。同じPDFは pdf_url（内容のハッシュをキーにした GET）から条件付きで取り直せる"""
+    key = _pdf_service().pdf_cache_key(req.problem_text, req.image_base64, req.solution_text)
+    result = await _pdf_service().generate_pdf(req.problem_text, req.image_base64, req.solution_text, cache_key=key)
     if not result.success:
         raise HTTPException(status_code=500, detail=result.error or "PDF生成に失敗しました")
+    result.pdf_url = _pdf_path(request, key)
     return result
+
+
+@router.get("/pdf/{key}")
+async def get_pdf(key: str, request: Request):
+    """生成済みのPDFを内容のハッシュで返す。内容が変わればキーも変わるので、ETag が一致すれば 304"""
+    if not _PDF_KEY.fullmatch(key):
+        raise HTTPException(status_code=404, detail="PDFが見つかりません")
+    etag = f'"{key}"'
+    headers = {"ETag": etag, "Cache-Control": IMMUTABLE}
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    pdf_bytes = await asyncio.to_thread(_pdf_service().cache.get, key)
+    if pdf_bytes is None:
+        # キャッシュから消えていれば、POST で作り直してもらう
+        raise HTTPException(status_code=404, detail="PDFが見つかりません")
+    return Response(content=pdf_bytes, media_type="application/pdf", headers=headers)
+
+
+@router.post("/generate-pdf/booklet")
+async def generate_pdf_booklet(req: PDFBookletRequest, request: Request):
+    """複数問題をまとめた問題集PDFを application/pdf で直接返す"""
+    user = await _require_user(request)
+    ids = list(dict.fromkeys(req.problem_ids))
+    if not ids:
+        raise HTTPException(status_code=400, detail="問題IDが必要です")
+    if len(ids) > BOOKLET_MAX_PROBLEMS:
+        raise HTTPException(status_code=400, detail=f"一度に出力できるのは{BOOKLET_MAX_PROBLEMS}問までです")
+
+    db = get_supabase_client()
+    result = (
+        db.table("problems")
+        .select("id,content,solution,image_base64")
+        .in_("id", ids)
+        .eq("user_id", user["user_id"])
+        .execute()
+    )
+    by_id = {p["id"]: p for p in result.data or []}
+    missing = [i for i in ids if i not in by_id]
+    if missing:
+        raise HTTPException(status_code=404, detail=f"問題が見つかりません: {missing}")
+
+    problems = [by_id[i] for i in ids]
+    key = _pdf_service().booklet_cache_key(problems, req.title, req.include_solutions)
+
+    try:
+        pdf_bytes = await _pdf_service().generate_booklet(
+            problems, title=req.title, include_solutions=req.include_solutions, cache_key=key,
+        )
+    except TimeoutError:
+        logger.error("Booklet PDF generation timed out")
+        raise HTTPException(status_code=504, detail="PDF生成がタイムアウトしました")
+    except Exception as e:
+        logger.exception("Booklet PDF generation failed")
+        raise HTTPException(status_code=500, detail=f"PDF生成に失敗しました: {e}")
+
+    def iter_chunks():
+        for start in range(0, len(pdf_bytes), _STREAM_CHUNK_SIZE):
+            yield pdf_bytes[start:start + _STREAM_CHUNK_SIZE]
+
+    filename = quote(f"{req.title}.pdf")
+    return StreamingResponse(
+        iter_chunks(),
+        media_type="application/pdf",
+        headers={
+            "Content-Length": str(len(pdf_bytes)),
+            # 同じ問題集は GET /pdf/{key} から条件付きで取り直せる
+            "Content-Location": _pdf_path(request, key),
+            "Content-Disposition": f"attachment; filename*=UTF-8''{filename}",
+        },
+    )
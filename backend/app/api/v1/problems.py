@@ -1,13 +1,21 @@
 """問題 CRUD・生成・検索 API"""
+import asyncio
+import base64
 import json
 import logging
 from fastapi import APIRouter, HTTPException, Request
-from fastapi.responses import StreamingResponse
+from fastapi.responses import Response, StreamingResponse
 from pydantic import BaseModel
 from typing import Optional
 
+from app.config.settings import get_settings
 from app.core.auth import verify_clerk_token
+from app.services.import_service import ImportService
 from app.services.problem_service import ProblemService
+from app.utils.http_cache import REVALIDATE, etag_matches, weak_etag
+from app.utils.image_formats import SIZE_TIERS, derive_raster, negotiate_format
+from app.utils.json_codec import FastJSONResponse, sse_event
+from app.utils.uploads import read_upload, read_upload_form, upload_files
 from app.models.problem import (
     ProblemGenerateRequest,
     FiveStageRequest,
@@ -19,6 +27,7 @@ router = APIRouter()
 logger = logging.getLogger(__name__)
 
 _problem_service: ProblemService | None = None
+_import_service: ImportService | None = None
 
 
 def _get_problem_service() -> ProblemService:
@@ -28,6 +37,13 @@ def _get_problem_service() -> ProblemService:
     return _problem_service
 
 
+def _get_import_service() -> ImportService:
+    global _import_service
+    if _import_service is None:
+        _import_service = ImportService()
+    return _import_service
+
+
 async def _require_user(request: Request) -> dict:
     user = await verify_clerk_token(request)
     if not user or not user.get("user_id"):
@@ -38,21 +54,70 @@ async def _require_user(request: Request) -> dict:
 # ── CRUD ──
 
 
+def _problems_etag(rows: list[dict]) -> str:
+    """問題の id と updated_at の組から一覧の ETag を作る（並び順には依存しない）"""
+    return weak_etag(*sorted(f"{r['id']}:{r['updated_at']}" for r in rows))
+
+
 @router.get("/problems")
 async def list_problems(request: Request):
     user = await _require_user(request)
     svc = _get_problem_service()
-    return await svc.get_user_problems(user["user_id"])
+    # 変更が無ければ id と updated_at だけ読んで 304 を返す
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match:
+        etag = _problems_etag(await svc.get_user_problem_versions(user["user_id"]))
+        if etag_matches(if_none_match, etag):
+            return Response(status_code=304, headers={"ETag": etag, "Cache-Control": REVALIDATE})
+
+    problems = await svc.get_user_problems(user["user_id"])
+    # 一覧は会話履歴や図を含んで大きいため、jsonable_encoder を通さず直接エンコードする
+    return FastJSONResponse(problems, headers={"ETag": _problems_etag(problems), "Cache-Control": REVALIDATE})
 
 
 @router.get("/problems/{problem_id}")
 async def get_problem(problem_id: int, request: Request):
     user = await _require_user(request)
     svc = _get_problem_service()
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match:
+        version = await svc.get_problem_version(problem_id, user["user_id"])
+        if not version:
+            raise HTTPException(status_code=404, detail="問題が見つかりません")
+        etag = weak_etag(version["id"], version["updated_at"])
+        if etag_matches(if_none_match, etag):
+            return Response(status_code=304, headers={"ETag": etag, "Cache-Control": REVALIDATE})
+
     problem = await svc.get_problem(problem_id, user["user_id"])
     if not problem:
         raise HTTPException(status_code=404, detail="問題が見つかりません")
-    return problem
+    etag = weak_etag(problem["id"], problem["updated_at"])
+    return FastJSONResponse(problem, headers={"ETag": etag, "Cache-Control": REVALIDATE})
+
+
+@router.get("/problems/{problem_id}/image")
+async def get_problem_image(problem_id: int, request: Request, size: str = "thumb", format: str | None = None):
+    """問題の図を指定サイズで返す。形式は format 指定がなければ Accept から選ぶ（WebP優先）"""
+    user = await _require_user(request)
+    if size not in SIZE_TIERS:
+        raise HTTPException(status_code=400, detail=f"未対応の画像サイズです: {size}")
+    image_format = format or negotiate_format(request.headers.get("accept"), ("webp", "png"), default="webp")
+    if image_format not in ("webp", "png"):
+        raise HTTPException(status_code=406, detail="対応していない画像形式です")
+
+    svc = _get_problem_service()
+    problem = await svc.get_problem_image(problem_id, user["user_id"])
+    if not problem or not problem.get("image_base64"):
+        raise HTTPException(status_code=404, detail="図が見つかりません")
+
+    etag = weak_etag(problem_id, problem.get("updated_at"), image_format, size)
+    headers = {"ETag": etag, "Cache-Control": REVALIDATE, "Vary": "Accept"}
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+
+    png = base64.b64decode(problem["image_base64"])
+    data = await asyncio.to_thread(derive_raster, png, image_format, size)
+    return Response(content=data, media_type=f"image/{image_format}", headers=headers)
 
 
 @router.put("/problems/{problem_id}")
@@ -63,7 +128,7 @@ async def update_problem(problem_id: int, request: Request):
     result = await svc.update_problem(problem_id, user["user_id"], body)
     if not result:
         raise HTTPException(status_code=404, detail="問題が見つかりません")
-    return result
+    return FastJSONResponse(result)
 
 
 @router.delete("/problems/{problem_id}")
@@ -84,7 +149,7 @@ async def update_check_info(problem_id: int, request: Request):
     result = await svc.update_check_info(problem_id, user["user_id"], body)
     if not result:
         raise HTTPException(status_code=404, detail="問題が見つかりません")
-    return result
+    return FastJSONResponse(result)
 
 
 # ── 検索 ──
@@ -94,7 +159,7 @@ async def update_check_info(problem_id: int, request: Request):
 async def search_problems(body: ProblemSearchRequest, request: Request):
     user = await _require_user(request)
     svc = _get_problem_service()
-    return await svc.search_problems(user["user_id"], body.model_dump(exclude_none=True))
+    return FastJSONResponse(await svc.search_problems(user["user_id"], body.model_dump(exclude_none=True)))
 
 
 # ── 生成 ──
@@ -134,7 +199,7 @@ async def generate_five_stage_sse(body: FiveStageRequest, request: Request):
             units=body.units,
             excluded_units=body.excluded_units,
         ):
-            yield f"data: {json.dumps(event, ensure_ascii=False)}\n\n"
+            yield sse_event(event)
 
     return StreamingResponse(event_stream(), media_type="text/event-stream")
 
@@ -142,7 +207,7 @@ async def generate_five_stage_sse(body: FiveStageRequest, request: Request):
 @router.post("/generate-three-problems-sse")
 async def generate_three_problems_sse(request: Request):
     user = await _require_user(request)
-    form = await request.form()
+    form = await read_upload_form(request)
     excluded_units_raw = form.get("excluded_units", "[]")
     try:
         excluded_units = json.loads(excluded_units_raw) if isinstance(excluded_units_raw, str) else []
@@ -152,32 +217,58 @@ async def generate_three_problems_sse(request: Request):
     preferred_api = form.get("preferred_api")
     preferred_model = form.get("preferred_model")
 
-    # ファイル処理
-    import base64
-    problem_files = []
-    solution_files = []
-    for key in form:
-        if key.startswith("problem_file"):
-            f = form[key]
-            data = await f.read()
-            problem_files.append(base64.b64encode(data).decode())
-        elif key.startswith("solution_file"):
-            f = form[key]
-            data = await f.read()
-            solution_files.append(base64.b64encode(data).decode())
+    # ファイルは一時ファイルのまま渡し、抽出時に1件ずつ読み出す
+    problem_files = upload_files(form, "problem_file")
+    solution_files = upload_files(form, "solution_file")
 
     svc = _get_problem_service()
 
     async def event_stream():
-        async for event in svc.generate_three_problems_sse(
-            user["user_id"],
-            problem_files=problem_files or None,
-            solution_files=solution_files or None,
-            excluded_units=excluded_units or None,
-            api=preferred_api,
-            model=preferred_model,
-        ):
-            yield f"data: {json.dumps(event, ensure_ascii=False)}\n\n"
+        try:
+            async for event in svc.generate_three_problems_sse(
+                user["user_id"],
+                problem_files=problem_files or None,
+                solution_files=solution_files or None,
+                excluded_units=excluded_units or None,
+                api=preferred_api,
+                model=preferred_model,
+            ):
+                yield sse_event(event)
+        finally:
+            await form.close()
+
+    return StreamingResponse(event_stream(), media_type="text/event-stream")
+
+
+# ── 過去問の一括取り込み ──
+
+
+@router.post("/problems/import-sse")
+async def import_problems_sse(request: Request):
+    """複数のPDF（file_0, file_1, ...）を書き起こして問題として保存する。year / exam_session は出典として付ける"""
+    user = await _require_user(request)
+    s = get_settings()
+    form = await read_upload_form(request, max_files=s.import_max_files, max_total_bytes=s.import_max_total_bytes)
+    files = upload_files(form, "file")
+    if not files:
+        await form.close()
+        raise HTTPException(status_code=400, detail="ファイルが必要です")
+
+    svc = _get_import_service()
+
+    async def event_stream():
+        try:
+            async for event in svc.import_exam_archive_sse(
+                user["user_id"],
+                files,
+                year=str(form.get("year") or ""),
+                exam_session=str(form.get("exam_session") or ""),
+                subject=str(form.get("subject") or "math"),
+                model=form.get("preferred_model") or None,
+            ):
+                yield sse_event(event)
+        finally:
+            await form.close()
 
     return StreamingResponse(event_stream(), media_type="text/event-stream")
 
@@ -207,31 +298,27 @@ async def preview_pdf_content(request: Request):
     svc = _get_problem_service()
     await svc.increment_preview_count(user["user_id"])
 
-    form = await request.form()
-    import base64
-    files = []
-    for key in form:
-        if key.startswith("file"):
-            f = form[key]
-            data = await f.read()
-            files.append(base64.b64encode(data).decode())
-
-    if not files:
-        raise HTTPException(status_code=400, detail="ファイルが必要です")
-
-    google_client = svc.clients.get("gemini")
-    if not google_client:
-        raise HTTPException(status_code=500, detail="Gemini APIが設定されていません")
-
-    results = []
-    for f_data in files:
-        try:
-            text = await google_client.generate_with_pdf(
-                "この数学の問題を正確にテキストとして書き起こしてください。数式はLaTeX形式で表現してください。",
-                f_data,
-            )
-            results.append(text)
-        except Exception as e:
-            results.append(f"抽出エラー: {e}")
+    form = await read_upload_form(request)
+    try:
+        files = upload_files(form, "file")
+        if not files:
+            raise HTTPException(status_code=400, detail="ファイルが必要です")
+
+        google_client = svc.clients.get("gemini")
+        if not google_client:
+            raise HTTPException(status_code=500, detail="Gemini APIが設定されていません")
+
+        results = []
+        for f in files:
+            try:
+                text = await google_client.generate_with_pdf(
+                    "この数学の問題を正確にテキストとして書き起こしてください。数式はLaTeX形式で表現してください。",
+                    await read_upload(f),
+                )
+                results.append(text)
+            except Exception as e:
+                results.append(f"抽出エラー: {e}")
+    finally:
+        await form.close()
 
     return {"texts": results}
@@ -0,0 +1,53 @@
+"""AIプロバイダーのクライアント
+
+各SDKの読み込みは重いため、モジュールは最初にクライアントを作るときに読み込む。
+"""
+import logging
+from functools import lru_cache
+from typing import Any
+
+from app.config.settings import get_settings
+
+logger = logging.getLogger(__name__)
+
+
+@lru_cache
+def get_ai_clients() -> dict[str, Any]:
+    """APIキーが設定されているプロバイダーのクライアントを返す（キーはプロバイダー名）"""
+    s = get_settings()
+    if s.fake_llm_enabled:
+        return _fake_clients()
+    clients: dict[str, Any] = {}
+    if s.anthropic_api_key:
+        from app.clients.anthropic_client import AnthropicClient
+
+        clients["claude"] = AnthropicClient(s.anthropic_api_key)
+    if s.openai_api_key:
+        from app.clients.openai_client import OpenAIClient
+
+        clients["openai"] = OpenAIClient(s.openai_api_key)
+    if s.google_api_key:
+        from app.clients.google_client import GoogleClient
+
+        clients["gemini"] = GoogleClient(s.google_api_key)
+    return clients
+
+
+def _fake_clients() -> dict[str, Any]:
+    """全プロバイダーを記録済みの出力を返す偽クライアントに置き換える（ベンチマーク・負荷試験用）"""
+    from app.clients.fake_client import FakeLLMClient
+
+    s = get_settings()
+    logger.warning("FAKE_LLM_ENABLED is set: LLM calls return recorded outputs")
+    return {
+        name: FakeLLMClient(
+            recording_path=s.fake_llm_recording,
+            latency_ms=s.fake_llm_latency_ms,
+            latency_jitter_ms=s.fake_llm_latency_jitter_ms,
+            tokens_per_second=s.fake_llm_tokens_per_second,
+            error_rate=s.fake_llm_error_rate,
+            seed=s.fake_llm_seed,
+            provider=f"fake-{name}",
+        )
+        for name in ("claude", "openai", "gemini")
+    }
@@ -1,9 +1,12 @@
 """Anthropic Claude API client wrapper."""
 
 import logging
+from typing import AsyncIterator
 
 import anthropic
 
+from app.core.tracing import span
+
 logger = logging.getLogger(__name__)
 
 
@@ -13,6 +16,18 @@ class AnthropicClient:
     def __init__(self, api_key: str) -> None:
         self.client = anthropic.AsyncAnthropic(api_key=api_key)
 
+    async def _create(self, **kwargs):
+        """Call ``messages.create`` inside a tracing span that records token usage."""
+        with span("anthropic.messages.create", "llm", provider="anthropic", model=kwargs.get("model")) as s:
+            response = await self.client.messages.create(**kwargs)
+            usage = response.usage
+            s.set(
+                input_tokens=usage.input_tokens,
+                output_tokens=usage.output_tokens,
+                cached_tokens=getattr(usage, "cache_read_input_tokens", None),
+            )
+            return response
+
     async def generate_content(
         self,
         prompt: str,
@@ -38,7 +53,7 @@ class AnthropicClient:
             if system:
                 kwargs["system"] = system
 
-            response = await self.client.messages.create(**kwargs)
+            response = await self._create(**kwargs)
             return response.content[0].text
         except Exception:
             logger.exception("Anthropic generate_content failed")
@@ -61,29 +76,76 @@ class AnthropicClient:
             Generated text, or empty string on failure.
         """
         try:
-            formatted = [
-                {"role": m["role"], "content": m["content"]}
-                for m in messages
-                if m.get("role") in ("user", "assistant")
-            ]
-            if not formatted:
+            kwargs = self._history_kwargs(messages, model, system)
+            if kwargs is None:
                 logger.warning("No valid messages provided to generate_with_history")
                 return ""
 
-            kwargs: dict = {
-                "model": model,
-                "max_tokens": 8192,
-                "messages": formatted,
-            }
-            if system:
-                kwargs["system"] = system
-
-            response = await self.client.messages.create(**kwargs)
+            response = await self._create(**kwargs)
             return response.content[0].text
         except Exception:
             logger.exception("Anthropic generate_with_history failed")
             return ""
 
+    async def stream_with_history(
+        self,
+        messages: list[dict],
+        model: str = "claude-sonnet-4-20250514",
+        system: str = "",
+    ) -> AsyncIterator[str]:
+        """Stream text deltas for a multi-turn conversation.
+
+        Args:
+            messages: List of dicts with ``role`` (user/assistant) and ``content`` keys.
+            model: Anthropic model ID.
+            system: Optional system instruction.
+
+        Yields:
+            Text deltas as they arrive.
+
+        Raises:
+            Exception: The provider error, after logging it. A failure can come after some deltas
+                were already yielded, so callers must not treat the text so far as a full reply.
+        """
+        kwargs = self._history_kwargs(messages, model, system)
+        if kwargs is None:
+            logger.warning("No valid messages provided to stream_with_history")
+            return
+        try:
+            with span("anthropic.messages.stream", "llm", provider="anthropic", model=model) as s:
+                async with self.client.messages.stream(**kwargs) as stream:
+                    async for text in stream.text_stream:
+                        s.mark_first_token()
+                        yield text
+                    usage = (await stream.get_final_message()).usage
+                    s.set(
+                        input_tokens=usage.input_tokens,
+                        output_tokens=usage.output_tokens,
+                        cached_tokens=getattr(usage, "cache_read_input_tokens", None),
+                    )
+        except Exception:
+            logger.exception("Anthropic stream_with_history failed")
+            raise
+
+    @staticmethod
+    def _history_kwargs(messages: list[dict], model: str, system: str) -> dict | None:
+        """Build ``messages.create`` arguments for a conversation (None if it has no valid messages)."""
+        formatted = [
+            {"role": m["role"], "content": m["content"]}
+            for m in messages
+            if m.get("role") in ("user", "assistant")
+        ]
+        if not formatted:
+            return None
+        kwargs: dict = {
+            "model": model,
+            "max_tokens": 8192,
+            "messages": formatted,
+        }
+        if system:
+            kwargs["system"] = system
+        return kwargs
+
     async def generate_multimodal(
         self,
         prompt: str,
@@ -101,7 +163,7 @@ class AnthropicClient:
             Generated text, or empty string on failure.
         """
         try:
-            response = await self.client.messages.create(
+            response = await self._create(
                 model=model,
                 max_tokens=8192,
                 messages=[
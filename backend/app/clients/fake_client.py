@@ -0,0 +1,159 @@
+"""Deterministic fake LLM client for benchmarks and load tests.
+
+Implements the same interface as the real provider clients, but replays
+recorded outputs instead of calling an API. Latency, token rate and failures
+are simulated. Each one is drawn from a RNG seeded with the request content,
+so the same request always gets the same response, delay and outcome, no
+matter how many requests run concurrently.
+
+Recording format (JSON)::
+
+    {
+      "stages": ["<stage 1 output>", ..., "<stage 5 output>"],
+      "single": "<full response for generate_content>",
+      "rules": [{"contains": "<substring of the last user message>", "response": "..."}],
+      "default": "<fallback response>"
+    }
+
+``generate_with_history`` and ``stream_with_history`` first check ``rules`` against the last user
+message. Otherwise it replays ``stages`` by the number of user turns in the
+history, wrapping around after the last stage.
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import random
+from typing import AsyncIterator
+
+from app.core.tracing import span
+from app.utils.tokens import estimate_tokens
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_RECORDING = os.path.join(os.path.dirname(__file__), "recordings", "default.json")
+# Characters per streamed delta (roughly what providers send per event)
+STREAM_CHUNK_CHARS = 16
+
+
+class FakeLLMClient:
+    """Replays recorded LLM outputs with simulated latency and failures."""
+
+    def __init__(
+        self,
+        recording_path: str = "",
+        latency_ms: float = 800.0,
+        latency_jitter_ms: float = 200.0,
+        tokens_per_second: float = 80.0,
+        error_rate: float = 0.0,
+        seed: int = 0,
+        provider: str = "fake",
+    ) -> None:
+        with open(recording_path or DEFAULT_RECORDING, encoding="utf-8") as f:
+            self.recording: dict = json.load(f)
+        self.latency_ms = latency_ms
+        self.latency_jitter_ms = latency_jitter_ms
+        self.tokens_per_second = tokens_per_second
+        self.error_rate = error_rate
+        self.seed = seed
+        self.provider = provider
+
+    def _respond(self, messages: list[dict]) -> str:
+        last = next((m["content"] for m in reversed(messages) if m.get("role") == "user"), "")
+        for rule in self.recording.get("rules", []):
+            if rule["contains"] in last:
+                return rule["response"]
+        stages = self.recording.get("stages") or []
+        if not stages:
+            return self.recording.get("default", "")
+        turns = sum(1 for m in messages if m.get("role") == "user")
+        return stages[(turns - 1) % len(stages)]
+
+    def _draw(self, messages: list[dict], model: str) -> tuple[str, float, float, bool]:
+        """Draw the simulated behaviour of one request from an RNG seeded with its content.
+
+        Returns:
+            (prompt text, seconds to first token, tokens per second, whether it fails).
+        """
+        prompt = "\n".join(str(m.get("content", "")) for m in messages)
+        digest = hashlib.sha256(f"{self.seed}:{model}:{prompt}".encode()).digest()
+        rng = random.Random(digest)
+        first_token_s = max(0.0, rng.gauss(self.latency_ms, self.latency_jitter_ms)) / 1000
+        rate = max(1.0, rng.gauss(self.tokens_per_second, self.tokens_per_second * 0.1))
+        failed = rng.random() < self.error_rate
+        return prompt, first_token_s, rate, failed
+
+    async def _complete(self, messages: list[dict], model: str, response: str) -> str:
+        """Wait as long as a provider would take to return ``response``.
+
+        Args:
+            messages: Conversation sent to the model (used for the RNG seed and input tokens).
+            model: Model ID reported in the tracing span.
+            response: Recorded output to return.
+
+        Returns:
+            The response, or empty string when a simulated failure is drawn.
+        """
+        prompt, first_token_s, rate, failed = self._draw(messages, model)
+        output_tokens = estimate_tokens(response)
+
+        with span(f"{self.provider}.generate", "llm", provider=self.provider, model=model) as s:
+            s.set(input_tokens=estimate_tokens(prompt))
+            await asyncio.sleep(first_token_s)
+            if failed:
+                # Real clients log the provider error and return an empty string
+                logger.warning("Fake LLM simulated a provider failure")
+                s.set(error="simulated")
+                return ""
+            s.mark_first_token()
+            await asyncio.sleep(output_tokens / rate)
+            s.set(output_tokens=output_tokens, cached_tokens=0)
+        return response
+
+    async def generate_content(self, prompt: str, model: str = "fake-model", system: str = "") -> str:
+        """Return the recorded single-shot response."""
+        messages = [{"role": "user", "content": prompt}]
+        return await self._complete(messages, model, self.recording.get("single") or self._respond(messages))
+
+    async def generate_with_history(self, messages: list[dict], model: str = "fake-model", system: str = "") -> str:
+        """Return the recorded response for this point of the conversation."""
+        return await self._complete(messages, model, self._respond(messages))
+
+    async def stream_with_history(
+        self, messages: list[dict], model: str = "fake-model", system: str = ""
+    ) -> AsyncIterator[str]:
+        """Stream the recorded response in small deltas at the simulated token rate.
+
+        A simulated failure streams the first half of the response and then raises, like a
+        provider connection dropping mid-reply.
+        """
+        response = self._respond(messages)
+        prompt, first_token_s, rate, failed = self._draw(messages, model)
+        cut = len(response) // 2 if failed else len(response)
+
+        with span(f"{self.provider}.stream", "llm", provider=self.provider, model=model) as s:
+            s.set(input_tokens=estimate_tokens(prompt))
+            await asyncio.sleep(first_token_s)
+            s.mark_first_token()
+            for i in range(0, cut, STREAM_CHUNK_CHARS):
+                chunk = response[i:min(i + STREAM_CHUNK_CHARS, cut)]
+                if i:
+                    await asyncio.sleep(estimate_tokens(chunk) / rate)
+                yield chunk
+            if failed:
+                logger.warning("Fake LLM simulated a provider failure")
+                s.set(error="simulated")
+                raise RuntimeError("Fake LLM simulated a provider failure")
+            s.set(output_tokens=estimate_tokens(response), cached_tokens=0)
+
+    async def generate_multimodal(self, prompt: str, image_base64: str, model: str = "fake-model") -> str:
+        """Return the recorded response for an image prompt."""
+        messages = [{"role": "user", "content": prompt}]
+        return await self._complete(messages, model, self._respond(messages))
+
+    async def generate_with_pdf(self, prompt: str, pdf_data: bytes | str, model: str = "fake-model") -> str:
+        """Return the recorded response for a PDF prompt."""
+        messages = [{"role": "user", "content": prompt}]
+        return await self._complete(messages, model, self._respond(messages))
@@ -2,10 +2,13 @@
 
 import base64
 import logging
+from typing import AsyncIterator
 
 from google import genai
 from google.genai import types
 
+from app.core.tracing import span
+
 logger = logging.getLogger(__name__)
 
 
@@ -15,6 +18,19 @@ class GoogleClient:
     def __init__(self, api_key: str) -> None:
         self.client = genai.Client(api_key=api_key)
 
+    async def _generate(self, **kwargs):
+        """Call ``models.generate_content`` inside a tracing span that records token usage."""
+        with span("google.models.generate_content", "llm", provider="google", model=kwargs.get("model")) as s:
+            response = await self.client.aio.models.generate_content(**kwargs)
+            usage = response.usage_metadata
+            if usage is not None:
+                s.set(
+                    input_tokens=usage.prompt_token_count,
+                    output_tokens=usage.candidates_token_count,
+                    cached_tokens=usage.cached_content_token_count,
+                )
+            return response
+
     async def generate_content(
         self,
         prompt: str,
@@ -36,7 +52,7 @@ class GoogleClient:
             if system:
                 config.system_instruction = system
 
-            response = await self.client.aio.models.generate_content(
+            response = await self._generate(
                 model=model,
                 contents=prompt,
                 config=config,
@@ -63,18 +79,7 @@ class GoogleClient:
             Generated text, or empty string on failure.
         """
         try:
-            contents: list[types.Content] = []
-            for m in messages:
-                role = m.get("role", "user")
-                # Gemini uses "model" instead of "assistant"
-                gemini_role = "model" if role == "assistant" else "user"
-                contents.append(
-                    types.Content(
-                        role=gemini_role,
-                        parts=[types.Part.from_text(text=m["content"])],
-                    )
-                )
-
+            contents = self._history_contents(messages)
             if not contents:
                 logger.warning("No valid messages provided to generate_with_history")
                 return ""
@@ -83,7 +88,7 @@ class GoogleClient:
             if system:
                 config.system_instruction = system
 
-            response = await self.client.aio.models.generate_content(
+            response = await self._generate(
                 model=model,
                 contents=contents,
                 config=config,
@@ -93,6 +98,74 @@ class GoogleClient:
             logger.exception("Google generate_with_history failed")
             return ""
 
+    async def stream_with_history(
+        self,
+        messages: list[dict],
+        model: str = "gemini-2.5-flash",
+        system: str = "",
+    ) -> AsyncIterator[str]:
+        """Stream text deltas for a multi-turn conversation.
+
+        Args:
+            messages: List of dicts with ``role`` (user/assistant) and ``content`` keys.
+            model: Gemini model ID.
+            system: Optional system instruction.
+
+        Yields:
+            Text deltas as they arrive.
+
+        Raises:
+            Exception: The provider error, after logging it. A failure can come after some deltas
+                were already yielded, so callers must not treat the text so far as a full reply.
+        """
+        contents = self._history_contents(messages)
+        if not contents:
+            logger.warning("No valid messages provided to stream_with_history")
+            return
+        try:
+            config = types.GenerateContentConfig()
+            if system:
+                config.system_instruction = system
+
+            with span("google.models.generate_content_stream", "llm", provider="google", model=model) as s:
+                stream = await self.client.aio.models.generate_content_stream(
+                    model=model,
+                    contents=contents,
+                    config=config,
+                )
+                usage = None
+                async for chunk in stream:
+                    if chunk.text:
+                        s.mark_first_token()
+                        yield chunk.text
+                    # usage_metadata is cumulative; the last chunk has the totals
+                    usage = chunk.usage_metadata or usage
+                if usage is not None:
+                    s.set(
+                        input_tokens=usage.prompt_token_count,
+                        output_tokens=usage.candidates_token_count,
+                        cached_tokens=usage.cached_content_token_count,
+                    )
+        except Exception:
+            logger.exception("Google stream_with_history failed")
+            raise
+
+    @staticmethod
+    def _history_contents(messages: list[dict]) -> list[types.Content]:
+        """Convert a conversation to Gemini contents."""
+        contents: list[types.Content] = []
+        for m in messages:
+            role = m.get("role", "user")
+            # Gemini uses "model" instead of "assistant"
+            gemini_role = "model" if role == "assistant" else "user"
+            contents.append(
+                types.Content(
+                    role=gemini_role,
+                    parts=[types.Part.from_text(text=m["content"])],
+                )
+            )
+        return contents
+
     async def generate_multimodal(
         self,
         prompt: str,
@@ -117,7 +190,7 @@ class GoogleClient:
             )
             text_part = types.Part.from_text(text=prompt)
 
-            response = await self.client.aio.models.generate_content(
+            response = await self._generate(
                 model=model,
                 contents=[image_part, text_part],
             )
@@ -129,28 +202,29 @@ class GoogleClient:
     async def generate_with_pdf(
         self,
         prompt: str,
-        pdf_base64: str,
+        pdf_data: bytes | str,
         model: str = "gemini-2.5-flash",
     ) -> str:
         """Generate text from a PDF document + text prompt.
 
         Args:
             prompt: Text prompt describing what to do with the PDF.
-            pdf_base64: Base64-encoded PDF data.
+            pdf_data: Raw PDF bytes (passed through without copying), or
+                base64-encoded PDF data.
             model: Gemini model ID.
 
         Returns:
             Generated text, or empty string on failure.
         """
         try:
-            pdf_bytes = base64.b64decode(pdf_base64)
+            pdf_bytes = base64.b64decode(pdf_data) if isinstance(pdf_data, str) else pdf_data
             pdf_part = types.Part.from_bytes(
                 data=pdf_bytes,
                 mime_type="application/pdf",
             )
             text_part = types.Part.from_text(text=prompt)
 
-            response = await self.client.aio.models.generate_content(
+            response = await self._generate(
                 model=model,
                 contents=[pdf_part, text_part],
             )
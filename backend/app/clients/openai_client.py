@@ -1,9 +1,12 @@
 """OpenAI API client wrapper."""
 
 import logging
+from typing import AsyncIterator
 
 import openai
 
+from app.core.tracing import span
+
 logger = logging.getLogger(__name__)
 
 _MODEL_MAP: dict[str, str] = {
@@ -18,6 +21,20 @@ class OpenAIClient:
     def __init__(self, api_key: str) -> None:
         self.client = openai.AsyncOpenAI(api_key=api_key)
 
+    async def _create(self, **kwargs):
+        """Call ``chat.completions.create`` inside a tracing span that records token usage."""
+        with span("openai.chat.completions.create", "llm", provider="openai", model=kwargs.get("model")) as s:
+            response = await self.client.chat.completions.create(**kwargs)
+            usage = response.usage
+            if usage is not None:
+                details = getattr(usage, "prompt_tokens_details", None)
+                s.set(
+                    input_tokens=usage.prompt_tokens,
+                    output_tokens=usage.completion_tokens,
+                    cached_tokens=getattr(details, "cached_tokens", None),
+                )
+            return response
+
     def _map_model(self, model: str) -> str:
         """Map friendly model names to actual OpenAI model IDs.
 
@@ -52,7 +69,7 @@ class OpenAIClient:
                 messages.append({"role": "system", "content": system})
             messages.append({"role": "user", "content": prompt})
 
-            response = await self.client.chat.completions.create(
+            response = await self._create(
                 model=resolved_model,
                 max_tokens=5000,
                 messages=messages,
@@ -80,19 +97,12 @@ class OpenAIClient:
         """
         try:
             resolved_model = self._map_model(model)
-            formatted: list[dict] = []
-            if system:
-                formatted.append({"role": "system", "content": system})
-            for m in messages:
-                role = m.get("role", "user")
-                if role in ("user", "assistant", "system"):
-                    formatted.append({"role": role, "content": m["content"]})
-
-            if not any(m["role"] != "system" for m in formatted):
+            formatted = self._format_history(messages, system)
+            if formatted is None:
                 logger.warning("No valid messages provided to generate_with_history")
                 return ""
 
-            response = await self.client.chat.completions.create(
+            response = await self._create(
                 model=resolved_model,
                 max_tokens=5000,
                 messages=formatted,
@@ -102,6 +112,70 @@ class OpenAIClient:
             logger.exception("OpenAI generate_with_history failed")
             return ""
 
+    async def stream_with_history(
+        self,
+        messages: list[dict],
+        model: str = "gpt-4o",
+        system: str = "",
+    ) -> AsyncIterator[str]:
+        """Stream text deltas for a multi-turn conversation.
+
+        Args:
+            messages: List of dicts with ``role`` and ``content`` keys.
+            model: OpenAI model name (friendly or actual).
+            system: Optional system instruction.
+
+        Yields:
+            Text deltas as they arrive.
+
+        Raises:
+            Exception: The provider error, after logging it. A failure can come after some deltas
+                were already yielded, so callers must not treat the text so far as a full reply.
+        """
+        resolved_model = self._map_model(model)
+        formatted = self._format_history(messages, system)
+        if formatted is None:
+            logger.warning("No valid messages provided to stream_with_history")
+            return
+        try:
+            with span("openai.chat.completions.stream", "llm", provider="openai", model=resolved_model) as s:
+                stream = await self.client.chat.completions.create(
+                    model=resolved_model,
+                    max_tokens=5000,
+                    messages=formatted,
+                    stream=True,
+                    stream_options={"include_usage": True},
+                )
+                async for chunk in stream:
+                    text = chunk.choices[0].delta.content if chunk.choices else None
+                    if text:
+                        s.mark_first_token()
+                        yield text
+                    if chunk.usage is not None:
+                        details = getattr(chunk.usage, "prompt_tokens_details", None)
+                        s.set(
+                            input_tokens=chunk.usage.prompt_tokens,
+                            output_tokens=chunk.usage.completion_tokens,
+                            cached_tokens=getattr(details, "cached_tokens", None),
+                        )
+        except Exception:
+            logger.exception("OpenAI stream_with_history failed")
+            raise
+
+    @staticmethod
+    def _format_history(messages: list[dict], system: str) -> list[dict] | None:
+        """Convert a conversation to chat messages (None if it has no user/assistant message)."""
+        formatted: list[dict] = []
+        if system:
+            formatted.append({"role": "system", "content": system})
+        for m in messages:
+            role = m.get("role", "user")
+            if role in ("user", "assistant", "system"):
+                formatted.append({"role": role, "content": m["content"]})
+        if not any(m["role"] != "system" for m in formatted):
+            return None
+        return formatted
+
     async def generate_multimodal(
         self,
         prompt: str,
@@ -120,7 +194,7 @@ class OpenAIClient:
         """
         try:
             resolved_model = self._map_model(model)
-            response = await self.client.chat.completions.create(
+            response = await self._create(
                 model=resolved_model,
                 max_tokens=5000,
                 messages=[
@@ -11,6 +11,10 @@ class Settings(BaseSettings):
     # Supabase
     supabase_url: str = ""
     supabase_service_role_key: str = ""
+    # Storage backend: "supabase", or "sqlite" (local stand-in for benchmarks/CI; never in production)
+    storage_backend: str = "supabase"
+    sqlite_path: str = ":memory:"
+    sqlite_migrations_dir: str = ""  # empty: <repo>/supabase/migrations
 
     # AI APIs
     anthropic_api_key: str = ""
@@ -20,6 +24,71 @@ class Settings(BaseSettings):
     # Default AI settings
     default_ai_provider: str = "gemini"
     default_ai_model: str = "gemini-2.5-flash"
+    # Times to ask the LLM for corrected figure code when the static precheck rejects it
+    figure_code_fix_attempts: int = 1
+
+    # Fake LLM provider for benchmarks/load tests (replaces every provider; never enable in production)
+    fake_llm_enabled: bool = False
+    fake_llm_recording: str = ""  # empty: app/clients/recordings/default.json
+    fake_llm_latency_ms: float = 800.0
+    fake_llm_latency_jitter_ms: float = 200.0
+    fake_llm_tokens_per_second: float = 80.0
+    fake_llm_error_rate: float = 0.0
+    fake_llm_seed: int = 0
+
+    # Prompts (reload prompts/ and data/ when their mtime changes; for development)
+    prompt_hot_reload: bool = False
+
+    # PDF (ReportLab builds run on a worker pool)
+    pdf_max_workers: int = 2
+    pdf_max_concurrent_jobs: int = 4
+    pdf_job_timeout_seconds: float = 60.0
+    pdf_cache_dir: str = ""  # empty: <tmpdir>/mongene-pdf-cache
+    pdf_cache_max_bytes: int = 256 * 1024 * 1024  # 0 disables the disk tier
+    pdf_cache_memory_max_bytes: int = 32 * 1024 * 1024
+
+    # Geometry rendering for /draw-geometry/batch and /draw-custom-geometry
+    # (one worker process per concurrent job; 0 = min(4, CPU count))
+    render_max_workers: int = 0
+    render_job_timeout_seconds: float = 60.0
+
+    # Python sandbox (/execute-python runs in processes forked from a preloaded server)
+    sandbox_max_concurrent: int = 8
+    sandbox_timeout_seconds: float = 10.0
+    sandbox_cpu_seconds: int = 5
+    sandbox_memory_mb: int = 1024
+    sandbox_max_output_chars: int = 1024 * 1024
+
+    # Multipart uploads (spooled to temp files; limits are checked while the body is received)
+    upload_max_file_bytes: int = 20 * 1024 * 1024
+    upload_max_total_bytes: int = 64 * 1024 * 1024
+    upload_max_files: int = 10
+
+    # Bulk exam import (/problems/import-sse): PDFs transcribed at once and rows per insert
+    import_max_concurrent_transcriptions: int = 4
+    import_insert_batch_size: int = 50
+    import_max_files: int = 50
+    import_max_total_bytes: int = 256 * 1024 * 1024
+
+    # Laboratory chat (/chat/stream): sessions are kept in process memory,
+    # history sent to the model is trimmed to the token budget (newest first).
+    # Run a single worker process (no uvicorn --workers N / gunicorn -w N): with several
+    # workers a follow-up message can land on a process that does not have its session.
+    chat_session_ttl_seconds: int = 3600
+    chat_session_max_sessions: int = 1000
+    chat_history_token_budget: int = 8000
+    # /chat/compare: provider/model pairs answered concurrently per request
+    chat_compare_max_targets: int = 6
+
+    # Response compression: br if the brotli package is installed, otherwise gzip.
+    # SSE, images and PDFs are never compressed
+    compression_minimum_bytes: int = 1024
+    compression_gzip_level: int = 6
+    compression_brotli_quality: int = 5
+
+    # Generation pipeline tracing: comma-separated exporters ("otel", "prometheus").
+    # Spans are always summarized in the SSE "complete" event; exporters need their packages installed
+    tracing_exporters: str = ""
 
     # SMTP (email)
     smtp_host: str = "smtp.gmail.com"
@@ -34,6 +103,10 @@ class Settings(BaseSettings):
     # Server
     host: str = "0.0.0.0"
     port: int = 8000
+    # Load matplotlib/ReportLab/AI SDKs in the background after startup (otherwise on first use)
+    startup_warm_up: bool = True
+    # Budget for `python -X importtime -c "import app.main"` (benchmarks/check_import_time.py)
+    import_time_budget_ms: int = 1000
 
     model_config = {"env_file": ".env", "env_file_encoding": "utf-8", "extra": "ignore"}
 
@@ -0,0 +1,140 @@
+"""レスポンス圧縮（brotli / gzip）
+
+Accept-Encoding に br があり brotli パッケージが入っていれば brotli、なければ gzip で圧縮する。
+Starlette の GZipMiddleware と同じく、小さいレスポンス・すでに Content-Encoding があるもの・
+SSE（イベントを溜めずに届けるため）・画像・PDF は圧縮しない。大きな本体の圧縮はスレッドで行う。
+Starlette の内部クラスには依存しない（バージョンによって引数が違うため）。
+"""
+import zlib
+
+import anyio.to_thread
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - brotli が無ければ gzip だけ使う
+    brotli = None
+
+EXCLUDED_CONTENT_TYPES = ("text/event-stream", "image/", "application/pdf")
+# これ以上の本体はイベントループを止めないようスレッドで圧縮する
+THREAD_MINIMUM_SIZE = 128 * 1024
+
+
+def _accepts(accept_encoding: str, coding: str) -> bool:
+    """Accept-Encoding が coding を受け付けるか（q=0 は拒否の意味）"""
+    for item in accept_encoding.split(","):
+        name, _, params = item.partition(";")
+        if name.strip().lower() != coding:
+            continue
+        key, _, value = params.strip().partition("=")
+        try:
+            return key.strip().lower() != "q" or float(value) > 0
+        except ValueError:
+            return True
+    return False
+
+
+class _GzipEncoder:
+    content_encoding = "gzip"
+
+    def __init__(self, level: int):
+        self._compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+
+    def compress(self, data: bytes, final: bool) -> bytes:
+        out = self._compressor.compress(data)
+        return out + self._compressor.flush(zlib.Z_FINISH if final else zlib.Z_SYNC_FLUSH)
+
+
+class _BrotliEncoder:
+    content_encoding = "br"
+
+    def __init__(self, quality: int):
+        self._compressor = brotli.Compressor(quality=quality)
+
+    def compress(self, data: bytes, final: bool) -> bytes:
+        out = self._compressor.process(data)
+        return out + (self._compressor.finish() if final else self._compressor.flush())
+
+
+class _CompressionResponder:
+    """アプリからの送信を受けて、圧縮するかどうかを最初の本体で決める"""
+
+    def __init__(self, app: ASGIApp, minimum_size: int, encoder):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.encoder = encoder
+        self.send: Send | None = None
+        self.start_message: Message | None = None
+        self.compress = False
+        self.started = False
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        self.send = send
+        await self.app(scope, receive, self.send_with_compression)
+
+    async def _encode(self, body: bytes, final: bool) -> bytes:
+        if len(body) >= THREAD_MINIMUM_SIZE:
+            return await anyio.to_thread.run_sync(self.encoder.compress, body, final)
+        return self.encoder.compress(body, final)
+
+    async def send_with_compression(self, message: Message) -> None:
+        if message["type"] == "http.response.start":
+            # 本体を見るまでヘッダーは送らない
+            self.start_message = message
+            return
+
+        if not self.started:
+            self.started = True
+            start = self.start_message
+            if message["type"] == "http.response.body" and start is not None:
+                headers = Headers(raw=start["headers"])
+                body = message.get("body", b"")
+                more_body = message.get("more_body", False)
+                self.compress = (
+                    "content-encoding" not in headers
+                    and not headers.get("content-type", "").startswith(EXCLUDED_CONTENT_TYPES)
+                    and (more_body or len(body) >= self.minimum_size)
+                )
+                if self.compress:
+                    body = await self._encode(body, final=not more_body)
+                    mutable = MutableHeaders(raw=start["headers"])
+                    mutable["Content-Encoding"] = self.encoder.content_encoding
+                    mutable.add_vary_header("Accept-Encoding")
+                    if more_body:
+                        del mutable["Content-Length"]
+                    else:
+                        mutable["Content-Length"] = str(len(body))
+                    message = {**message, "body": body}
+            if start is not None:
+                await self.send(start)
+            await self.send(message)
+            return
+
+        if self.compress and message["type"] == "http.response.body":
+            more_body = message.get("more_body", False)
+            message = {**message, "body": await self._encode(message.get("body", b""), final=not more_body)}
+        await self.send(message)
+
+
+class CompressionMiddleware:
+    def __init__(self, app: ASGIApp, minimum_size: int = 1024, gzip_level: int = 6, brotli_quality: int = 5):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        accept_encoding = Headers(scope=scope).get("accept-encoding", "")
+        if brotli is not None and _accepts(accept_encoding, "br"):
+            encoder = _BrotliEncoder(self.brotli_quality)
+        elif _accepts(accept_encoding, "gzip"):
+            encoder = _GzipEncoder(self.gzip_level)
+        else:
+            await self.app(scope, receive, send)
+            return
+        await _CompressionResponder(self.app, self.minimum_size, encoder)(scope, receive, send)
@@ -1,9 +1,27 @@
-from supabase import create_client, Client
+import os
 from functools import lru_cache
+from typing import TYPE_CHECKING
+
 from app.config.settings import get_settings
 
+if TYPE_CHECKING:
+    from supabase import Client
+
+DEFAULT_MIGRATIONS_DIR = os.path.join(
+    os.path.dirname(__file__), os.pardir, os.pardir, os.pardir, "supabase", "migrations"
+)
+
 
 @lru_cache
-def get_supabase_client() -> Client:
+def get_supabase_client() -> "Client":
     settings = get_settings()
+    if settings.storage_backend == "sqlite":
+        # ベンチマーク・CI 用のローカル代替（postgrest と同じ呼び出し方で使える）
+        from app.core.sqlite_client import SQLiteClient
+
+        return SQLiteClient(settings.sqlite_path, settings.sqlite_migrations_dir or DEFAULT_MIGRATIONS_DIR)
+
+    # supabase の読み込みは重いため、最初に使うときまで遅らせる
+    from supabase import create_client
+
     return create_client(settings.supabase_url, settings.supabase_service_role_key)
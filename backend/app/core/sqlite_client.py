@@ -0,0 +1,357 @@
+"""Supabase クライアントのローカル代替（SQLite）
+
+アプリが使う postgrest クエリビルダーの範囲（select / insert / upsert / update / delete と
+eq / neq / in_ / ilike / order / limit / single）を SQLite で実装する。
+スキーマは supabase/migrations の SQL のうち SQLite で表現できる部分（テーブルと通常のインデックス）を変換して適用する。
+関数・トリガー・RLS は適用せず、updated_at の自動更新と rpc() で呼ぶ関数（_RPC_FUNCTIONS）だけは Python で再現する。
+Supabase に接続できないベンチマークや CI 向けで、本番では使わない。
+"""
+import json
+import os
+import re
+import sqlite3
+import threading
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Any
+
+# JSONB 列は TEXT 系の型名にして、数値に見える JSON が数値に変換されないようにする
+_JSON_TYPE = "JSONTEXT"
+_NOW_SQL = "(strftime('%Y-%m-%dT%H:%M:%f+00:00', 'now'))"
+
+_TYPE_REWRITES = [
+    (re.compile(r"\b(?:BIG)?SERIAL\s+PRIMARY\s+KEY\b", re.I), "INTEGER PRIMARY KEY AUTOINCREMENT"),
+    (re.compile(r"\bJSONB?\b", re.I), _JSON_TYPE),
+    (re.compile(r"\bDEFAULT\s+now\(\)", re.I), f"DEFAULT {_NOW_SQL}"),
+    (re.compile(r"('[^']*')::\w+"), r"\1"),
+]
+_IDENT_RE = re.compile(r"^[A-Za-z_][A-Za-z0-9_]*$")
+
+
+class StorageError(Exception):
+    """postgrest の APIError に相当するエラー"""
+
+
+@dataclass
+class APIResponse:
+    data: Any
+    count: int | None = None
+
+
+def translate_migration(sql: str) -> list[str]:
+    """Postgres のマイグレーションから SQLite で実行できる文だけを取り出して変換する"""
+    sql = re.sub(r"\$\$.*?\$\$", "''", sql, flags=re.S)  # 関数本体
+    sql = re.sub(r"--[^\n]*", "", sql)
+    statements = []
+    for stmt in (s.strip() for s in sql.split(";")):
+        head = " ".join(stmt.split()[:3]).upper()
+        if head.startswith("CREATE TABLE"):
+            for pattern, repl in _TYPE_REWRITES:
+                stmt = pattern.sub(repl, stmt)
+            statements.append(stmt)
+        elif head.startswith(("CREATE INDEX", "CREATE UNIQUE INDEX")) and not re.search(r"\bUSING\b", stmt, re.I):
+            statements.append(stmt)
+    return statements
+
+
+class SQLiteClient:
+    """``get_supabase_client()`` の代わりに使える、postgrest 互換の最小クライアント"""
+
+    def __init__(self, path: str = ":memory:", migrations_dir: str = ""):
+        self.conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA foreign_keys = ON")
+        self.conn.execute("PRAGMA journal_mode = WAL")
+        self.lock = threading.RLock()
+        if migrations_dir:
+            self.apply_migrations(migrations_dir)
+        self._load_schema()
+
+    def apply_migrations(self, migrations_dir: str):
+        with self.lock:
+            self.conn.execute("CREATE TABLE IF NOT EXISTS _migrations (name TEXT PRIMARY KEY, applied_at TEXT)")
+            applied = {r[0] for r in self.conn.execute("SELECT name FROM _migrations")}
+            for name in sorted(f for f in os.listdir(migrations_dir) if f.endswith(".sql")):
+                if name in applied:
+                    continue
+                with open(os.path.join(migrations_dir, name), encoding="utf-8") as f:
+                    statements = translate_migration(f.read())
+                with self.transaction():
+                    for stmt in statements:
+                        self.conn.execute(stmt)
+                    self.conn.execute(
+                        "INSERT INTO _migrations VALUES (?, ?)", (name, datetime.now(timezone.utc).isoformat())
+                    )
+            self._load_schema()
+
+    def _load_schema(self):
+        """テーブルごとの {列名: 宣言型} と主キー"""
+        self.columns: dict[str, dict[str, str]] = {}
+        self.primary_keys: dict[str, list[str]] = {}
+        tables = [r[0] for r in self.conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")]
+        for table in tables:
+            if table.startswith(("sqlite_", "_")):
+                continue
+            info = self.conn.execute(f'PRAGMA table_info("{table}")').fetchall()
+            self.columns[table] = {r["name"]: r["type"].upper() for r in info}
+            self.primary_keys[table] = [r["name"] for r in sorted(info, key=lambda r: r["pk"]) if r["pk"]]
+
+    def transaction(self):
+        return _Transaction(self)
+
+    def table(self, name: str) -> "_Query":
+        if name not in self.columns:
+            raise StorageError(f'relation "{name}" does not exist')
+        return _Query(self, name)
+
+    def rpc(self, name: str, params: dict | None = None) -> "_RPC":
+        fn = _RPC_FUNCTIONS.get(name)
+        if fn is None:
+            raise StorageError(f"function {name} does not exist")
+        return _RPC(self, fn, params or {})
+
+    def close(self):
+        self.conn.close()
+
+
+class _Transaction:
+    def __init__(self, client: SQLiteClient):
+        self.client = client
+
+    def __enter__(self):
+        self.client.lock.acquire()
+        self.client.conn.execute("BEGIN")
+        return self.client
+
+    def __exit__(self, exc_type, *_):
+        try:
+            self.client.conn.execute("ROLLBACK" if exc_type else "COMMIT")
+        finally:
+            self.client.lock.release()
+
+
+class _RPC:
+    def __init__(self, client: SQLiteClient, fn, params: dict):
+        self.client = client
+        self.fn = fn
+        self.params = params
+
+    def execute(self) -> APIResponse:
+        return APIResponse(self.fn(self.client, **self.params))
+
+
+# ── supabase/migrations の関数の再現 ──
+
+_PROBLEM_BATCH_COLUMNS = (
+    "subject", "prompt", "content", "solution", "image_base64", "conversation_history", "check_info",
+)
+_QUOTA_COUNTERS = ("problem_generation_count", "figure_regeneration_count", "preview_count")
+
+
+def _create_problems_batch(
+    client: SQLiteClient, p_user_id: str, p_rows: list[dict], p_counter: str | None = None, p_increment: int = 1
+) -> list[dict]:
+    """0002_create_problems_batch.sql の create_problems_batch"""
+    if p_counter is not None and p_counter not in _QUOTA_COUNTERS:
+        raise StorageError(f"unknown counter: {p_counter}")
+    rows = [
+        {
+            "user_id": p_user_id,
+            **{k: r.get(k) for k in _PROBLEM_BATCH_COLUMNS},
+            "subject": r.get("subject") or "math",
+            "conversation_history": r.get("conversation_history") or [],
+        }
+        for r in p_rows
+    ]
+    with client.transaction():
+        if p_counter:
+            try:
+                client.conn.execute(
+                    f'UPDATE users SET "{p_counter}" = "{p_counter}" + ?, updated_at = ? WHERE id = ?',
+                    (p_increment, datetime.now(timezone.utc).isoformat(), p_user_id),
+                )
+            except sqlite3.Error as e:
+                raise StorageError(str(e)) from e
+        data = client.table("problems").insert(rows).execute().data if rows else []
+    return sorted(data, key=lambda r: r["id"])
+
+
+_RPC_FUNCTIONS = {"create_problems_batch": _create_problems_batch}
+
+
+class _Query:
+    def __init__(self, client: SQLiteClient, table: str):
+        self.client = client
+        self.table = table
+        self.columns = client.columns[table]
+        self.op = "select"
+        self.selected = "*"
+        self.payload: list[dict] = []
+        self.on_conflict: list[str] | None = None
+        self.where: list[str] = []
+        self.params: list[Any] = []
+        self.order_by: list[str] = []
+        self.limit_n: int | None = None
+        self.offset_n = 0
+        self.one = False
+        self.maybe = False
+
+    # ── operations ──
+
+    def select(self, columns: str = "*", count: str | None = None) -> "_Query":
+        self.op = "select" if self.op == "select" else self.op
+        if columns.strip() != "*":
+            self.selected = ", ".join(self._col(c.strip()) for c in columns.split(",") if c.strip())
+        return self
+
+    def insert(self, data: dict | list[dict]) -> "_Query":
+        self.op, self.payload = "insert", data if isinstance(data, list) else [data]
+        return self
+
+    def upsert(self, data: dict | list[dict], on_conflict: str = "") -> "_Query":
+        self.op, self.payload = "upsert", data if isinstance(data, list) else [data]
+        self.on_conflict = [c.strip() for c in on_conflict.split(",") if c.strip()] or self.client.primary_keys[self.table]
+        return self
+
+    def update(self, data: dict) -> "_Query":
+        self.op, self.payload = "update", [data]
+        return self
+
+    def delete(self) -> "_Query":
+        self.op = "delete"
+        return self
+
+    # ── filters / modifiers ──
+
+    def _filter(self, column: str, op: str, value) -> "_Query":
+        self.where.append(f"{self._col(column)} {op} ?")
+        self.params.append(self._encode(column, value))
+        return self
+
+    def eq(self, column: str, value) -> "_Query":
+        return self._filter(column, "=", value)
+
+    def neq(self, column: str, value) -> "_Query":
+        return self._filter(column, "!=", value)
+
+    def gt(self, column: str, value) -> "_Query":
+        return self._filter(column, ">", value)
+
+    def gte(self, column: str, value) -> "_Query":
+        return self._filter(column, ">=", value)
+
+    def lt(self, column: str, value) -> "_Query":
+        return self._filter(column, "<", value)
+
+    def lte(self, column: str, value) -> "_Query":
+        return self._filter(column, "<=", value)
+
+    def ilike(self, column: str, pattern: str) -> "_Query":
+        # SQLite の LIKE は ASCII の大文字小文字を区別しない。postgrest の * ワイルドカードも % として扱う
+        return self._filter(column, "LIKE", pattern.replace("*", "%"))
+
+    def in_(self, column: str, values) -> "_Query":
+        values = list(values)
+        if not values:
+            self.where.append("0")
+            return self
+        self.where.append(f"{self._col(column)} IN ({', '.join('?' * len(values))})")
+        self.params.extend(self._encode(column, v) for v in values)
+        return self
+
+    def order(self, column: str, desc: bool = False, **_kwargs) -> "_Query":
+        self.order_by.append(f"{self._col(column)} {'DESC' if desc else 'ASC'}")
+        return self
+
+    def limit(self, n: int, **_kwargs) -> "_Query":
+        self.limit_n = n
+        return self
+
+    def range(self, start: int, end: int, **_kwargs) -> "_Query":
+        self.offset_n, self.limit_n = start, end - start + 1
+        return self
+
+    def single(self) -> "_Query":
+        self.one = True
+        return self
+
+    def maybe_single(self) -> "_Query":
+        self.one = self.maybe = True
+        return self
+
+    # ── execution ──
+
+    def execute(self) -> APIResponse:
+        sql, params = self._build()
+        with self.client.lock:
+            try:
+                rows = self.client.conn.execute(sql, params).fetchall()
+            except sqlite3.Error as e:
+                raise StorageError(str(e)) from e
+        data = [self._decode(row) for row in rows]
+        if not self.one:
+            return APIResponse(data)
+        if len(data) == 1:
+            return APIResponse(data[0])
+        if not data and self.maybe:
+            return APIResponse(None)
+        # postgrest の PGRST116 と同じく、1件でなければエラー
+        raise StorageError(f"JSON object requested, multiple (or no) rows returned ({len(data)} rows)")
+
+    def _build(self) -> tuple[str, list]:
+        table = f'"{self.table}"'
+        where = f" WHERE {' AND '.join(self.where)}" if self.where else ""
+        if self.op == "select":
+            sql = f"SELECT {self.selected} FROM {table}{where}"
+            if self.order_by:
+                sql += f" ORDER BY {', '.join(self.order_by)}"
+            if self.limit_n is not None or self.offset_n:
+                sql += f" LIMIT {int(self.limit_n if self.limit_n is not None else -1)} OFFSET {int(self.offset_n)}"
+            return sql, self.params
+        if self.op == "delete":
+            return f"DELETE FROM {table}{where} RETURNING {self.selected}", self.params
+        if self.op == "update":
+            data = dict(self.payload[0])
+            # Supabase 側のトリガー（update_updated_at_column）の代わり
+            if "updated_at" in self.columns and "updated_at" not in data:
+                data["updated_at"] = datetime.now(timezone.utc).isoformat()
+            sets = ", ".join(f"{self._col(k)} = ?" for k in data)
+            params = [self._encode(k, v) for k, v in data.items()] + self.params
+            return f"UPDATE {table} SET {sets}{where} RETURNING {self.selected}", params
+
+        # insert / upsert（複数行は同じ列の組にそろえる）
+        keys = list(dict.fromkeys(k for row in self.payload for k in row))
+        cols = ", ".join(self._col(k) for k in keys)
+        values = ", ".join(f"({', '.join('?' * len(keys))})" for _ in self.payload)
+        params = [self._encode(k, row.get(k)) for row in self.payload for k in keys]
+        sql = f"INSERT INTO {table} ({cols}) VALUES {values}"
+        if self.op == "upsert":
+            conflict = ", ".join(self._col(c) for c in self.on_conflict)
+            # 更新する列が無くても、postgrest と同じく既存行を返すため衝突キーを自分自身で更新する
+            updates = [k for k in keys if k not in self.on_conflict] or self.on_conflict
+            sets = ", ".join(f"{self._col(k)} = excluded.{self._col(k)}" for k in updates)
+            sql += f" ON CONFLICT ({conflict}) DO UPDATE SET {sets}"
+        return f"{sql} RETURNING {self.selected}", params
+
+    def _col(self, name: str) -> str:
+        if not _IDENT_RE.match(name) or name not in self.columns:
+            raise StorageError(f'column "{name}" of relation "{self.table}" does not exist')
+        return f'"{name}"'
+
+    def _encode(self, column: str, value):
+        if self.columns.get(column) == _JSON_TYPE or isinstance(value, (dict, list)):
+            return None if value is None else json.dumps(value, ensure_ascii=False)
+        if isinstance(value, bool):
+            return int(value)
+        return value
+
+    def _decode(self, row: sqlite3.Row) -> dict:
+        out = {}
+        for key in row.keys():
+            value, col_type = row[key], self.columns.get(key)
+            if value is not None and col_type == _JSON_TYPE:
+                value = json.loads(value)
+            elif value is not None and col_type == "BOOLEAN":
+                value = bool(value)
+            out[key] = value
+        return out
@@ -0,0 +1,220 @@
+"""生成パイプラインの計測（ステージ・LLM呼び出し・描画・DB書き込みのスパン）
+
+リクエストごとの Trace を contextvar に置き、その中で span() を開くと所要時間と属性が記録される。
+asyncio のタスクは作成時のコンテキストを引き継ぐので、並行して走る描画タスクのスパンも同じ Trace に入る。
+summary() の結果は SSE の complete イベントに載せる。
+
+TRACING_EXPORTERS に otel / prometheus を指定すると、スパンをそれぞれにも書き出す
+（opentelemetry-api / prometheus-client がインストールされている場合のみ。OTel の送信先は SDK 側の設定に従う）。
+"""
+import contextvars
+import logging
+import time
+from contextlib import aclosing, contextmanager
+from dataclasses import dataclass, field
+from functools import lru_cache, wraps
+from typing import Any, AsyncGenerator, Callable, Iterator
+
+from app.config.settings import get_settings
+
+logger = logging.getLogger(__name__)
+
+# summary の "llm" に集計するトークン数の属性
+TOKEN_ATTRS = ("input_tokens", "output_tokens", "cached_tokens")
+
+_current: contextvars.ContextVar["Trace | None"] = contextvars.ContextVar("mongene_trace", default=None)
+
+
+@dataclass
+class Span:
+    name: str
+    kind: str  # stage / llm / render / db / prompt
+    start: float = field(default_factory=time.perf_counter)
+    start_ns: int = field(default_factory=time.time_ns)
+    duration_ms: float | None = None
+    attrs: dict[str, Any] = field(default_factory=dict)
+
+    def set(self, **attrs):
+        self.attrs.update({k: v for k, v in attrs.items() if v is not None})
+
+    def mark_first_token(self):
+        """ストリーミング応答で最初のトークンを受け取った時点を記録する"""
+        self.attrs.setdefault("ttft_ms", round((time.perf_counter() - self.start) * 1000, 1))
+
+    def end(self):
+        if self.duration_ms is None:
+            self.duration_ms = (time.perf_counter() - self.start) * 1000
+
+
+class Trace:
+    def __init__(self, name: str, **attrs):
+        self.name = name
+        self.attrs = attrs
+        self.spans: list[Span] = []
+        self.start = time.perf_counter()
+        self._exporters = _exporters()
+        for exporter in self._exporters:
+            exporter.start_trace(self)
+
+    def add(self, span: Span):
+        self.spans.append(span)
+        for exporter in self._exporters:
+            exporter.export_span(self, span)
+
+    def finish(self):
+        for exporter in self._exporters:
+            exporter.end_trace(self)
+
+    def summary(self) -> dict:
+        """種類別の合計時間・LLMのトークン数・各スパンをまとめる"""
+        by_kind: dict[str, dict] = {}
+        llm = {"calls": 0, **{k: 0 for k in TOKEN_ATTRS}}
+        spans = []
+        for s in self.spans:
+            ms = s.duration_ms or 0.0
+            agg = by_kind.setdefault(s.kind, {"count": 0, "ms": 0.0})
+            agg["count"] += 1
+            agg["ms"] = round(agg["ms"] + ms, 1)
+            if s.kind == "llm":
+                llm["calls"] += 1
+                for k in TOKEN_ATTRS:
+                    llm[k] += s.attrs.get(k) or 0
+            spans.append({
+                "name": s.name, "kind": s.kind,
+                "offset_ms": round((s.start - self.start) * 1000, 1), "ms": round(ms, 1), **s.attrs,
+            })
+        return {
+            "name": self.name,
+            "total_ms": round((time.perf_counter() - self.start) * 1000, 1),
+            "by_kind": by_kind,
+            "llm": llm,
+            "spans": spans,
+        }
+
+
+@contextmanager
+def activate(trace: Trace) -> Iterator[Trace]:
+    """trace を現在のコンテキストの計測先にする（SSE のジェネレーター全体を囲んで使う）"""
+    token = _current.set(trace)
+    try:
+        yield trace
+    finally:
+        trace.finish()
+        try:
+            _current.reset(token)
+        except ValueError:
+            # ジェネレーターが別のコンテキストから閉じられた場合
+            _current.set(None)
+
+
+@contextmanager
+def span(name: str, kind: str, **attrs) -> Iterator[Span]:
+    """計測中の Trace があればスパンを記録する。無くても Span は返すので呼び出し側は分岐しなくてよい"""
+    s = Span(name, kind)
+    s.set(**attrs)
+    try:
+        yield s
+    except BaseException as e:
+        s.set(error=type(e).__name__)
+        raise
+    finally:
+        s.end()
+        trace = _current.get()
+        if trace is not None:
+            trace.add(s)
+
+
+def traced_stream(name: str) -> Callable:
+    """SSE イベントを返す非同期ジェネレーターを Trace の中で動かし、complete イベントに summary を付ける"""
+
+    def decorator(fn: Callable[..., AsyncGenerator[dict, None]]):
+        @wraps(fn)
+        async def wrapper(*args, **kwargs) -> AsyncGenerator[dict, None]:
+            with activate(Trace(name)) as trace:
+                async with aclosing(fn(*args, **kwargs)) as events:
+                    async for event in events:
+                        if event.get("event") == "complete" and isinstance(event.get("data"), dict):
+                            event = {**event, "data": {**event["data"], "trace": trace.summary()}}
+                        yield event
+
+        return wrapper
+
+    return decorator
+
+
+# ── exporters ──
+
+
+class _OTelExporter:
+    def __init__(self):
+        from opentelemetry import trace as otel_trace
+
+        self._otel = otel_trace
+        self._tracer = otel_trace.get_tracer("mongene")
+        self._roots: dict[int, Any] = {}
+
+    def start_trace(self, trace: Trace):
+        self._roots[id(trace)] = self._tracer.start_span(trace.name, attributes=_otel_attrs(trace.attrs))
+
+    def export_span(self, trace: Trace, span: Span):
+        root = self._roots.get(id(trace))
+        ctx = self._otel.set_span_in_context(root) if root is not None else None
+        otel_span = self._tracer.start_span(
+            span.name, context=ctx, start_time=span.start_ns,
+            attributes=_otel_attrs({"mongene.kind": span.kind, **span.attrs}),
+        )
+        otel_span.end(end_time=span.start_ns + int((span.duration_ms or 0) * 1e6))
+
+    def end_trace(self, trace: Trace):
+        root = self._roots.pop(id(trace), None)
+        if root is not None:
+            root.end()
+
+
+def _otel_attrs(attrs: dict) -> dict:
+    return {k: v if isinstance(v, (str, bool, int, float)) else str(v) for k, v in attrs.items() if v is not None}
+
+
+class _PrometheusExporter:
+    def __init__(self):
+        from prometheus_client import Counter, Histogram
+
+        self._seconds = Histogram(
+            "mongene_span_seconds", "Duration of generation pipeline spans", ["trace", "kind", "name"],
+            buckets=(0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 40, 80),
+        )
+        self._tokens = Counter("mongene_llm_tokens_total", "LLM tokens", ["provider", "model", "type"])
+
+    def start_trace(self, trace: Trace):
+        pass
+
+    def export_span(self, trace: Trace, span: Span):
+        self._seconds.labels(trace.name, span.kind, span.name).observe((span.duration_ms or 0) / 1000)
+        if span.kind == "llm":
+            for k in TOKEN_ATTRS:
+                if span.attrs.get(k):
+                    self._tokens.labels(span.attrs.get("provider", ""), span.attrs.get("model", ""), k).inc(span.attrs[k])
+
+    def end_trace(self, trace: Trace):
+        pass
+
+
+_EXPORTERS = {"otel": _OTelExporter, "prometheus": _PrometheusExporter}
+
+
+@lru_cache
+def _exporters() -> tuple:
+    exporters = []
+    for name in filter(None, (n.strip() for n in get_settings().tracing_exporters.split(","))):
+        if name not in _EXPORTERS:
+            logger.warning(f"Unknown tracing exporter: {name}")
+            continue
+        try:
+            exporters.append(_EXPORTERS[name]())
+        except ImportError:
+            logger.warning(f"Tracing exporter '{name}' is enabled but its package is not installed")
+    return tuple(exporters)
+
+
+def prometheus_enabled() -> bool:
+    return any(isinstance(e, _PrometheusExporter) for e in _exporters())
@@ -1,19 +1,76 @@
+import asyncio
 import logging
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
 from app.config.settings import get_settings
 from app.api.v1 import health, problems, auth, search_filters, source_list, chat, geometry, pdf
+from app.core.compression import CompressionMiddleware
+from app.core.tracing import prometheus_enabled
+from app.services.python_sandbox import get_python_sandbox
+from app.services.render_pool import get_render_pool
+from app.utils.json_codec import FastJSONResponse
+from app.utils.prompt_loader import get_prompt_registry
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 settings = get_settings()
 
+
+def _warm_up():
+    """重い依存（matplotlib・ReportLab・各AI SDK）を読み込み、最初のリクエストで待たせない"""
+    from app.clients import get_ai_clients
+    from app.services.geometry_service import figure_style, get_geometry_service
+    from app.services.pdf_service import get_pdf_service
+
+    get_ai_clients()
+    get_geometry_service()
+    figure_style()
+    get_pdf_service()
+    logger.info("Warm-up finished")
+
+
+async def _start_sandbox(sandbox):
+    """サンドボックスの起動に失敗してもアプリは止めない（最初の実行時にもう一度起動を試みる）"""
+    try:
+        await sandbox.start()
+    except Exception:
+        logger.exception("Python sandbox failed to start; it will be retried on the first request")
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # プロンプト・サンプル問題を起動時に読み込んでおく
+    get_prompt_registry()
+    sandbox = get_python_sandbox()
+    # サンドボックスの起動（numpy / matplotlib の読み込み）とウォームアップは裏で進め、/health などはすぐに応答できるようにする
+    sandbox_start = asyncio.create_task(_start_sandbox(sandbox))
+    warm_up = asyncio.create_task(asyncio.to_thread(_warm_up)) if settings.startup_warm_up else None
+    yield
+    if warm_up is not None and not warm_up.done():
+        await warm_up
+    sandbox_start.cancel()
+    await asyncio.gather(sandbox_start, return_exceptions=True)
+    await sandbox.shutdown()
+    get_render_pool().shutdown()
+
+
 app = FastAPI(
     title="MonGene API",
     description="AI数学問題生成システム",
     version="1.0.0",
+    lifespan=lifespan,
+    default_response_class=FastJSONResponse,
+)
+
+# 後から追加する CORS が外側になり、プリフライトは圧縮を通らずに返る
+app.add_middleware(
+    CompressionMiddleware,
+    minimum_size=settings.compression_minimum_bytes,
+    gzip_level=settings.compression_gzip_level,
+    brotli_quality=settings.compression_brotli_quality,
 )
 
 origins = [o.strip() for o in settings.cors_allow_origins.split(",") if o.strip()]
@@ -34,6 +91,11 @@ app.include_router(chat.router, prefix="/api/v1", tags=["chat"])
 app.include_router(geometry.router, prefix="/api/v1", tags=["geometry"])
 app.include_router(pdf.router, prefix="/api/v1", tags=["pdf"])
 
+if prometheus_enabled():
+    from prometheus_client import make_asgi_app
+
+    app.mount("/metrics", make_asgi_app())
+
 
 if __name__ == "__main__":
     import uvicorn
@@ -13,4 +13,5 @@ class ProblemAnalysisResponse(BaseModel):
     needs_geometry: bool
     detected_shapes: list[str]
     suggested_parameters: dict[str, dict[str, Any]]
+    quantities: list[dict[str, Any]] = []  # 問題文の数値と単位 {"value", "unit", "kind"}
     error: Optional[str] = None
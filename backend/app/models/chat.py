@@ -15,6 +15,24 @@ class ChatRequest(BaseModel):
     files: Optional[list[str]] = None  # base64 encoded
 
 
+class ChatStreamRequest(BaseModel):
+    message: str
+    api: str = "gemini"
+    model: str = "gemini-2.5-flash"
+    session_id: Optional[str] = None  # 省略すると新しいセッションを始める
+
+
+class ChatTarget(BaseModel):
+    api: str
+    model: str
+
+
+class ChatCompareRequest(BaseModel):
+    message: str
+    history: Optional[list[ChatMessage]] = None
+    targets: list[ChatTarget]  # 同じ会話を同時に送る provider / model の組
+
+
 class ChatResponse(BaseModel):
     success: bool
     content: str = ""
@@ -1,16 +1,25 @@
 from pydantic import BaseModel
 from typing import Optional, Any
 
+# 標準図形の描画エンジン。native は matplotlib を通さず投影済みシーンから直接書き出す
+RENDERERS = ("matplotlib", "native")
+
 
 class GeometryDrawRequest(BaseModel):
     shape_type: str
     parameters: dict[str, Any]
     labels: Optional[dict[str, str]] = None
+    image_format: str = "png"  # png, webp, svg
+    image_size: str = "full"  # full, large, medium, thumb
+    variants: Optional[list[str]] = None  # 追加で返す "形式:サイズ" (例: "webp:thumb")
+    renderer: str = "matplotlib"  # matplotlib, native
 
 
 class GeometryResponse(BaseModel):
     success: bool
     image_base64: Optional[str] = None
+    mime_type: str = "image/png"
+    variants: Optional[dict[str, str]] = None
     shape_type: Optional[str] = None
     error: Optional[str] = None
 
@@ -18,13 +27,19 @@ class GeometryResponse(BaseModel):
 class CustomGeometryRequest(BaseModel):
     python_code: str
     problem_text: str = ""
+    image_format: str = "png"
+    image_size: str = "full"
+    variants: Optional[list[str]] = None
 
 
 class CustomGeometryResponse(BaseModel):
     success: bool
     image_base64: Optional[str] = None
+    mime_type: str = "image/png"
+    variants: Optional[dict[str, str]] = None
     problem_text: Optional[str] = None
     error: Optional[str] = None
+    precheck_errors: Optional[list[str]] = None  # 実行前の静的チェックで見つかった問題
 
 
 class PythonExecuteRequest(BaseModel):
@@ -34,4 +49,37 @@ class PythonExecuteRequest(BaseModel):
 class PythonExecuteResponse(BaseModel):
     success: bool
     output: str = ""
+    stderr: str = ""
     error: Optional[str] = None
+
+
+class GeometryBatchJob(BaseModel):
+    """shape_type か python_code のどちらか一方を指定する"""
+    shape_type: Optional[str] = None
+    parameters: dict[str, Any] = {}
+    labels: Optional[dict[str, str]] = None
+    python_code: Optional[str] = None
+    problem_text: str = ""
+    image_format: str = "png"
+    image_size: str = "full"
+    variants: Optional[list[str]] = None
+    renderer: str = "matplotlib"
+
+
+class GeometryBatchRequest(BaseModel):
+    jobs: list[GeometryBatchJob]
+    stream: bool = False  # true: 完了した順に SSE で返す
+
+
+class GeometryBatchResult(BaseModel):
+    index: int
+    success: bool
+    image_base64: Optional[str] = None
+    mime_type: str = "image/png"
+    variants: Optional[dict[str, str]] = None
+    error: Optional[str] = None
+    precheck_errors: Optional[list[str]] = None
+
+
+class GeometryBatchResponse(BaseModel):
+    results: list[GeometryBatchResult]
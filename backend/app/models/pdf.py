@@ -11,4 +11,11 @@ class PDFGenerateRequest(BaseModel):
 class PDFGenerateResponse(BaseModel):
     success: bool
     pdf_base64: Optional[str] = None
+    pdf_url: Optional[str] = None  # 同じPDFを条件付きGETで取り直すためのパス
     error: Optional[str] = None
+
+
+class PDFBookletRequest(BaseModel):
+    problem_ids: list[int]
+    title: str = "数学問題"
+    include_solutions: bool = True
@@ -48,6 +48,7 @@ class Problem(BaseModel):
     content: Optional[str] = None
     solution: Optional[str] = None
     image_base64: Optional[str] = None
+    has_image: Optional[bool] = None  # 一覧・検索のみ（image_base64 の代わりに返す）
     conversation_history: Optional[list[dict[str, Any]]] = None
     check_info: Optional[CheckInfo] = None
     opinion_profile: Optional[dict[str, Any]] = None
@@ -96,6 +97,7 @@ class ProblemSearchRequest(BaseModel):
     year: Optional[str] = None
     exam_session: Optional[str] = None
     is_checked: Optional[bool] = None
+    shapes: Optional[list[str]] = None  # 問題文から検出した図形（AnalysisService.SHAPE_ORDER の名前）
     opinion_profile_v2: Optional[OpinionProfileV2] = None
 
 
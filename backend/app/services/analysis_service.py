@@ -1,5 +1,13 @@
-import re
+"""問題文の図形分析 — キーワード・図形・寸法を1回の走査で取り出す"""
+import asyncio
+from functools import lru_cache
+from typing import Iterable
+
 from app.models.analysis import ProblemAnalysisResponse
+from app.utils.keyword_automaton import KeywordAutomaton, ScanResult
+
+# analyze_many でこれより多い問題はスレッドで分類し、イベントループを止めない
+_THREAD_BATCH_SIZE = 200
 
 
 class AnalysisService:
@@ -13,50 +21,135 @@ class AnalysisService:
         "ABCD-EFGH", "直方体ABCD", "頂点A", "点P", "点Q", "点R",
     ]
 
+    # 語 → 図形・特徴のタグ（同じ位置では最長の語が採られる。「円錐」は circle にならない）
+    SHAPE_KEYWORDS: dict[str, tuple[str, ...]] = {
+        "三角形": ("triangle",), "triangle": ("triangle",),
+        "直角三角形": ("triangle", "right_triangle"), "正三角形": ("triangle", "equilateral_triangle"),
+        "二等辺三角形": ("triangle", "isosceles_triangle"),
+        "四角形": ("quadrilateral",), "正方形": ("square",), "square": ("square",),
+        "長方形": ("rectangle",), "rectangle": ("rectangle",),
+        "平行四辺形": ("parallelogram",), "台形": ("trapezoid",), "ひし形": ("rhombus",), "菱形": ("rhombus",),
+        "五角形": ("polygon",), "六角形": ("polygon",), "正五角形": ("polygon",), "正六角形": ("polygon",), "多角形": ("polygon",),
+        "円": ("circle",), "circle": ("circle",), "おうぎ形": ("sector",), "扇形": ("sector",), "楕円": ("ellipse",),
+        "直方体": ("cuboid",), "直方体ABCD": ("cuboid",), "ABCD-EFGH": ("cuboid",), "cuboid": ("cuboid",),
+        "立方体": ("cube",), "正六面体": ("cube",), "cube": ("cube",),
+        "角柱": ("prism",), "三角柱": ("prism",), "四角柱": ("prism",), "五角柱": ("prism",), "六角柱": ("prism",),
+        "prism": ("prism",),
+        "角錐": ("pyramid",), "三角錐": ("pyramid",), "四角錐": ("pyramid",), "正四角錐": ("pyramid",),
+        "六角錐": ("pyramid",), "pyramid": ("pyramid",),
+        "円柱": ("cylinder",), "cylinder": ("cylinder",), "円錐": ("cone",), "cone": ("cone",),
+        "球": ("sphere",), "半球": ("sphere",), "sphere": ("sphere",),
+        "断面": ("cross_section",), "切断": ("cross_section",), "切り口": ("cross_section",),
+        "点P": ("moving_point",), "点Q": ("moving_point",), "点R": ("moving_point",), "動点": ("moving_point",),
+        "座標": ("coordinate",), "グラフ": ("coordinate",),
+    }
+    # 角柱・角錐の底面の辺の数
+    BASE_SIDES = {
+        "三角柱": 3, "四角柱": 4, "五角柱": 5, "六角柱": 6,
+        "三角錐": 3, "四角錐": 4, "正四角錐": 4, "六角錐": 6,
+    }
+    # 単位の表記 → (正規化した単位, 種類)
+    UNITS: dict[str, tuple[str, str]] = {
+        "mm": ("mm", "length"), "cm": ("cm", "length"), "㎝": ("cm", "length"), "m": ("m", "length"),
+        "km": ("km", "length"), "センチメートル": ("cm", "length"), "メートル": ("m", "length"),
+        "cm²": ("cm2", "area"), "cm^2": ("cm2", "area"), "㎠": ("cm2", "area"), "m²": ("m2", "area"),
+        "平方センチメートル": ("cm2", "area"),
+        "cm³": ("cm3", "volume"), "cm^3": ("cm3", "volume"), "㎤": ("cm3", "volume"), "m³": ("m3", "volume"),
+        "立方センチメートル": ("cm3", "volume"), "L": ("L", "volume"), "mL": ("mL", "volume"), "ml": ("mL", "volume"),
+        "度": ("deg", "angle"), "°": ("deg", "angle"),
+        "秒": ("s", "time"), "分": ("min", "time"), "時間": ("h", "time"), "分の": ("", "fraction"),
+        "倍": ("x", "ratio"), "%": ("%", "ratio"), "％": ("%", "ratio"), "個": ("", "count"),
+    }
+    # detected_shapes に並べる順（描画できる図形は suggested_parameters も付ける）
+    SHAPE_ORDER = (
+        "triangle", "square", "rectangle", "quadrilateral", "parallelogram", "trapezoid", "rhombus", "polygon",
+        "circle", "sector", "ellipse", "cuboid", "cube", "prism", "pyramid", "cylinder", "cone", "sphere",
+    )
+
     async def analyze_problem(
         self, problem_text: str, unit_parameters: dict | None = None, subject: str = "math"
     ) -> ProblemAnalysisResponse:
-        needs_geometry = any(kw in problem_text for kw in self.GEOMETRY_KEYWORDS)
+        return self.analyze_text(problem_text, with_quantities=True)
+
+    async def analyze_many(self, texts: Iterable[str | None]) -> list[ProblemAnalysisResponse]:
+        """検索・取り込みで多数の問題文をまとめて分類する（順序は入力どおり）"""
+        texts = list(texts)
+        if len(texts) > _THREAD_BATCH_SIZE:
+            return await asyncio.to_thread(lambda: [self.analyze_text(t or "") for t in texts])
+        return [self.analyze_text(t or "") for t in texts]
+
+    async def detect_shapes_many(self, texts: Iterable[str | None]) -> list[list[str]]:
+        """図形の分類だけが要るとき用（数値は読まない）。順序は入力どおり"""
+        texts = list(texts)
+        if len(texts) > _THREAD_BATCH_SIZE:
+            return await asyncio.to_thread(lambda: [self._shapes(t or "") for t in texts])
+        return [self._shapes(t or "") for t in texts]
+
+    def _shapes(self, problem_text: str) -> list[str]:
+        tags = _automaton().scan(problem_text, quantities=False).tags
+        return [s for s in self.SHAPE_ORDER if s in tags]
+
+    def analyze_text(self, problem_text: str, with_quantities: bool = False) -> ProblemAnalysisResponse:
+        """with_quantities=True なら単位つきの数値の一覧（quantities）も返す"""
+        automaton = _automaton()
+        scan = automaton.scan(problem_text, quantities=with_quantities)
+        needs_geometry = "geometry" in scan.tags
         detected_shapes: list[str] = []
         suggested_params: dict = {}
 
         if needs_geometry:
-            numbers = self._extract_numbers(problem_text)
-            if any(w in problem_text for w in ["三角形", "triangle"]):
-                detected_shapes.append("triangle")
-                suggested_params["triangle"] = {
-                    "width": numbers[0] if len(numbers) >= 1 else 5,
-                    "height": numbers[1] if len(numbers) >= 2 else 4,
-                }
-            if any(w in problem_text for w in ["四角形", "正方形", "長方形", "rectangle", "square"]):
-                if "正方形" in problem_text or "square" in problem_text:
-                    detected_shapes.append("square")
-                    suggested_params["square"] = {"side": numbers[0] if numbers else 5}
-                else:
-                    detected_shapes.append("rectangle")
-                    suggested_params["rectangle"] = {
-                        "width": numbers[0] if len(numbers) >= 1 else 6,
-                        "height": numbers[1] if len(numbers) >= 2 else 4,
-                    }
-            if any(w in problem_text for w in ["円", "circle"]):
-                detected_shapes.append("circle")
-                suggested_params["circle"] = {"radius": numbers[0] if numbers else 3}
-            if any(w in problem_text for w in ["直方体", "立方体", "cuboid", "cube", "ABCD-EFGH"]):
-                detected_shapes.append("cuboid")
-                if len(numbers) >= 3:
-                    suggested_params["cuboid"] = {"width": numbers[0], "depth": numbers[1], "height": numbers[2]}
-                elif len(numbers) >= 1:
-                    suggested_params["cuboid"] = {"width": numbers[0], "depth": numbers[0], "height": numbers[0]}
-                else:
-                    suggested_params["cuboid"] = {"width": 6, "depth": 6, "height": 8}
-
-        return ProblemAnalysisResponse(
+            detected_shapes = [s for s in self.SHAPE_ORDER if s in scan.tags]
+            # 長さの単位つきの数値を優先し、無ければ単位なしの数値を使う
+            by_kind = automaton.numbers_by_kind(problem_text)
+            numbers = by_kind.get("length") or by_kind.get("", [])
+            for shape in detected_shapes:
+                params = self._suggest(shape, scan, numbers, detected_shapes)
+                if params is not None:
+                    suggested_params[shape] = params
+
+        # 値はここで組み立てたものなので検証を省く（数値の多い長文で効く）
+        return ProblemAnalysisResponse.model_construct(
             success=True,
             needs_geometry=needs_geometry,
             detected_shapes=detected_shapes,
             suggested_parameters=suggested_params,
+            quantities=[{"value": v, "unit": u, "kind": k} for v, u, k in scan.quantities],
+            error=None,
         )
 
-    @staticmethod
-    def _extract_numbers(text: str) -> list[float]:
-        return [float(n) for n in re.findall(r"\d+\.?\d*", text) if float(n) > 0]
+    def _suggest(self, shape: str, scan: ScanResult, numbers: list[float], shapes: list[str]) -> dict | None:
+        """描画エンジンの shape_type に合わせた寸法"""
+        first = numbers[0] if numbers else None
+        radius = first / 2 if first and "直径" in scan.keywords and "半径" not in scan.keywords else first
+
+        if shape == "triangle":
+            return {"width": numbers[0] if numbers else 5, "height": numbers[1] if len(numbers) >= 2 else 4}
+        if shape == "square":
+            return {"side": first or 5}
+        if shape == "rectangle" or (shape == "quadrilateral" and not {"square", "rectangle"} & set(shapes)):
+            return {"width": first or 6, "height": numbers[1] if len(numbers) >= 2 else 4}
+        if shape == "circle":
+            return {"radius": radius or 3}
+        if shape == "cuboid":
+            if len(numbers) >= 3:
+                return {"width": numbers[0], "depth": numbers[1], "height": numbers[2]}
+            if numbers:
+                return {"width": first, "depth": first, "height": first}
+            return {"width": 6, "depth": 6, "height": 8}
+        if shape == "cube":
+            return {"side": first or 6}
+        if shape in ("prism", "pyramid"):
+            sides = next((n for kw, n in self.BASE_SIDES.items() if kw in scan.keywords), 3 if shape == "prism" else 4)
+            # 高さは「底面…、高さ…」の順に書かれることが多いので最後の長さを使う
+            return {"sides": sides, "height": numbers[-1] if numbers else 6}
+        if shape in ("cylinder", "cone"):
+            return {"radius": radius or 3, "height": numbers[1] if len(numbers) >= 2 else 6}
+        return None
+
+
+@lru_cache
+def _automaton() -> KeywordAutomaton:
+    keywords: dict[str, tuple[str, ...]] = {kw: ("geometry",) for kw in AnalysisService.GEOMETRY_KEYWORDS}
+    for kw, tags in AnalysisService.SHAPE_KEYWORDS.items():
+        keywords[kw] = tuple(dict.fromkeys(("geometry", *keywords.get(kw, ()), *tags)))
+    return KeywordAutomaton(keywords, AnalysisService.UNITS)
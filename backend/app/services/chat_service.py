@@ -0,0 +1,203 @@
+"""ラボラトリーのストリーミングチャット — セッションごとの履歴をサーバー側で持つ
+
+会話履歴はプロセス内のメモリに置き（最後の利用から chat_session_ttl_seconds で失効、
+chat_session_max_sessions を超えたら古い順に破棄）、クライアントは新しいメッセージだけを送る。
+モデルに渡す履歴は chat_history_token_budget に収まるよう新しい方から残す。
+
+compare_models は同じ会話を複数の provider / model に同時に送り、終わったものから結果を返す（比較モード）。
+"""
+import asyncio
+import time
+import uuid
+from collections import OrderedDict
+from contextlib import aclosing
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Any, AsyncGenerator
+
+from app.config.settings import get_settings
+from app.core.tracing import TOKEN_ATTRS, Trace, activate, traced_stream
+from app.clients import get_ai_clients
+from app.utils.tokens import trim_history
+
+
+@dataclass
+class ChatSession:
+    id: str
+    user_id: str
+    messages: list[dict] = field(default_factory=list)
+    trimmed: int = 0  # 予算に収めるため捨てた古いメッセージの数
+    last_used: float = field(default_factory=time.monotonic)
+
+
+class ChatSessionStore:
+    def __init__(self, ttl_seconds: float, max_sessions: int, token_budget: int):
+        self.ttl_seconds = ttl_seconds
+        self.max_sessions = max_sessions
+        self.token_budget = token_budget
+        self._sessions: OrderedDict[str, ChatSession] = OrderedDict()
+
+    def get_or_create(self, user_id: str, session_id: str | None = None) -> ChatSession:
+        """ユーザーのセッションを返す。無い・失効した・他人の ID なら新しいセッションを作る"""
+        self._evict()
+        session = self._sessions.get(session_id) if session_id else None
+        if session is None or session.user_id != user_id:
+            session = ChatSession(uuid.uuid4().hex, user_id)
+            self._sessions[session.id] = session
+        session.last_used = time.monotonic()
+        self._sessions.move_to_end(session.id)
+        self._evict()
+        return session
+
+    def append(self, session: ChatSession, *messages: dict):
+        # 予算を超えた古い発言はもう送らないので、保存する履歴も同じ範囲に切り詰める
+        combined = [*session.messages, *messages]
+        session.messages = trim_history(combined, self.token_budget)
+        session.trimmed += len(combined) - len(session.messages)
+        session.last_used = time.monotonic()
+
+    def delete(self, user_id: str, session_id: str) -> bool:
+        session = self._sessions.get(session_id)
+        if session is None or session.user_id != user_id:
+            return False
+        del self._sessions[session_id]
+        return True
+
+    def _evict(self):
+        expire_before = time.monotonic() - self.ttl_seconds
+        while self._sessions:
+            oldest = next(iter(self._sessions.values()))
+            if oldest.last_used >= expire_before and len(self._sessions) <= self.max_sessions:
+                break
+            self._sessions.popitem(last=False)
+
+
+@lru_cache
+def get_chat_session_store() -> ChatSessionStore:
+    s = get_settings()
+    return ChatSessionStore(s.chat_session_ttl_seconds, s.chat_session_max_sessions, s.chat_history_token_budget)
+
+
+class ChatService:
+    def __init__(self):
+        self.clients: dict[str, Any] = get_ai_clients()
+        self.sessions = get_chat_session_store()
+
+    @traced_stream("chat")
+    async def stream_chat(
+        self,
+        user_id: str,
+        message: str,
+        api: str,
+        model: str,
+        session_id: str | None = None,
+    ) -> AsyncGenerator[dict, None]:
+        client = self.clients.get(api)
+        if not client:
+            yield {"event": "error", "data": {"error": f"APIプロバイダー '{api}' が設定されていません"}}
+            return
+
+        session = self.sessions.get_or_create(user_id, session_id)
+        user_message = {"role": "user", "content": message}
+        messages = trim_history([*session.messages, user_message], self.sessions.token_budget)
+        yield {"event": "session", "data": {
+            "session_id": session.id,
+            "resumed": session.id == session_id,
+            "messages": len(messages),
+            "trimmed": session.trimmed + len(session.messages) + 1 - len(messages),
+        }}
+
+        start = time.perf_counter()
+        ttft_ms = None
+        parts: list[str] = []
+        try:
+            async with aclosing(client.stream_with_history(messages, model=model)) as deltas:
+                async for delta in deltas:
+                    if ttft_ms is None:
+                        ttft_ms = round((time.perf_counter() - start) * 1000, 1)
+                    parts.append(delta)
+                    yield {"event": "delta", "data": {"text": delta}}
+        except Exception as e:
+            # 途中で切れた応答はセッションに残さない（次の発言でモデルに渡さないため）
+            yield {"event": "error", "data": {
+                "error": f"応答の途中でエラーが発生しました: {e}", "session_id": session.id, "partial": bool(parts),
+            }}
+            return
+
+        content = "".join(parts)
+        if not content:
+            yield {"event": "error", "data": {"error": "応答を取得できませんでした", "session_id": session.id}}
+            return
+
+        self.sessions.append(session, user_message, {"role": "assistant", "content": content})
+        yield {"event": "complete", "data": {
+            "session_id": session.id,
+            "content": content,
+            "ttft_ms": ttft_ms,
+            "total_ms": round((time.perf_counter() - start) * 1000, 1),
+        }}
+
+    async def compare_models(
+        self,
+        message: str,
+        targets: list[tuple[str, str]],
+        history: list[dict] | None = None,
+    ) -> AsyncGenerator[dict, None]:
+        """targets の各 (api, model) に同じ会話を同時に送る
+
+        delta は index 付きで届いた順に、result は各モデルが終わった時点で返す。
+        全体の所要時間は最も遅いモデルの分で済む（complete の wall_ms と sequential_ms で比べられる）。
+        """
+        messages = trim_history([*(history or []), {"role": "user", "content": message}], self.sessions.token_budget)
+        queue: asyncio.Queue[dict] = asyncio.Queue()
+
+        async def answer(index: int, api: str, model: str):
+            result: dict[str, Any] = {"index": index, "api": api, "model": model}
+            parts: list[str] = []
+            start = time.perf_counter()
+            ttft_ms = None
+            # モデルごとに Trace を分け、そのモデルのトークン数だけを集計する
+            with activate(Trace("chat_compare", api=api, model=model)) as trace:
+                try:
+                    async with aclosing(self.clients[api].stream_with_history(messages, model=model)) as deltas:
+                        async for delta in deltas:
+                            if ttft_ms is None:
+                                ttft_ms = round((time.perf_counter() - start) * 1000, 1)
+                            parts.append(delta)
+                            queue.put_nowait({"event": "delta", "data": {"index": index, "text": delta}})
+                except Exception as e:
+                    result["error"] = str(e)
+            content = "".join(parts)
+            if not content:
+                result.setdefault("error", "応答を取得できませんでした")
+            result.update(
+                content=content,
+                ttft_ms=ttft_ms,
+                total_ms=round((time.perf_counter() - start) * 1000, 1),
+                **{k: sum(s.attrs.get(k) or 0 for s in trace.spans if s.kind == "llm") for k in TOKEN_ATTRS},
+            )
+            queue.put_nowait({"event": "result", "data": result})
+
+        start = time.perf_counter()
+        tasks = [asyncio.create_task(answer(i, api, model)) for i, (api, model) in enumerate(targets)]
+        yield {"event": "start", "data": {
+            "targets": [{"index": i, "api": api, "model": model} for i, (api, model) in enumerate(targets)],
+            "messages": len(messages),
+        }}
+        results: list[dict] = []
+        try:
+            while len(results) < len(tasks):
+                event = await queue.get()
+                if event["event"] == "result":
+                    results.append(event["data"])
+                yield event
+        finally:
+            # クライアント切断で打ち切られた場合は残りのモデルへの呼び出しも止める
+            for task in tasks:
+                task.cancel()
+
+        yield {"event": "complete", "data": {
+            "wall_ms": round((time.perf_counter() - start) * 1000, 1),
+            "sequential_ms": round(sum(r["total_ms"] for r in results), 1),
+            "results": sorted(({k: v for k, v in r.items() if k != "content"} for r in results), key=lambda r: r["index"]),
+        }}
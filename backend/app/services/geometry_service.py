@@ -3,53 +3,63 @@ matplotlib.use("Agg")
 import matplotlib.pyplot as plt
 import matplotlib.patches as patches
 import matplotlib.font_manager as fm
+from matplotlib.collections import LineCollection, PolyCollection
 import numpy as np
 import base64
 import io
-import sys
 import traceback
 import logging
-from io import StringIO
+from functools import lru_cache
+from types import MappingProxyType
 from mpl_toolkits.mplot3d import Axes3D
 from mpl_toolkits.mplot3d.art3d import Poly3DCollection
 from mpl_toolkits import mplot3d
 
-from app.models.geometry import GeometryResponse, CustomGeometryResponse, PythonExecuteResponse
+from app.models.geometry import RENDERERS, GeometryResponse, CustomGeometryResponse, PythonExecuteResponse
+from app.services.python_sandbox import get_python_sandbox
+from app.utils.solid_geometry import PLANE_TYPES, SOLID_TYPES, Scene, build_plane_scene, build_scene, build_solid
+from app.utils.scene_renderer import render_png, render_svg
+from app.utils.code_precheck import precheck_figure_code, safe_import
+from app.utils.fonts import primary_font
+from app.utils.image_formats import MIME_TYPES, RASTER_FORMATS, derive_raster, parse_image_specs
 
 logger = logging.getLogger(__name__)
 
 
-def _setup_japanese_font() -> str | None:
-    japanese_fonts = [
-        "Noto Sans CJK JP",
-        "Noto Sans JP",
-        "IPAexGothic",
-        "IPAGothic",
-        "TakaoPGothic",
-        "VL Gothic",
-        "DejaVu Sans",
-    ]
-    available_fonts = [f.name for f in fm.fontManager.ttflist]
-    for font_name in japanese_fonts:
-        if font_name in available_fonts:
-            plt.rcParams["font.family"] = font_name
-            return font_name
-    plt.rcParams["axes.unicode_minus"] = False
-    return None
-
-
-_setup_japanese_font()
+@lru_cache
+def figure_style() -> MappingProxyType:
+    """描画ごとに plt.rc_context で適用する設定。フォントの解決は初回だけ行う"""
+    font = primary_font()
+    if font is None:
+        return MappingProxyType({"axes.unicode_minus": False})
+    try:
+        fm.findfont(fm.FontProperties(family=font.family), fallback_to_default=False)
+    except ValueError:
+        # matplotlib のフォントキャッシュに無いフォントはファイルから登録する
+        fm.fontManager.addfont(font.path)
+    return MappingProxyType({"font.family": [font.family]})
 
 
 class GeometryService:
     async def generate_geometry(
-        self, shape_type: str, parameters: dict, labels: dict | None = None
+        self,
+        shape_type: str,
+        parameters: dict,
+        labels: dict | None = None,
+        image_format: str = "png",
+        image_size: str = "full",
+        variants: list[str] | None = None,
+        renderer: str = "matplotlib",
     ) -> GeometryResponse:
         try:
-            if shape_type == "cuboid":
-                return await self._draw_cuboid_3d(parameters, labels)
+            specs = parse_image_specs(image_format, image_size, variants)
+            if renderer not in RENDERERS:
+                raise ValueError(f"未対応のレンダラーです: {renderer}")
+            if renderer == "native":
+                return self._draw_native(shape_type, parameters, labels, specs)
+            if shape_type in SOLID_TYPES:
+                return await self._draw_solid(shape_type, parameters, labels, specs)
 
-            fig, ax = plt.subplots(1, 1, figsize=(8, 6))
             draw_fn = {
                 "triangle": self._draw_triangle,
                 "rectangle": self._draw_rectangle,
@@ -57,28 +67,47 @@ class GeometryService:
                 "square": self._draw_square,
             }.get(shape_type, self._draw_square)
 
-            draw_fn(ax, parameters, labels)
-            ax.set_aspect("equal")
-            ax.grid(True, alpha=0.3)
-            plt.tight_layout()
-
-            image_base64 = self._fig_to_base64(fig)
-            return GeometryResponse(success=True, image_base64=image_base64, shape_type=shape_type)
+            with plt.rc_context(figure_style()):
+                fig, ax = plt.subplots(1, 1, figsize=(8, 6))
+                draw_fn(ax, parameters, labels)
+                ax.set_aspect("equal")
+                ax.grid(True, alpha=0.3)
+                plt.tight_layout()
+                image_base64, mime_type, rendered = self._render_images(specs, fig)
+            return GeometryResponse(
+                success=True, image_base64=image_base64, mime_type=mime_type,
+                variants=rendered, shape_type=shape_type,
+            )
         except Exception as e:
             logger.exception("generate_geometry failed")
             plt.close("all")
             return GeometryResponse(success=False, error=str(e))
 
     async def generate_custom_geometry(
-        self, python_code: str, problem_text: str = ""
+        self,
+        python_code: str,
+        problem_text: str = "",
+        image_format: str = "png",
+        image_size: str = "full",
+        variants: list[str] | None = None,
     ) -> CustomGeometryResponse:
         try:
-            _setup_japanese_font()
-            safe_globals = self._build_safe_globals()
-            exec(python_code, safe_globals)
-            image_base64 = self._fig_to_base64()
+            specs = parse_image_specs(image_format, image_size, variants)
+            check = precheck_figure_code(python_code)
+            if not check.ok:
+                logger.info(f"generate_custom_geometry rejected by precheck: {check.errors}")
+                return CustomGeometryResponse(
+                    success=False, problem_text=problem_text,
+                    error="図形コードの事前チェックに失敗しました", precheck_errors=check.errors,
+                )
+            # コード内で rcParams を書き換えても、この描画の中だけで元に戻る
+            with plt.rc_context(figure_style()):
+                safe_globals = self._build_safe_globals()
+                exec(check.code, safe_globals)
+                image_base64, mime_type, rendered = self._render_images(specs)
             return CustomGeometryResponse(
-                success=True, image_base64=image_base64, problem_text=problem_text
+                success=True, image_base64=image_base64, mime_type=mime_type,
+                variants=rendered, problem_text=problem_text,
             )
         except Exception as e:
             logger.exception("generate_custom_geometry failed")
@@ -88,18 +117,13 @@ class GeometryService:
             )
 
     async def execute_python_code(self, python_code: str) -> PythonExecuteResponse:
-        try:
-            old_stdout = sys.stdout
-            sys.stdout = captured = StringIO()
-            safe_globals = self._build_safe_globals()
-            exec(python_code, safe_globals)
-            sys.stdout = old_stdout
-            output = captured.getvalue()
-            return PythonExecuteResponse(success=True, output=output)
-        except Exception as e:
-            sys.stdout = sys.__stdout__
-            logger.exception("execute_python_code failed")
-            return PythonExecuteResponse(success=False, error=f"{type(e).__name__}: {e}")
+        """任意コードはプロセス内で実行せず、リソース制限付きのサンドボックスに渡す"""
+        result = await get_python_sandbox().run(python_code)
+        if not result.success:
+            logger.warning(f"execute_python_code failed: {result.error}")
+        return PythonExecuteResponse(
+            success=result.success, output=result.stdout, stderr=result.stderr, error=result.error
+        )
 
     # ── drawing helpers ──
 
@@ -140,56 +164,94 @@ class GeometryService:
         ax.set_xlim(-r - 1, r + 1)
         ax.set_ylim(-r - 1, r + 1)
 
-    async def _draw_cuboid_3d(self, params, labels) -> GeometryResponse:
+    async def _draw_solid(self, shape_type, params, labels, specs) -> GeometryResponse:
+        """立体は NumPy エンジンで投影・隠線処理し、2D軸に層ごとのコレクションとして描く"""
         try:
-            w = params.get("width", 6)
-            d = params.get("depth", 6)
-            h = params.get("height", 8)
-            fig = plt.figure(figsize=(10, 8))
-            ax = fig.add_subplot(111, projection="3d")
-            verts = np.array([
-                [0, 0, 0], [w, 0, 0], [w, d, 0], [0, d, 0],
-                [0, 0, h], [w, 0, h], [w, d, h], [0, d, h],
-            ])
-            faces_idx = [
-                [0, 1, 2, 3], [4, 5, 6, 7], [0, 1, 5, 4],
-                [2, 3, 7, 6], [0, 3, 7, 4], [1, 2, 6, 5],
-            ]
-            for fi in faces_idx:
-                poly = [verts[i].tolist() for i in fi]
-                ax.add_collection3d(Poly3DCollection([poly], alpha=0.1, facecolor="lightblue", edgecolor="blue", linewidth=1.5))
-            edges = [[0, 1], [1, 2], [2, 3], [3, 0], [4, 5], [5, 6], [6, 7], [7, 4], [0, 4], [1, 5], [2, 6], [3, 7]]
-            for e in edges:
-                pts = verts[e]
-                ax.plot3D(*pts.T, "b-", linewidth=2)
-            if labels:
-                for v, l in zip(verts, "ABCDEFGH"):
-                    ax.text(v[0], v[1], v[2], l, size=14, color="red", weight="bold")
-            mx = max(w, d, h)
-            ax.set_xlim([-1, mx + 1])
-            ax.set_ylim([-1, mx + 1])
-            ax.set_zlim([-1, mx + 1])
-            ax.view_init(elev=20, azim=-75)
-            ax.grid(True, alpha=0.3)
-            plt.tight_layout()
-            img = self._fig_to_base64(fig)
-            return GeometryResponse(success=True, image_base64=img, shape_type="cuboid")
+            scene = build_scene(build_solid(shape_type, params), params, labels)
+            with plt.rc_context(figure_style()):
+                fig, ax = plt.subplots(1, 1, figsize=(8, 6))
+                self._plot_scene(ax, scene)
+                plt.tight_layout()
+                img, mime_type, rendered = self._render_images(specs, fig)
+            return GeometryResponse(
+                success=True, image_base64=img, mime_type=mime_type, variants=rendered, shape_type=shape_type,
+            )
         except Exception as e:
+            logger.exception("_draw_solid failed")
             plt.close("all")
             return GeometryResponse(success=False, error=str(e))
 
+    @staticmethod
+    def _plot_scene(ax, scene: Scene):
+        if scene.faces:
+            ax.add_collection(PolyCollection(scene.faces, facecolors="lightblue", edgecolors="none", alpha=0.15))
+        if scene.section is not None:
+            ax.add_collection(PolyCollection(
+                [scene.section], facecolors="orange", edgecolors="darkorange", linewidths=1.5, alpha=0.4,
+            ))
+        if len(scene.hidden_segments):
+            ax.add_collection(LineCollection(scene.hidden_segments, colors="blue", linewidths=1.2, linestyles="--"))
+        ax.add_collection(LineCollection(scene.visible_segments, colors="blue", linewidths=2))
+        if len(scene.points):
+            ax.scatter(scene.points[:, 0], scene.points[:, 1], s=30, c="red", zorder=3)
+        for x, y, text in scene.texts:
+            ax.text(x, y, text, size=14, color="red", weight="bold", ha="center", va="center")
+        xmin, ymin, xmax, ymax = scene.bounds
+        ax.set_xlim(xmin, xmax)
+        ax.set_ylim(ymin, ymax)
+        ax.set_aspect("equal")
+        ax.axis("off")
+
     # ── utilities ──
 
-    def _fig_to_base64(self, fig=None) -> str:
-        buf = io.BytesIO()
-        if fig:
-            fig.savefig(buf, format="png", dpi=150, bbox_inches="tight")
+    def _render_images(
+        self, specs: list[tuple[str, str]], fig=None
+    ) -> tuple[str, str, dict[str, str] | None]:
+        """1回の描画からPNG/SVGを書き出し、各バリアントはPNGから派生させる"""
+        fig = fig or plt.gcf()
+        try:
+            png = svg = None
+            if any(fmt in RASTER_FORMATS for fmt, _ in specs):
+                buf = io.BytesIO()
+                fig.savefig(buf, format="png", dpi=150, bbox_inches="tight")
+                png = buf.getvalue()
+            if any(fmt == "svg" for fmt, _ in specs):
+                buf = io.BytesIO()
+                fig.savefig(buf, format="svg", bbox_inches="tight")
+                svg = buf.getvalue()
+        finally:
             plt.close(fig)
+        return self._encode_images(specs, png, svg)
+
+    def _draw_native(self, shape_type, params, labels, specs) -> GeometryResponse:
+        """matplotlib を使わず、シーンから SVG / Pillow の PNG を直接書き出す"""
+        if shape_type in SOLID_TYPES:
+            scene = build_scene(build_solid(shape_type, params), params, labels)
         else:
-            plt.savefig(buf, format="png", dpi=150, bbox_inches="tight")
-            plt.close()
-        buf.seek(0)
-        return base64.b64encode(buf.getvalue()).decode()
+            # matplotlib 経路と同じく、未知の形状は正方形として描く
+            plane_type = shape_type if shape_type in PLANE_TYPES else "square"
+            scene = build_plane_scene(plane_type, params, labels)
+        png = render_png(scene) if any(fmt in RASTER_FORMATS for fmt, _ in specs) else None
+        svg = render_svg(scene) if any(fmt == "svg" for fmt, _ in specs) else None
+        img, mime_type, rendered = self._encode_images(specs, png, svg)
+        return GeometryResponse(
+            success=True, image_base64=img, mime_type=mime_type,
+            variants=rendered, shape_type=shape_type,
+        )
+
+    @staticmethod
+    def _encode_images(
+        specs: list[tuple[str, str]], png: bytes | None, svg: bytes | None
+    ) -> tuple[str, str, dict[str, str] | None]:
+        encoded: dict[str, str] = {}
+        for fmt, size in specs:
+            key = f"{fmt}:{size}"
+            if key not in encoded:
+                data = svg if fmt == "svg" else derive_raster(png, fmt, size)
+                encoded[key] = base64.b64encode(data).decode()
+        main_fmt, main_size = specs[0]
+        variants = {f"{fmt}:{size}": encoded[f"{fmt}:{size}"] for fmt, size in specs[1:]}
+        return encoded[f"{main_fmt}:{main_size}"], MIME_TYPES[main_fmt], variants or None
 
     def _build_safe_globals(self) -> dict:
         return {
@@ -205,7 +267,7 @@ class GeometryService:
             "base64": base64,
             "Polygon": patches.Polygon,
             "__builtins__": {
-                "__import__": __import__,
+                "__import__": safe_import,
                 "len": len, "range": range, "enumerate": enumerate, "zip": zip,
                 "map": map, "filter": filter, "list": list, "dict": dict,
                 "tuple": tuple, "set": set, "str": str, "int": int, "float": float,
@@ -213,3 +275,8 @@ class GeometryService:
                 "sum": sum, "print": print, "ord": ord, "chr": chr,
             },
         }
+
+
+@lru_cache
+def get_geometry_service() -> GeometryService:
+    return GeometryService()
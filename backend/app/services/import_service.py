@@ -0,0 +1,172 @@
+"""過去問の一括取り込み — PDFの書き起こし・分類・まとめての保存
+
+PDFは並列数を絞って同時に書き起こし、終わったものから大問ごとに分けて AnalysisService で分類し、
+一定件数たまるごとに1回の insert で保存する。進み具合は SSE のイベントとして返す。
+"""
+import asyncio
+import logging
+import re
+import time
+from typing import Any, AsyncGenerator
+
+from starlette.datastructures import UploadFile
+
+from app.config.settings import get_settings
+from app.core.database import get_supabase_client
+from app.core.tracing import span, traced_stream
+from app.clients import get_ai_clients
+from app.services.analysis_service import AnalysisService
+from app.services.problem_service import insert_problems
+from app.utils.uploads import read_upload
+
+logger = logging.getLogger(__name__)
+
+TRANSCRIBE_PROMPT = (
+    "この試験問題のPDFを正確にテキストとして書き起こしてください。数式はLaTeX形式で表現してください。"
+    "大問ごとに「---」だけの行で区切ってください。"
+)
+_SEPARATOR = re.compile(r"^[ \t]*-{3,}[ \t]*$", re.MULTILINE)
+
+
+def split_problems(text: str) -> list[str]:
+    """書き起こしを大問ごとに分ける（区切りが無ければ全体で1問）"""
+    return [part.strip() for part in _SEPARATOR.split(text) if part.strip()]
+
+
+class ImportService:
+    def __init__(self):
+        self.clients: dict[str, Any] = get_ai_clients()
+        self.db = get_supabase_client()
+        self.analysis = AnalysisService()
+
+    @traced_stream("exam_import")
+    async def import_exam_archive_sse(
+        self,
+        user_id: str,
+        files: list[UploadFile],
+        year: str = "",
+        exam_session: str = "",
+        subject: str = "math",
+        model: str | None = None,
+        concurrency: int | None = None,
+        batch_size: int | None = None,
+    ) -> AsyncGenerator[dict, None]:
+        s = get_settings()
+        concurrency = max(1, concurrency or s.import_max_concurrent_transcriptions)
+        batch_size = max(1, batch_size or s.import_insert_batch_size)
+        client = self.clients.get("gemini")
+        if not client or not hasattr(client, "generate_with_pdf"):
+            yield {"event": "error", "data": {"error": "Gemini APIが設定されていません"}}
+            return
+        # 書き起こしは常に Gemini なので、他社のモデル名は無視してクライアント既定のモデルを使う
+        model_kwargs = {"model": model} if model and model.startswith("gemini") else {}
+
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def transcribe(f: UploadFile) -> tuple[str, str, str | None]:
+            """(ファイル名, 書き起こし, エラー)。失敗しても例外にせず他のファイルを続ける"""
+            name = f.filename or ""
+            async with semaphore:
+                try:
+                    with span("transcribe pdf", "import", file=name):
+                        text = await client.generate_with_pdf(TRANSCRIBE_PROMPT, await read_upload(f), **model_kwargs)
+                except Exception as e:
+                    logger.warning(f"PDF transcription failed ({name}): {e}")
+                    return name, "", str(e)
+            # 実クライアントはエラー時に空文字を返す
+            return name, text, None if text.strip() else "書き起こし結果が空です"
+
+        start = time.perf_counter()
+        tasks = [asyncio.create_task(transcribe(f)) for f in files]
+        pending: list[dict] = []
+        # 書き起こしたがまだ preview_count に数えていないファイル数（次の保存で一緒に加算する）
+        uncounted_files = 0
+        imported = 0
+        failed: list[dict] = []
+
+        def per_minute(count: int) -> float:
+            return round(count * 60 / max(time.perf_counter() - start, 1e-9), 1)
+
+        async def flush() -> list[int]:
+            nonlocal uncounted_files
+            rows, pending[:] = list(pending), []
+            files_done, uncounted_files = uncounted_files, 0
+            saved = await asyncio.to_thread(
+                insert_problems, self.db, user_id, rows,
+                counter="preview_count" if files_done else None, increment=files_done,
+            )
+            return [r["id"] for r in saved]
+
+        yield {"event": "start", "data": {"files": len(files), "concurrency": concurrency, "batch_size": batch_size}}
+        try:
+            for done, next_file in enumerate(asyncio.as_completed(tasks), 1):
+                name, text, error = await next_file
+                if error:
+                    failed.append({"file": name, "error": error})
+                    yield {"event": "file_error", "data": {"file": name, "error": error, "done": done, "total": len(files)}}
+                    continue
+
+                uncounted_files += 1
+                parts = split_problems(text)
+                analyses = await self.analysis.analyze_many(parts)
+                for content, analysis in zip(parts, analyses):
+                    pending.append({
+                        "subject": subject,
+                        "content": content,
+                        "check_info": {
+                            "year": year or None,
+                            "exam_session": exam_session or None,
+                            "source_file": name,
+                            "shapes": analysis.detected_shapes,
+                        },
+                    })
+                yield {"event": "file_complete", "data": {
+                    "file": name,
+                    "problems": len(parts),
+                    "shapes": sorted({shape for a in analyses for shape in a.detected_shapes}),
+                    "done": done,
+                    "total": len(files),
+                }}
+
+                if len(pending) >= batch_size:
+                    ids = await flush()
+                    imported += len(ids)
+                    yield {"event": "batch_saved", "data": {
+                        "ids": ids, "imported": imported, "problems_per_minute": per_minute(imported),
+                    }}
+
+            if pending:
+                ids = await flush()
+                imported += len(ids)
+                yield {"event": "batch_saved", "data": {
+                    "ids": ids, "imported": imported, "problems_per_minute": per_minute(imported),
+                }}
+        except Exception as e:
+            logger.error(f"Exam import failed: {e}")
+            yield {"event": "error", "data": {"error": str(e), "imported": imported}}
+            return
+        finally:
+            # エラーやクライアント切断で打ち切られた場合は残りの書き起こしも止める
+            for task in tasks:
+                task.cancel()
+
+        if year and exam_session and imported:
+            self._register_source(user_id, year, exam_session)
+        elapsed = time.perf_counter() - start
+        yield {"event": "complete", "data": {
+            "files": len(files),
+            "imported": imported,
+            "failed": failed,
+            "elapsed_seconds": round(elapsed, 3),
+            "problems_per_minute": per_minute(imported),
+        }}
+
+    def _register_source(self, user_id: str, year: str, exam_session: str):
+        """取り込んだ年度・回を出典リストに加える"""
+        try:
+            self.db.table("source_list").upsert(
+                {"user_id": user_id, "year": year, "exam_session": exam_session},
+                on_conflict="user_id,year,exam_session",
+            ).execute()
+        except Exception as e:
+            logger.warning(f"Failed to register source: {e}")
@@ -0,0 +1,126 @@
+"""生成済みPDFのコンテンツハッシュキャッシュ
+
+メモリ上の小さなLRUと、サイズ上限付きのディスク層の2段構成。
+キーは問題文・解答・画像・レイアウトバージョンのハッシュなので、内容が変われば自然に別エントリになる。
+"""
+import hashlib
+import logging
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+
+def pdf_cache_key(layout_version: str, *parts: str | None) -> str:
+    """レイアウトバージョンと各入力から SHA-256 のキーを作る"""
+    h = hashlib.sha256(layout_version.encode())
+    for part in parts:
+        data = (part or "").encode()
+        # 区切り位置で衝突しないよう長さを前置する
+        h.update(len(data).to_bytes(8, "big"))
+        h.update(data)
+    return h.hexdigest()
+
+
+class PDFCache:
+    def __init__(self, cache_dir: str, max_disk_bytes: int, max_memory_bytes: int):
+        self.cache_dir = cache_dir
+        self.max_disk_bytes = max_disk_bytes
+        self.max_memory_bytes = max_memory_bytes
+        self._lock = threading.Lock()
+        self._memory: OrderedDict[str, bytes] = OrderedDict()
+        self._memory_bytes = 0
+        self._disk_bytes = 0
+        if self.max_disk_bytes > 0:
+            try:
+                os.makedirs(self.cache_dir, exist_ok=True)
+                self._disk_bytes = sum(size for _, _, size in self._scan_disk())
+            except OSError as e:
+                logger.warning(f"PDF cache directory unavailable, disk tier disabled: {e}")
+                self.max_disk_bytes = 0
+
+    def get(self, key: str) -> bytes | None:
+        with self._lock:
+            data = self._memory.get(key)
+            if data is not None:
+                self._memory.move_to_end(key)
+                return data
+        if self.max_disk_bytes <= 0:
+            return None
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+            # 最終アクセス時刻で追い出し順を決めるため mtime を更新する
+            os.utime(path)
+        except OSError:
+            return None
+        self._remember(key, data)
+        return data
+
+    def put(self, key: str, data: bytes):
+        self._remember(key, data)
+        if self.max_disk_bytes <= 0 or len(data) > self.max_disk_bytes:
+            return
+        path = self._path(key)
+        try:
+            fd, tmp = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            existed = os.path.exists(path)
+            os.replace(tmp, path)
+        except OSError as e:
+            logger.warning(f"Failed to write PDF cache entry: {e}")
+            return
+        with self._lock:
+            if not existed:
+                self._disk_bytes += len(data)
+            if self._disk_bytes > self.max_disk_bytes:
+                self._evict_disk()
+
+    # ── 内部処理 ──
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.pdf")
+
+    def _remember(self, key: str, data: bytes):
+        if len(data) > self.max_memory_bytes:
+            return
+        with self._lock:
+            old = self._memory.pop(key, None)
+            if old is not None:
+                self._memory_bytes -= len(old)
+            self._memory[key] = data
+            self._memory_bytes += len(data)
+            while self._memory_bytes > self.max_memory_bytes:
+                _, evicted = self._memory.popitem(last=False)
+                self._memory_bytes -= len(evicted)
+
+    def _scan_disk(self) -> list[tuple[float, str, int]]:
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            if not name.endswith(".pdf"):
+                continue
+            try:
+                st = os.stat(os.path.join(self.cache_dir, name))
+            except OSError:
+                continue
+            entries.append((st.st_mtime, name, st.st_size))
+        return entries
+
+    def _evict_disk(self):
+        """上限の8割まで、最終アクセスが古いものから削除する（ロック保持中に呼ぶ）"""
+        entries = sorted(self._scan_disk())
+        total = sum(size for _, _, size in entries)
+        target = int(self.max_disk_bytes * 0.8)
+        for _, name, size in entries:
+            if total <= target:
+                break
+            try:
+                os.remove(os.path.join(self.cache_dir, name))
+                total -= size
+            except OSError:
+                continue
+        self._disk_bytes = total
@@ -1,88 +1,274 @@
+import asyncio
 import base64
 import io
 import logging
+import os
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from functools import lru_cache
+from xml.sax.saxutils import escape
 from PIL import Image as PILImage
 from reportlab.lib.pagesizes import A4
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Image, PageBreak
+from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Image, PageBreak, KeepTogether
 from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
 from reportlab.lib.enums import TA_CENTER, TA_LEFT
 from reportlab.pdfbase import pdfmetrics
 from reportlab.pdfbase.ttfonts import TTFont
 
+from app.config.settings import get_settings
 from app.models.pdf import PDFGenerateResponse
+from app.services.pdf_cache import PDFCache, pdf_cache_key
+from app.utils.fonts import find_fonts
 
 logger = logging.getLogger(__name__)
 
+# レイアウト（スタイル・余白・構成）を変えたら上げる。キャッシュ済みPDFが無効になる
+LAYOUT_VERSION = "1"
+
+# ReportLabのビルドはCPUを占有するため、イベントループの外で実行する
+_executor = ThreadPoolExecutor(max_workers=get_settings().pdf_max_workers, thread_name_prefix="pdf")
+_job_semaphore = asyncio.Semaphore(get_settings().pdf_max_concurrent_jobs)
+
+
+def _release_job_slot(future: asyncio.Future):
+    _job_semaphore.release()
+    # 待つのをやめたビルドの例外は誰も受け取らないので、ここで取り出しておく
+    if not future.cancelled():
+        future.exception()
+
+
+@lru_cache
+def get_pdf_cache() -> PDFCache:
+    s = get_settings()
+    return PDFCache(
+        s.pdf_cache_dir or os.path.join(tempfile.gettempdir(), "mongene-pdf-cache"),
+        max_disk_bytes=s.pdf_cache_max_bytes,
+        max_memory_bytes=s.pdf_cache_memory_max_bytes,
+    )
+
+
+@lru_cache
+def _register_japanese_font() -> str:
+    """日本語フォントを一度だけ登録し、使用するフォント名を返す"""
+    # CFF 形式のフォントは ReportLab で読めないため、登録できるまで次の候補を試す
+    for font in find_fonts():
+        font_name = font.family.replace(" ", "")
+        try:
+            pdfmetrics.registerFont(TTFont(font_name, font.path))
+            return font_name
+        except Exception:
+            continue
+    return "Helvetica"
+
+
+@dataclass(frozen=True)
+class PDFStyles:
+    title: ParagraphStyle
+    body: ParagraphStyle
+    booklet_title: ParagraphStyle
+    booklet_heading: ParagraphStyle
+    booklet_body: ParagraphStyle
+
+
+@lru_cache
+def _build_styles(font_name: str) -> PDFStyles:
+    """ParagraphStyleはビルド中に変更されないため、フォントごとに一度だけ作って共有する"""
+    styles = getSampleStyleSheet()
+    return PDFStyles(
+        title=ParagraphStyle(
+            "CustomTitle", parent=styles["Heading1"],
+            fontName=font_name, fontSize=16, spaceAfter=30, alignment=TA_CENTER,
+        ),
+        body=ParagraphStyle(
+            "CustomBody", parent=styles["Normal"],
+            fontName=font_name, fontSize=12, spaceAfter=12, alignment=TA_LEFT, leading=18,
+        ),
+        booklet_title=ParagraphStyle(
+            "BookletTitle", parent=styles["Heading1"],
+            fontName=font_name, fontSize=18, spaceAfter=24, alignment=TA_CENTER,
+        ),
+        booklet_heading=ParagraphStyle(
+            "BookletHeading", parent=styles["Heading2"],
+            fontName=font_name, fontSize=14, spaceBefore=12, spaceAfter=12,
+        ),
+        booklet_body=ParagraphStyle(
+            "BookletBody", parent=styles["Normal"],
+            fontName=font_name, fontSize=11, spaceAfter=8, alignment=TA_LEFT, leading=17,
+        ),
+    )
+
 
 class PDFService:
     def __init__(self):
-        self.japanese_font = "Helvetica"
-        for font_path, font_name in [
-            ("/usr/share/fonts/opentype/noto/NotoSansCJK-Regular.ttc", "NotoSansCJK"),
-            ("/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf", "DejaVuSans"),
-        ]:
-            try:
-                pdfmetrics.registerFont(TTFont(font_name, font_path))
-                self.japanese_font = font_name
-                break
-            except Exception:
-                continue
+        self.japanese_font = _register_japanese_font()
+        self.styles = _build_styles(self.japanese_font)
+        self.cache = get_pdf_cache()
+
+    @staticmethod
+    def pdf_cache_key(problem_text: str, image_base64: str | None = None, solution_text: str | None = None) -> str:
+        """1問分のPDFのキャッシュキー（ETagとしても使う）"""
+        return pdf_cache_key(LAYOUT_VERSION, "single", problem_text, image_base64, solution_text)
+
+    @staticmethod
+    def booklet_cache_key(problems: list[dict], title: str, include_solutions: bool) -> str:
+        parts = [title, "1" if include_solutions else "0"]
+        for p in problems:
+            parts.extend([p.get("content"), p.get("image_base64"), p.get("solution")])
+        return pdf_cache_key(LAYOUT_VERSION, "booklet", *parts)
 
     async def generate_pdf(
         self,
         problem_text: str,
         image_base64: str | None = None,
         solution_text: str | None = None,
+        cache_key: str | None = None,
     ) -> PDFGenerateResponse:
         try:
-            buf = io.BytesIO()
-            doc = SimpleDocTemplate(buf, pagesize=A4, rightMargin=72, leftMargin=72, topMargin=72, bottomMargin=18)
-            styles = getSampleStyleSheet()
-
-            title_style = ParagraphStyle(
-                "CustomTitle", parent=styles["Heading1"],
-                fontName=self.japanese_font, fontSize=16, spaceAfter=30, alignment=TA_CENTER,
-            )
-            body_style = ParagraphStyle(
-                "CustomBody", parent=styles["Normal"],
-                fontName=self.japanese_font, fontSize=12, spaceAfter=12, alignment=TA_LEFT, leading=18,
-            )
-
-            story = [Paragraph("数学問題", title_style), Spacer(1, 20)]
-
-            for para in problem_text.split("\n\n"):
-                if para.strip():
-                    story.append(Paragraph(para.replace("\n", "<br/>"), body_style))
-                    story.append(Spacer(1, 12))
-
-            if image_base64 and image_base64 != "mock_image_data":
-                try:
-                    img_data = base64.b64decode(image_base64)
-                    pil_img = PILImage.open(io.BytesIO(img_data))
-                    pil_img.thumbnail((400, 300), PILImage.Resampling.LANCZOS)
-                    img_buf = io.BytesIO()
-                    pil_img.save(img_buf, format="PNG")
-                    img_buf.seek(0)
-                    story.extend([Spacer(1, 20), Image(img_buf, width=pil_img.width, height=pil_img.height), Spacer(1, 20)])
-                except Exception as e:
-                    logger.warning(f"Image processing error: {e}")
-
-            if solution_text and solution_text.strip():
-                story.append(PageBreak())
-                sol_title = ParagraphStyle(
-                    "SolTitle", parent=styles["Heading1"],
-                    fontName=self.japanese_font, fontSize=16, spaceAfter=30, alignment=TA_CENTER,
-                )
-                story.append(Paragraph("解答・解説", sol_title))
-                story.append(Spacer(1, 20))
-                for para in solution_text.split("\n\n"):
-                    if para.strip():
-                        story.append(Paragraph(para.replace("\n", "<br/>"), body_style))
-                        story.append(Spacer(1, 12))
-
-            doc.build(story)
-            buf.seek(0)
-            return PDFGenerateResponse(success=True, pdf_base64=base64.b64encode(buf.getvalue()).decode())
+            key = cache_key or self.pdf_cache_key(problem_text, image_base64, solution_text)
+            pdf_bytes = await self._cached_job(key, self.build_pdf, problem_text, image_base64, solution_text)
+            return PDFGenerateResponse(success=True, pdf_base64=base64.b64encode(pdf_bytes).decode())
+        except TimeoutError:
+            logger.error("PDF generation timed out")
+            return PDFGenerateResponse(success=False, error="PDF生成がタイムアウトしました")
         except Exception as e:
             logger.exception("PDF generation failed")
             return PDFGenerateResponse(success=False, error=str(e))
+
+    def build_pdf(
+        self,
+        problem_text: str,
+        image_base64: str | None = None,
+        solution_text: str | None = None,
+    ) -> bytes:
+        """1問分のPDFを同期的に組み立てる"""
+        buf = io.BytesIO()
+        doc = SimpleDocTemplate(buf, pagesize=A4, rightMargin=72, leftMargin=72, topMargin=72, bottomMargin=18)
+
+        story = [Paragraph("数学問題", self.styles.title), Spacer(1, 20)]
+        story.extend(self._paragraphs(problem_text, self.styles.body))
+
+        img = self._image_flowable(image_base64)
+        if img:
+            story.extend([Spacer(1, 20), img, Spacer(1, 20)])
+
+        if solution_text and solution_text.strip():
+            story.append(PageBreak())
+            story.append(Paragraph("解答・解説", self.styles.title))
+            story.append(Spacer(1, 20))
+            story.extend(self._paragraphs(solution_text, self.styles.body))
+
+        doc.build(story)
+        return buf.getvalue()
+
+    # ── 問題集（複数問題）──
+
+    async def generate_booklet(
+        self,
+        problems: list[dict],
+        title: str = "数学問題",
+        include_solutions: bool = True,
+        cache_key: str | None = None,
+    ) -> bytes:
+        """複数問題を1つのPDFにまとめ、PDFバイト列を返す"""
+        key = cache_key or self.booklet_cache_key(problems, title, include_solutions)
+        return await self._cached_job(key, self.build_booklet, problems, title, include_solutions)
+
+    def build_booklet(
+        self,
+        problems: list[dict],
+        title: str = "数学問題",
+        include_solutions: bool = True,
+    ) -> bytes:
+        """問題パート（本文・図）と解答パートからなる問題集PDFを同期的に組み立てる"""
+        buf = io.BytesIO()
+        doc = SimpleDocTemplate(
+            buf, pagesize=A4, rightMargin=72, leftMargin=72, topMargin=72, bottomMargin=36, title=title,
+        )
+        title_style = self.styles.booklet_title
+        heading_style = self.styles.booklet_heading
+        body_style = self.styles.booklet_body
+
+        story = [Paragraph(escape(title), title_style)]
+        for i, problem in enumerate(problems, 1):
+            block = [Paragraph(f"問題 {i}", heading_style)]
+            block.extend(self._paragraphs(problem.get("content") or "", body_style))
+            img = self._image_flowable(problem.get("image_base64"))
+            if img:
+                block.extend([Spacer(1, 8), img])
+            story.append(KeepTogether(block))
+            story.append(Spacer(1, 24))
+
+        solutions = [(i, p.get("solution")) for i, p in enumerate(problems, 1) if (p.get("solution") or "").strip()]
+        if include_solutions and solutions:
+            story.append(PageBreak())
+            story.append(Paragraph("解答・解説", title_style))
+            for i, solution in solutions:
+                story.append(Paragraph(f"問題 {i}", heading_style))
+                story.extend(self._paragraphs(solution, body_style))
+
+        doc.build(story, onFirstPage=self._draw_page_number, onLaterPages=self._draw_page_number)
+        return buf.getvalue()
+
+    # ── ヘルパー ──
+
+    async def _cached_job(self, key: str, fn, *args) -> bytes:
+        """キャッシュにあればReportLabを通さずに返し、なければビルドして保存する"""
+        cached = await asyncio.to_thread(self.cache.get, key)
+        if cached is not None:
+            return cached
+        pdf_bytes = await self._run_job(fn, *args)
+        await asyncio.to_thread(self.cache.put, key, pdf_bytes)
+        return pdf_bytes
+
+    @staticmethod
+    async def _run_job(fn, *args):
+        """同時実行数を制限しつつワーカースレッドで実行し、タイムアウトを適用する
+
+        スレッドは途中で止められないため、タイムアウトやキャンセルで待つのをやめても
+        ビルドが実際に終わるまで同時実行の枠を返さない（止まらないビルドで枠以上のスレッドが動かないように）。
+        """
+        await _job_semaphore.acquire()
+        try:
+            future = asyncio.get_running_loop().run_in_executor(_executor, fn, *args)
+        except BaseException:
+            _job_semaphore.release()
+            raise
+        future.add_done_callback(_release_job_slot)
+        return await asyncio.wait_for(asyncio.shield(future), timeout=get_settings().pdf_job_timeout_seconds)
+
+    @staticmethod
+    def _paragraphs(text: str, style: ParagraphStyle) -> list:
+        flowables = []
+        for para in text.split("\n\n"):
+            if para.strip():
+                flowables.append(Paragraph(escape(para).replace("\n", "<br/>"), style))
+                flowables.append(Spacer(1, 12))
+        return flowables
+
+    @staticmethod
+    def _image_flowable(image_base64: str | None) -> Image | None:
+        if not image_base64 or image_base64 == "mock_image_data":
+            return None
+        try:
+            img_data = base64.b64decode(image_base64)
+            pil_img = PILImage.open(io.BytesIO(img_data))
+            pil_img.thumbnail((400, 300), PILImage.Resampling.LANCZOS)
+            img_buf = io.BytesIO()
+            pil_img.save(img_buf, format="PNG")
+            img_buf.seek(0)
+            return Image(img_buf, width=pil_img.width, height=pil_img.height)
+        except Exception as e:
+            logger.warning(f"Image processing error: {e}")
+            return None
+
+    def _draw_page_number(self, canvas, doc):
+        canvas.saveState()
+        canvas.setFont(self.japanese_font, 9)
+        canvas.drawCentredString(A4[0] / 2, 20, f"- {doc.page} -")
+        canvas.restoreState()
+
+
+@lru_cache
+def get_pdf_service() -> PDFService:
+    return PDFService()
@@ -1,40 +1,57 @@
 """問題生成サービス — 5段階/3問題生成、検索、CRUDを統合"""
+import asyncio
 import json
 import re
 import logging
 from typing import AsyncGenerator, Any
 from datetime import datetime, timezone
 
+from starlette.datastructures import UploadFile
+
 from app.config.settings import get_settings
 from app.core.database import get_supabase_client
-from app.clients.anthropic_client import AnthropicClient
-from app.clients.openai_client import OpenAIClient
-from app.clients.google_client import GoogleClient
-from app.services.geometry_service import GeometryService
+from app.core.tracing import span, traced_stream
+from app.clients import get_ai_clients
+from app.services.analysis_service import AnalysisService
+from app.services.render_pool import get_render_pool
 from app.utils.prompt_loader import (
     load_prompt,
     load_sample_problems,
     extract_python_code,
-    extract_problem_text,
-    extract_solution_text,
     remove_import_statements,
 )
+from app.utils.output_parser import parse_stage_output
+from app.utils.code_precheck import precheck_figure_code
+from app.utils.uploads import read_upload
 
 logger = logging.getLogger(__name__)
 
+# 一覧・検索で返す列（image_base64 は1件あたり数十〜数百KBになるため含めない）
+LIST_COLUMNS = (
+    "id,user_id,subject,prompt,content,solution,conversation_history,check_info,"
+    "opinion_profile,opinion_profile_v2,created_at,updated_at"
+)
+
+
+def insert_problems(db, user_id: str, rows: list[dict], counter: str | None = None, increment: int = 1) -> list[dict]:
+    """複数の問題を1文で保存する。counter を指定すると同じトランザクションで users の利用回数に increment を足す
+
+    rows は subject / prompt / content / solution / image_base64 / conversation_history / check_info を持つ dict。
+    保存した行（id 付き）を rows と同じ順で返す。生成・一括取り込みの保存はすべてここを通す。
+    """
+    with span("insert problems", "db", rows=len(rows), counter=counter or ""):
+        result = db.rpc("create_problems_batch", {
+            "p_user_id": user_id, "p_rows": rows, "p_counter": counter, "p_increment": increment,
+        }).execute()
+    return result.data or []
+
 
 class ProblemService:
     def __init__(self):
-        settings = get_settings()
-        self.clients: dict[str, Any] = {}
-        if settings.anthropic_api_key:
-            self.clients["claude"] = AnthropicClient(settings.anthropic_api_key)
-        if settings.openai_api_key:
-            self.clients["openai"] = OpenAIClient(settings.openai_api_key)
-        if settings.google_api_key:
-            self.clients["gemini"] = GoogleClient(settings.google_api_key)
-        self.geometry_service = GeometryService()
+        self.clients: dict[str, Any] = get_ai_clients()
+        self.render_pool = get_render_pool()
         self.db = get_supabase_client()
+        self.analysis = AnalysisService()
 
     def _get_client(self, api: str | None = None):
         api = api or get_settings().default_ai_provider
@@ -51,20 +68,52 @@ class ProblemService:
         data["user_id"] = user_id
         data["created_at"] = datetime.now(timezone.utc).isoformat()
         data["updated_at"] = data["created_at"]
-        result = self.db.table("problems").insert(data).execute()
+        with span("insert problems", "db"):
+            result = self.db.table("problems").insert(data).execute()
         return result.data[0] if result.data else {}
 
+    async def create_problems(self, user_id: str, rows: list[dict], count_generation: bool = True) -> list[dict]:
+        """生成した問題をまとめて保存し、生成回数も同じトランザクションで1回分増やす"""
+        counter = "problem_generation_count" if count_generation else None
+        return await asyncio.to_thread(insert_problems, self.db, user_id, rows, counter)
+
     async def get_user_problems(self, user_id: str) -> list[dict]:
-        result = self.db.table("problems").select("*").eq("user_id", user_id).order("created_at", desc=True).execute()
+        """一覧用。図の本体は返さず has_image だけを付ける（図は /problems/{id}/image で取得する）"""
+        result = (
+            self.db.table("problems").select(LIST_COLUMNS).eq("user_id", user_id)
+            .order("created_at", desc=True).execute()
+        )
+        return self._with_image_flags(user_id, result.data or [])
+
+    def _with_image_flags(self, user_id: str, problems: list[dict]) -> list[dict]:
+        # 図のある問題の id だけを別に読む（image_base64 が NULL / 空文字なら図なし）
+        result = self.db.table("problems").select("id").eq("user_id", user_id).neq("image_base64", "").execute()
+        with_image = {r["id"] for r in result.data or []}
+        for p in problems:
+            p["has_image"] = p["id"] in with_image
+        return problems
+
+    async def get_user_problem_versions(self, user_id: str) -> list[dict]:
+        """一覧の条件付きGET用に id と updated_at だけを読む"""
+        result = self.db.table("problems").select("id,updated_at").eq("user_id", user_id).execute()
         return result.data or []
 
+    async def get_problem_version(self, problem_id: int, user_id: str) -> dict | None:
+        result = self.db.table("problems").select("id,updated_at").eq("id", problem_id).eq("user_id", user_id).execute()
+        return result.data[0] if result.data else None
+
     async def get_problem(self, problem_id: int, user_id: str) -> dict | None:
         result = self.db.table("problems").select("*").eq("id", problem_id).eq("user_id", user_id).single().execute()
         return result.data
 
+    async def get_problem_image(self, problem_id: int, user_id: str) -> dict | None:
+        result = self.db.table("problems").select("image_base64,updated_at").eq("id", problem_id).eq("user_id", user_id).single().execute()
+        return result.data
+
     async def update_problem(self, problem_id: int, user_id: str, data: dict) -> dict | None:
         data["updated_at"] = datetime.now(timezone.utc).isoformat()
-        result = self.db.table("problems").update(data).eq("id", problem_id).eq("user_id", user_id).execute()
+        with span("update problems", "db"):
+            result = self.db.table("problems").update(data).eq("id", problem_id).eq("user_id", user_id).execute()
         return result.data[0] if result.data else None
 
     async def delete_problem(self, problem_id: int, user_id: str) -> bool:
@@ -77,7 +126,7 @@ class ProblemService:
     # ── 検索 ──
 
     async def search_problems(self, user_id: str, params: dict) -> list[dict]:
-        query = self.db.table("problems").select("*").eq("user_id", user_id)
+        query = self.db.table("problems").select(LIST_COLUMNS).eq("user_id", user_id)
         if params.get("keyword"):
             query = query.ilike("content", f"%{params['keyword']}%")
         if params.get("subject"):
@@ -94,7 +143,11 @@ class ProblemService:
             problems = [p for p in problems if self._matches_exam_session(p, params["exam_session"])]
         if params.get("is_checked") is not None:
             problems = [p for p in problems if self._matches_checked(p, params["is_checked"])]
-        return problems
+        if params.get("shapes"):
+            wanted = set(params["shapes"])
+            shapes = await self.analysis.detect_shapes_many(p.get("content") for p in problems)
+            problems = [p for p, found in zip(problems, shapes) if wanted & set(found)]
+        return self._with_image_flags(user_id, problems)
 
     def _matches_units(self, problem: dict, units: list[str]) -> bool:
         ci = problem.get("check_info") or {}
@@ -129,19 +182,17 @@ class ProblemService:
         system = self._build_generation_system_prompt(kwargs)
         try:
             response = await client.generate_content(prompt, model=model, system=system)
-            content = extract_problem_text(response)
-            solution = extract_solution_text(response)
-            python_code = extract_python_code(response)
+            parsed = parse_stage_output(response)
+            content = parsed.problem_text or response.strip()
+            solution = parsed.solution_text
+            python_code = parsed.python_code
 
             image_base64 = None
             if python_code:
-                code = remove_import_statements(python_code)
-                geo_result = await self.geometry_service.generate_custom_geometry(code, content)
-                if geo_result.success:
-                    image_base64 = geo_result.image_base64
+                history = [{"role": "user", "content": prompt}, {"role": "assistant", "content": response}]
+                image_base64 = await self._render_figure_code(client, model, history, python_code, content)
 
             problem_data = {
-                "user_id": user_id,
                 "subject": kwargs.get("subject", "math"),
                 "prompt": prompt,
                 "content": content or response,
@@ -152,8 +203,7 @@ class ProblemService:
                     {"role": "assistant", "content": response},
                 ],
             }
-            saved = await self.create_problem(user_id, problem_data)
-            await self._increment_generation_count(user_id)
+            [saved] = await self.create_problems(user_id, [problem_data])
             return saved
         except Exception as e:
             logger.exception("generate_problem failed")
@@ -161,6 +211,7 @@ class ProblemService:
 
     # ── 5段階問題生成 (SSE) ──
 
+    @traced_stream("five_stage")
     async def generate_five_stage_sse(
         self,
         user_id: str,
@@ -172,73 +223,97 @@ class ProblemService:
         client = self._get_client(api)
         model = model or get_settings().default_ai_model
 
-        samples = load_sample_problems()
-        sample_text = "\n\n---\n\n".join(s["content"] for s in samples[:3])
+        with span("build prompt", "prompt"):
+            samples = load_sample_problems()
+            sample_text = "\n\n---\n\n".join(s["content"] for s in samples[:3])
 
-        variables = {
-            "SAMPLE_PROBLEMS": sample_text,
-            "USER_PROMPT": prompt,
-            "UNITS": ", ".join(kwargs.get("units", [])),
-            "EXCLUDED_UNITS": ", ".join(kwargs.get("excluded_units", [])),
-        }
-        initial_prompt = load_prompt("five_stage_initial.txt", variables)
-        trigger = load_prompt("stage_trigger.txt")
+            variables = {
+                "SAMPLE_PROBLEMS": sample_text,
+                "USER_PROMPT": prompt,
+                "UNITS": ", ".join(kwargs.get("units", [])),
+                "EXCLUDED_UNITS": ", ".join(kwargs.get("excluded_units", [])),
+            }
+            initial_prompt = load_prompt("five_stage_initial.txt", variables)
+            trigger = load_prompt("stage_trigger.txt")
 
         history = []
         full_content = ""
         image_base64 = None
+        # ステージ3の図形はバックグラウンドで描画し、ステージ4・5のLLM呼び出しと並行させる
+        figure_task: asyncio.Task | None = None
+        figure_sent = False
+        llm_task: asyncio.Task | None = None
+
+        try:
+            for stage in range(1, 6):
+                yield {"event": "stage", "data": {"stage": stage, "total": 5, "message": self._stage_message(stage)}}
 
-        for stage in range(1, 6):
-            yield {"event": "stage", "data": {"stage": stage, "total": 5, "message": self._stage_message(stage)}}
+                if stage == 1:
+                    msg = initial_prompt if initial_prompt else prompt
+                else:
+                    msg = trigger
 
-            if stage == 1:
-                msg = initial_prompt if initial_prompt else prompt
-            else:
-                msg = trigger
+                history.append({"role": "user", "content": msg})
+                with span(f"stage {stage}", "stage", stage=stage):
+                    llm_task = asyncio.create_task(client.generate_with_history(history, model=model))
+                    # LLMの応答待ちの間に描画が終われば、その時点で figure を送る
+                    while figure_task is not None and not figure_sent and not llm_task.done():
+                        await asyncio.wait({llm_task, figure_task}, return_when=asyncio.FIRST_COMPLETED)
+                        if figure_task.done():
+                            figure_sent = True
+                            image_base64 = self._figure_result(figure_task)
+                            if image_base64:
+                                yield {"event": "figure", "data": {"image_base64": image_base64}}
+                    try:
+                        response = await llm_task
+                    except Exception as e:
+                        yield {"event": "error", "data": {"stage": stage, "error": str(e)}}
+                        return
 
-            history.append({"role": "user", "content": msg})
-            try:
-                response = await client.generate_with_history(history, model=model)
-            except Exception as e:
-                yield {"event": "error", "data": {"stage": stage, "error": str(e)}}
-                return
+                history.append({"role": "assistant", "content": response})
+                full_content += f"\n\n--- ステージ{stage} ---\n{response}"
 
-            history.append({"role": "assistant", "content": response})
-            full_content += f"\n\n--- ステージ{stage} ---\n{response}"
+                # ステージ3: 図形描画（完了を待たずに次のステージへ進む）
+                if stage == 3:
+                    code = extract_python_code(response)
+                    if code:
+                        figure_task = asyncio.create_task(
+                            self._render_figure_code(client, model, list(history), code)
+                        )
 
-            # ステージ3: 図形描画
-            if stage == 3:
-                code = extract_python_code(response)
-                if code:
-                    code = remove_import_statements(code)
-                    geo = await self.geometry_service.generate_custom_geometry(code, "")
-                    if geo.success:
-                        image_base64 = geo.image_base64
-                        yield {"event": "figure", "data": {"image_base64": image_base64}}
+                yield {"event": "stage_complete", "data": {"stage": stage, "content": response[:500]}}
 
-            yield {"event": "stage_complete", "data": {"stage": stage, "content": response[:500]}}
+            if figure_task is not None and not figure_sent:
+                await asyncio.wait({figure_task})
+                image_base64 = self._figure_result(figure_task)
+                if image_base64:
+                    yield {"event": "figure", "data": {"image_base64": image_base64}}
+        finally:
+            # エラーやクライアント切断で打ち切られた場合は描画と応答待ちの LLM 呼び出しも止める
+            for task in (figure_task, llm_task):
+                if task is not None and not task.done():
+                    task.cancel()
 
         # 保存
-        problem_text = extract_problem_text(full_content)
-        solution = extract_solution_text(full_content)
-        saved = await self.create_problem(user_id, {
+        parsed = parse_stage_output(full_content)
+        [saved] = await self.create_problems(user_id, [{
             "subject": kwargs.get("subject", "math"),
             "prompt": prompt,
-            "content": problem_text or full_content,
-            "solution": solution,
+            "content": parsed.problem_text or full_content,
+            "solution": parsed.solution_text,
             "image_base64": image_base64,
             "conversation_history": history,
-        })
-        await self._increment_generation_count(user_id)
+        }])
         yield {"event": "complete", "data": saved}
 
     # ── 3問題生成 (SSE) ──
 
+    @traced_stream("three_problems")
     async def generate_three_problems_sse(
         self,
         user_id: str,
-        problem_files: list[str] | None = None,
-        solution_files: list[str] | None = None,
+        problem_files: list[UploadFile] | None = None,
+        solution_files: list[UploadFile] | None = None,
         excluded_units: list[str] | None = None,
         api: str | None = None,
         model: str | None = None,
@@ -254,89 +329,102 @@ class ProblemService:
                 for f in problem_files:
                     try:
                         result = await google_client.generate_with_pdf(
-                            "この数学の問題を正確にテキストとして書き起こしてください。", f, model=model,
+                            "この数学の問題を正確にテキストとして書き起こしてください。", await read_upload(f), model=model,
                         )
                         extracted_text += result + "\n\n"
                     except Exception as e:
                         logger.warning(f"PDF extraction failed: {e}")
 
-        samples = load_sample_problems()
-        sample_text = "\n\n---\n\n".join(s["content"] for s in samples[:3])
+        with span("build prompt", "prompt"):
+            samples = load_sample_problems()
+            sample_text = "\n\n---\n\n".join(s["content"] for s in samples[:3])
 
-        variables = {
-            "SAMPLE_PROBLEMS": sample_text,
-            "ORIGINAL_PROBLEM": extracted_text or "（問題テキスト未提供）",
-            "EXCLUDED_UNITS": ", ".join(excluded_units or []),
-        }
-        initial_prompt = load_prompt("three_problem_generation.txt", variables)
+            variables = {
+                "SAMPLE_PROBLEMS": sample_text,
+                "ORIGINAL_PROBLEM": extracted_text or "（問題テキスト未提供）",
+                "EXCLUDED_UNITS": ", ".join(excluded_units or []),
+            }
+            initial_prompt = load_prompt("three_problem_generation.txt", variables)
+            trigger = load_prompt("stage_trigger.txt")
 
         patterns = ["A", "B", "C"]
         results: dict[str, dict] = {}
 
-        for pi, pattern in enumerate(patterns):
-            history: list[dict] = []
-            pattern_content = ""
-            pattern_image = None
+        figure_task: asyncio.Task | None = None
+        try:
+            for pi, pattern in enumerate(patterns):
+                history: list[dict] = []
+                pattern_content = ""
+                pattern_image = None
+                figure_task = None
+
+                for stage in range(1, 6):
+                    global_stage = pi * 5 + stage
+                    yield {
+                        "event": "stage",
+                        "data": {
+                            "stage": global_stage,
+                            "total": 15,
+                            "pattern": pattern,
+                            "pattern_stage": stage,
+                            "message": f"パターン{pattern} - {self._stage_message(stage)}",
+                        },
+                    }
+
+                    if stage == 1 and pi == 0:
+                        msg = initial_prompt
+                    elif stage == 1:
+                        msg = f"パターン{pattern}の生成を開始してください。"
+                    else:
+                        msg = trigger
+
+                    history.append({"role": "user", "content": msg})
+                    try:
+                        with span(f"stage {stage}", "stage", stage=global_stage, pattern=pattern):
+                            response = await client.generate_with_history(history, model=model)
+                    except Exception as e:
+                        yield {"event": "error", "data": {"stage": global_stage, "pattern": pattern, "error": str(e)}}
+                        break
 
-            for stage in range(1, 6):
-                global_stage = pi * 5 + stage
-                yield {
-                    "event": "stage",
-                    "data": {
-                        "stage": global_stage,
-                        "total": 15,
-                        "pattern": pattern,
-                        "pattern_stage": stage,
-                        "message": f"パターン{pattern} - {self._stage_message(stage)}",
-                    },
+                    history.append({"role": "assistant", "content": response})
+                    pattern_content += f"\n\n--- Stage {stage} ---\n{response}"
+
+                    if stage == 3:
+                        code = extract_python_code(response)
+                        if code:
+                            # 描画はステージ4・5と並行させ、パターンの最後で受け取る
+                            figure_task = asyncio.create_task(
+                                self._render_figure_code(client, model, list(history), code)
+                            )
+
+                    yield {"event": "stage_complete", "data": {"stage": global_stage, "pattern": pattern, "pattern_stage": stage}}
+
+                if figure_task is not None:
+                    await asyncio.wait({figure_task})
+                    pattern_image = self._figure_result(figure_task)
+
+                parsed = parse_stage_output(pattern_content)
+                results[pattern] = {
+                    "content": parsed.problem_text or pattern_content,
+                    "solution": parsed.solution_text,
+                    "image_base64": pattern_image,
                 }
-
-                if stage == 1 and pi == 0:
-                    msg = initial_prompt
-                elif stage == 1:
-                    msg = f"パターン{pattern}の生成を開始してください。"
-                else:
-                    msg = load_prompt("stage_trigger.txt")
-
-                history.append({"role": "user", "content": msg})
-                try:
-                    response = await client.generate_with_history(history, model=model)
-                except Exception as e:
-                    yield {"event": "error", "data": {"stage": global_stage, "pattern": pattern, "error": str(e)}}
-                    break
-
-                history.append({"role": "assistant", "content": response})
-                pattern_content += f"\n\n--- Stage {stage} ---\n{response}"
-
-                if stage == 3:
-                    code = extract_python_code(response)
-                    if code:
-                        code = remove_import_statements(code)
-                        geo = await self.geometry_service.generate_custom_geometry(code, "")
-                        if geo.success:
-                            pattern_image = geo.image_base64
-
-                yield {"event": "stage_complete", "data": {"stage": global_stage, "pattern": pattern, "pattern_stage": stage}}
-
-            results[pattern] = {
-                "content": extract_problem_text(pattern_content) or pattern_content,
-                "solution": extract_solution_text(pattern_content),
-                "image_base64": pattern_image,
-            }
-
-        # 保存
-        saved_problems = []
-        for pattern, data in results.items():
-            saved = await self.create_problem(user_id, {
+        finally:
+            # クライアント切断で打ち切られた場合は描画も止める
+            if figure_task is not None and not figure_task.done():
+                figure_task.cancel()
+
+        # 保存（3問と生成回数を1つのトランザクションで）
+        saved_problems = await self.create_problems(user_id, [
+            {
                 "subject": "math",
                 "prompt": f"3問題生成 パターン{pattern}",
                 "content": data["content"],
                 "solution": data["solution"],
                 "image_base64": data["image_base64"],
-            })
-            saved_problems.append(saved)
-
-        await self._increment_generation_count(user_id)
+            }
+            for pattern, data in results.items()
+        ])
         yield {"event": "complete", "data": {"problems": saved_problems}}
 
     # ── 図形再生成 ──
@@ -365,47 +453,79 @@ class ProblemService:
             response = await client.generate_with_history(history, model=model)
             code = extract_python_code(response)
             if code:
-                code = remove_import_statements(code)
-                geo = await self.geometry_service.generate_custom_geometry(code, "")
-                if geo.success:
-                    history.append({"role": "assistant", "content": response})
+                history.append({"role": "assistant", "content": response})
+                image_base64 = await self._render_figure_code(client, model, history, code)
+                if image_base64:
                     await self.update_problem(problem_id, user_id, {
-                        "image_base64": geo.image_base64,
+                        "image_base64": image_base64,
                         "conversation_history": history,
                     })
                     await self._increment_figure_regen_count(user_id)
-                    return {"success": True, "image_base64": geo.image_base64}
+                    return {"success": True, "image_base64": image_base64}
             return {"success": False, "error": "図形コードを抽出できませんでした"}
         except Exception as e:
             logger.exception("regenerate_geometry failed")
             return {"success": False, "error": str(e)}
 
-    # ── ユーザーカウント管理 ──
+    async def _render_figure_code(
+        self, client, model: str, history: list[dict], code: str, problem_text: str = ""
+    ) -> str | None:
+        """図形コードを静的チェックし、NGなら描画を試す前にLLMへ修正を依頼する。画像のbase64を返す"""
+        attempts = get_settings().figure_code_fix_attempts
+        for attempt in range(attempts + 1):
+            code = remove_import_statements(code)
+            check = precheck_figure_code(code)
+            if check.ok:
+                # 描画はワーカープロセスで行い、イベントループを塞がない
+                with span("render figure", "render", fix_attempts=attempt) as s:
+                    result = await self.render_pool.render({"python_code": code, "problem_text": problem_text})
+                    s.set(success=bool(result.get("success")))
+                if not result.get("success"):
+                    logger.warning(f"Figure rendering failed: {result.get('error')}")
+                return result.get("image_base64") if result.get("success") else None
+            if attempt == attempts:
+                break
+            logger.info(f"Figure code rejected by precheck, asking for a fix: {check.errors}")
+            fix_prompt = load_prompt("figure_code_fix.txt", {
+                "ERRORS": "\n".join(f"- {e}" for e in check.errors),
+                "CODE": code,
+            })
+            # 修正のやり取りは会話履歴に残さない
+            try:
+                fixed = await client.generate_with_history(
+                    history + [{"role": "user", "content": fix_prompt}], model=model,
+                )
+            except Exception as e:
+                logger.warning(f"Figure code fix request failed: {e}")
+                return None
+            code = extract_python_code(fixed)
+            if not code:
+                return None
+        logger.warning(f"Figure code still rejected after {attempts} fix attempt(s): {check.errors}")
+        return None
 
-    async def _increment_generation_count(self, user_id: str):
-        try:
-            result = self.db.table("users").select("problem_generation_count").eq("id", user_id).single().execute()
-            if result.data:
-                count = (result.data.get("problem_generation_count") or 0) + 1
-                self.db.table("users").update({"problem_generation_count": count}).eq("id", user_id).execute()
-        except Exception as e:
-            logger.warning(f"Failed to increment generation count: {e}")
+    @staticmethod
+    def _figure_result(task: asyncio.Task) -> str | None:
+        """完了した描画タスクの画像を取り出す。失敗していれば None"""
+        if task.cancelled():
+            return None
+        if task.exception() is not None:
+            logger.warning(f"Figure task failed: {task.exception()}")
+            return None
+        return task.result()
+
+    # ── ユーザーカウント管理 ──
 
     async def _increment_figure_regen_count(self, user_id: str):
+        # 問題は保存せず、利用回数だけを1文で加算する（読んでから書くと同時実行で数え漏れる）
         try:
-            result = self.db.table("users").select("figure_regeneration_count").eq("id", user_id).single().execute()
-            if result.data:
-                count = (result.data.get("figure_regeneration_count") or 0) + 1
-                self.db.table("users").update({"figure_regeneration_count": count}).eq("id", user_id).execute()
+            insert_problems(self.db, user_id, [], counter="figure_regeneration_count")
         except Exception as e:
             logger.warning(f"Failed to increment figure regen count: {e}")
 
     async def increment_preview_count(self, user_id: str):
         try:
-            result = self.db.table("users").select("preview_count").eq("id", user_id).single().execute()
-            if result.data:
-                count = (result.data.get("preview_count") or 0) + 1
-                self.db.table("users").update({"preview_count": count}).eq("id", user_id).execute()
+            insert_problems(self.db, user_id, [], counter="preview_count")
         except Exception as e:
             logger.warning(f"Failed to increment preview count: {e}")
 
@@ -0,0 +1,177 @@
+"""ユーザー提供のPythonコードを隔離したサブプロセスで実行する
+
+numpy / matplotlib を読み込み済みのフォークサーバー (sandbox_worker.py) を1つ常駐させ、
+ジョブごとにそこから fork した使い捨てのプロセスで実行する。ライブラリの読み込みは
+サーバー起動時の1回だけで済み、各ジョブは互いの状態を共有しない。
+CPU時間・メモリは子プロセス側の rlimit、経過時間は親側のタイムアウトで制限する。
+"""
+import asyncio
+import json
+import logging
+import os
+import signal
+import sys
+import tempfile
+from dataclasses import dataclass
+from functools import lru_cache
+
+from app.config.settings import get_settings
+from app.utils.code_precheck import precheck_code
+
+logger = logging.getLogger(__name__)
+
+_WORKER_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "sandbox_worker.py")
+
+# フォークサーバーに引き継ぐ環境変数。APIキーなどの秘密情報は渡さない
+_ENV_PASSTHROUGH = ("PATH", "HOME", "LANG", "LC_ALL", "TZ", "MPLCONFIGDIR")
+
+_STARTUP_TIMEOUT_SECONDS = 30.0
+
+
+@dataclass
+class SandboxResult:
+    success: bool
+    stdout: str = ""
+    stderr: str = ""
+    error: str | None = None
+
+
+class PythonSandbox:
+    def __init__(
+        self,
+        max_concurrent: int,
+        timeout_seconds: float,
+        cpu_seconds: int,
+        memory_bytes: int,
+        max_output_chars: int,
+    ):
+        self.timeout_seconds = timeout_seconds
+        self.cpu_seconds = cpu_seconds
+        self.memory_bytes = memory_bytes
+        self.max_output_chars = max_output_chars
+        self._max_concurrent = max_concurrent
+        self._semaphore: asyncio.Semaphore | None = None
+        self._start_lock: asyncio.Lock | None = None
+        self._server: asyncio.subprocess.Process | None = None
+        # ソケットは所有者だけがアクセスできる一時ディレクトリに置く
+        self._workdir = tempfile.mkdtemp(prefix="mongene-sandbox-")
+        self._socket_path = os.path.join(self._workdir, "fork.sock")
+
+    async def start(self):
+        """フォークサーバーを起動する（アプリの起動時に裏で呼んでおくと最初のリクエストも速い）"""
+        if self._start_lock is None:
+            self._start_lock = asyncio.Lock()
+        async with self._start_lock:
+            if self._server is not None and self._server.returncode is None:
+                return
+            if os.path.exists(self._socket_path):
+                os.remove(self._socket_path)
+            env = {k: os.environ[k] for k in _ENV_PASSTHROUGH if k in os.environ}
+            env.update(MPLBACKEND="Agg", OPENBLAS_NUM_THREADS="1", OMP_NUM_THREADS="1", MKL_NUM_THREADS="1")
+            proc = await asyncio.create_subprocess_exec(
+                sys.executable, "-I", _WORKER_SCRIPT, self._socket_path,
+                stdin=asyncio.subprocess.DEVNULL,
+                stdout=asyncio.subprocess.PIPE,
+                cwd=self._workdir,
+                env=env,
+                start_new_session=True,
+            )
+            try:
+                line = await asyncio.wait_for(proc.stdout.readline(), timeout=_STARTUP_TIMEOUT_SECONDS)
+            except asyncio.TimeoutError:
+                line = b""
+            except asyncio.CancelledError:
+                # 起動を待つ途中でアプリが終了した場合も、フォークサーバーを残さない
+                proc.kill()
+                await proc.wait()
+                raise
+            if line.strip() != b"ready":
+                proc.kill()
+                await proc.wait()
+                raise RuntimeError("サンドボックスのフォークサーバーを起動できませんでした")
+            self._server = proc
+            logger.info(f"Python sandbox fork server started (pid {proc.pid})")
+            if os.geteuid() == 0:
+                logger.warning("Python sandbox is running as root: RLIMIT_NPROC has no effect. Run the server as an unprivileged user")
+
+    async def shutdown(self):
+        if self._server is not None and self._server.returncode is None:
+            self._server.kill()
+            await self._server.wait()
+        self._server = None
+
+    async def run(self, code: str) -> SandboxResult:
+        # 子プロセスに渡す前に、危険な属性・モジュールへのアクセスを静的に弾く
+        check = precheck_code(code)
+        if not check.ok:
+            return SandboxResult(success=False, error="コードの事前チェックに失敗しました: " + " / ".join(check.errors))
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self._max_concurrent)
+        async with self._semaphore:
+            if self._server is None or self._server.returncode is not None:
+                await self.start()
+            job = {
+                "code": code,
+                "cpu_seconds": self.cpu_seconds,
+                "memory_bytes": self.memory_bytes,
+                "max_output_chars": self.max_output_chars,
+            }
+            reader, writer = await asyncio.open_unix_connection(self._socket_path, limit=2 * 1024 * 1024)
+            pid = None
+            finished = False
+            try:
+                pid = int(await reader.readline())
+                writer.write(json.dumps(job).encode() + b"\n")
+                await writer.drain()
+                out = await asyncio.wait_for(reader.read(), timeout=self.timeout_seconds)
+                finished = True
+            except asyncio.TimeoutError:
+                return SandboxResult(
+                    success=False, error=f"TimeoutError: 実行時間の上限（{self.timeout_seconds:g}秒）を超えました"
+                )
+            except ValueError:
+                return SandboxResult(success=False, error="サンドボックスのプロセスを起動できませんでした")
+            finally:
+                # タイムアウトやキャンセル時は子プロセスを止める
+                if pid is not None and not finished:
+                    self._kill(pid)
+                writer.close()
+        return self._parse_result(out)
+
+    # ── 内部処理 ──
+
+    @staticmethod
+    def _kill(pid: int):
+        try:
+            os.killpg(pid, signal.SIGKILL)
+        except (ProcessLookupError, PermissionError):
+            pass
+
+    def _parse_result(self, out: bytes) -> SandboxResult:
+        try:
+            data = json.loads(out.decode("utf-8"))
+        except (UnicodeDecodeError, json.JSONDecodeError):
+            data = None
+        if not isinstance(data, dict):
+            return SandboxResult(
+                success=False,
+                error="サンドボックスのプロセスが異常終了しました（CPU時間・メモリの上限超過など）",
+            )
+        return SandboxResult(
+            success=bool(data.get("success")),
+            stdout=data.get("stdout") or "",
+            stderr=data.get("stderr") or "",
+            error=data.get("error"),
+        )
+
+
+@lru_cache
+def get_python_sandbox() -> PythonSandbox:
+    s = get_settings()
+    return PythonSandbox(
+        max_concurrent=s.sandbox_max_concurrent,
+        timeout_seconds=s.sandbox_timeout_seconds,
+        cpu_seconds=s.sandbox_cpu_seconds,
+        memory_bytes=s.sandbox_memory_mb * 1024 * 1024,
+        max_output_chars=s.sandbox_max_output_chars,
+    )
@@ -0,0 +1,163 @@
+"""図形描画のワーカープロセスプール
+
+pyplot はプロセス内のグローバル状態を持つためスレッドでは並列化できない。
+matplotlib を読み込み済みのワーカープロセスに描画ジョブを振り分け、複数コアで並列に描画する。
+"""
+import asyncio
+import logging
+import multiprocessing
+import os
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from functools import lru_cache
+from typing import AsyncIterator
+
+from app.config.settings import get_settings
+
+logger = logging.getLogger(__name__)
+
+# ワーカープロセス内でのみ使う
+_worker_service = None
+
+
+def _init_worker():
+    global _worker_service
+    from app.services.geometry_service import figure_style, get_geometry_service
+
+    _worker_service = get_geometry_service()
+    figure_style()
+
+
+def _render_job(job: dict) -> dict:
+    """ワーカープロセスで1件描画し、結果を dict で返す"""
+    common = {
+        "image_format": job.get("image_format", "png"),
+        "image_size": job.get("image_size", "full"),
+        "variants": job.get("variants"),
+    }
+    if job.get("python_code") is not None:
+        coro = _worker_service.generate_custom_geometry(job["python_code"], job.get("problem_text", ""), **common)
+    else:
+        coro = _worker_service.generate_geometry(
+            job["shape_type"], job.get("parameters") or {}, job.get("labels"),
+            renderer=job.get("renderer", "matplotlib"), **common,
+        )
+    return asyncio.run(coro).model_dump()
+
+
+class RenderPool:
+    """ワーカー1つずつの ProcessPoolExecutor を max_workers 本並べ、ジョブは空いているものを1本占有して描画する
+
+    1つのプールを全ジョブで共有すると、止まらないジョブを kill したときに同じプールの他のジョブまで
+    BrokenProcessPool になる。プールをワーカーごとに分けておけば、止めるのはそのジョブのプロセスだけで済む。
+    """
+
+    def __init__(self, max_workers: int, timeout_seconds: float):
+        self.max_workers = max_workers
+        self.timeout_seconds = timeout_seconds
+        self._executors: list[ProcessPoolExecutor | None] = [None] * max_workers
+        # 空いているワーカーの番号。ジョブは描画を始める前に1つ取るので、タイムアウトは待ち行列ではなく描画そのものに掛かる
+        self._idle: asyncio.Queue[int] = asyncio.Queue()
+        for slot in range(max_workers):
+            self._idle.put_nowait(slot)
+
+    def _get_executor(self, slot: int) -> ProcessPoolExecutor:
+        executor = self._executors[slot]
+        if executor is None:
+            # 起動中のサーバーから fork するとスレッドやロックの状態を引き継ぐため spawn を使う
+            executor = self._executors[slot] = ProcessPoolExecutor(
+                max_workers=1,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_worker,
+            )
+        return executor
+
+    def _discard(self, slot: int, executor: ProcessPoolExecutor, kill: bool = False):
+        """壊れた・止まらないワーカーを捨てる。次のジョブで新しいワーカーを起動する"""
+        if self._executors[slot] is executor:
+            self._executors[slot] = None
+        if kill:
+            # 実行中の Future は取り消せないので、ワーカープロセスを止める（このプールのジョブはこれだけ）
+            for process in list((executor._processes or {}).values()):
+                process.terminate()
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    def _kill_if_running(self, slot: int, executor: ProcessPoolExecutor, future: Future):
+        if not future.done():
+            logger.warning("Abandoned render job is still running, restarting its worker")
+            self._discard(slot, executor, kill=True)
+
+    def _release_when_done(self, loop: asyncio.AbstractEventLoop, slot: int, future: Future):
+        """呼び出し側が去った後も描画が続いている間は、そのワーカーを他のジョブに渡さない"""
+
+        def release(_):
+            try:
+                loop.call_soon_threadsafe(self._idle.put_nowait, slot)
+            except RuntimeError:  # イベントループが閉じた後（シャットダウン中）
+                pass
+
+        future.add_done_callback(release)
+
+    async def render(self, job: dict) -> dict:
+        loop = asyncio.get_running_loop()
+        slot = await self._idle.get()
+        released = False
+        try:
+            for attempt in range(2):
+                executor = self._get_executor(slot)
+                deadline = loop.time() + self.timeout_seconds
+                try:
+                    future = executor.submit(_render_job, job)
+                    return await asyncio.wait_for(asyncio.wrap_future(future), timeout=self.timeout_seconds)
+                except asyncio.CancelledError:
+                    # 呼び出し側が切断しても描画は止まらないので、期限を過ぎても終わらなければそのワーカーを止める
+                    if not future.cancel():
+                        self._release_when_done(loop, slot, future)
+                        released = True
+                        loop.call_at(deadline, self._kill_if_running, slot, executor, future)
+                    raise
+                except asyncio.TimeoutError:
+                    logger.warning(f"Render job timed out after {self.timeout_seconds:g}s, restarting its worker")
+                    self._discard(slot, executor, kill=True)
+                    return {"success": False, "error": f"描画がタイムアウトしました（{self.timeout_seconds:g}秒）"}
+                except BrokenProcessPool:
+                    # ワーカーが異常終了したので起動し直してもう一度だけ試す
+                    logger.warning("Render worker died, restarting it")
+                    self._discard(slot, executor)
+                    if attempt:
+                        return {"success": False, "error": "描画ワーカーが異常終了しました"}
+            return {"success": False, "error": "描画ワーカーが異常終了しました"}
+        finally:
+            if not released:
+                self._idle.put_nowait(slot)
+
+    async def render_many(self, jobs: list[dict]) -> list[dict]:
+        """全ジョブを並列に描画し、投入順の結果を返す"""
+        return await asyncio.gather(*(self.render(job) for job in jobs))
+
+    async def render_as_completed(self, jobs: list[dict]) -> AsyncIterator[tuple[int, dict]]:
+        """完了した順に (インデックス, 結果) を返す"""
+
+        async def indexed(i: int, job: dict) -> tuple[int, dict]:
+            return i, await self.render(job)
+
+        tasks = [asyncio.create_task(indexed(i, job)) for i, job in enumerate(jobs)]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                yield await next_done
+        finally:
+            # クライアントが途中で切断した場合は未着手のジョブを取り消す
+            for task in tasks:
+                task.cancel()
+
+    def shutdown(self):
+        for slot, executor in enumerate(self._executors):
+            if executor is not None:
+                self._discard(slot, executor)
+
+
+@lru_cache
+def get_render_pool() -> RenderPool:
+    s = get_settings()
+    workers = s.render_max_workers or min(4, os.cpu_count() or 1)
+    return RenderPool(max_workers=workers, timeout_seconds=s.render_job_timeout_seconds)
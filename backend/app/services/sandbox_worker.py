@@ -0,0 +1,163 @@
+"""Python実行サンドボックスのフォークサーバー
+
+python_sandbox から `python -I sandbox_worker.py <socket>` として起動される単独スクリプト。
+app パッケージには依存しない。numpy / matplotlib を読み込んだ状態で Unix ソケットを待ち受け、
+接続ごとに fork した子プロセスで1ジョブだけ実行する（ジョブ間で状態を共有しない）。
+
+子プロセスとのやり取り:
+    子 → 親: 自分の PID を1行（タイムアウト時に親が kill するため）
+    親 → 子: ジョブの JSON を1行
+    子 → 親: 結果の JSON を送って終了
+"""
+import io
+import json
+import os
+import signal
+import socket
+import sys
+import traceback
+from types import SimpleNamespace
+
+os.environ.setdefault("MPLBACKEND", "Agg")
+
+import matplotlib.pyplot as plt  # noqa: E402
+import matplotlib.patches as patches  # noqa: E402
+import numpy as np  # noqa: E402
+
+import resource  # noqa: E402
+
+# 実行中のコードから読み込めるのは、あらかじめ渡してあるものと同じパッケージだけ
+_ALLOWED_IMPORTS = frozenset({"matplotlib", "numpy", "math"})
+
+
+def _safe_import(name, globals=None, locals=None, fromlist=(), level=0):
+    if level or name.split(".")[0] not in _ALLOWED_IMPORTS:
+        raise ImportError(f"モジュール '{name}' は import できません")
+    return __import__(name, globals, locals, fromlist, level)
+
+
+_SAFE_BUILTINS = {
+    "__import__": _safe_import,
+    "len": len, "range": range, "enumerate": enumerate, "zip": zip,
+    "map": map, "filter": filter, "list": list, "dict": dict,
+    "tuple": tuple, "set": set, "str": str, "int": int, "float": float,
+    "bool": bool, "min": min, "max": max, "abs": abs, "round": round,
+    "sum": sum, "print": print, "ord": ord, "chr": chr,
+}
+
+# io はメモリ上のバッファだけ渡す（io.open でファイルを読ませない）
+_SAFE_IO = SimpleNamespace(BytesIO=io.BytesIO, StringIO=io.StringIO)
+
+
+class _CPULimitExceeded(BaseException):
+    pass
+
+
+class _LimitedBuffer(io.StringIO):
+    """上限を超えた出力は捨て、切り詰めたことだけ記録する"""
+
+    def __init__(self, limit: int):
+        super().__init__()
+        self.limit = limit
+        self.truncated = False
+
+    def write(self, s: str) -> int:
+        room = self.limit - self.tell()
+        if room <= 0:
+            self.truncated = True
+            return len(s)
+        if len(s) > room:
+            self.truncated = True
+        return super().write(s[:room])
+
+
+def _on_sigxcpu(signum, frame):
+    raise _CPULimitExceeded()
+
+
+def _apply_limits(job: dict):
+    cpu_seconds = job.get("cpu_seconds", 0)
+    memory_bytes = job.get("memory_bytes", 0)
+    if cpu_seconds > 0:
+        # ソフトリミットで SIGXCPU を受けて結果を返し、それでも止まらなければハードリミットで殺される
+        signal.signal(signal.SIGXCPU, _on_sigxcpu)
+        used = resource.getrusage(resource.RUSAGE_SELF)
+        base = int(used.ru_utime + used.ru_stime)
+        resource.setrlimit(resource.RLIMIT_CPU, (base + cpu_seconds, base + cpu_seconds + 1))
+    if memory_bytes > 0:
+        resource.setrlimit(resource.RLIMIT_AS, (memory_bytes, memory_bytes))
+    resource.setrlimit(resource.RLIMIT_FSIZE, (0, 0))
+    # 子プロセスを作らせない（root 実行時は効かないため、サーバーは一般ユーザーで動かす）
+    resource.setrlimit(resource.RLIMIT_NPROC, (0, 0))
+
+
+def _run_job(job: dict) -> dict:
+    limit = job.get("max_output_chars", 1024 * 1024)
+    stdout, stderr = _LimitedBuffer(limit), _LimitedBuffer(limit)
+    sys.stdout, sys.stderr = stdout, stderr
+    safe_globals = {
+        # matplotlib / numpy のモジュール自体は渡さない（matplotlib.os などをたどらせないため）
+        "plt": plt, "patches": patches, "np": np, "io": _SAFE_IO, "Polygon": patches.Polygon, "__builtins__": _SAFE_BUILTINS,
+    }
+    result = {"success": True, "error": None}
+    try:
+        _apply_limits(job)
+        exec(compile(job["code"], "<sandbox>", "exec"), safe_globals)
+    except _CPULimitExceeded:
+        result = {"success": False, "error": f"TimeoutError: CPU時間の上限（{job['cpu_seconds']}秒）を超えました"}
+    except MemoryError:
+        result = {"success": False, "error": "MemoryError: メモリ使用量の上限を超えました"}
+    except BaseException as e:  # SystemExit なども結果として返す
+        traceback.print_exc(file=stderr)
+        result = {"success": False, "error": f"{type(e).__name__}: {e}"}
+    finally:
+        # 結果を書き出す前に、ユーザーコードが確保したメモリを手放す
+        safe_globals.clear()
+
+    for name, buf in (("stdout", stdout), ("stderr", stderr)):
+        text = buf.getvalue()
+        result[name] = text + ("\n...(出力が長すぎるため省略しました)" if buf.truncated else "")
+    return result
+
+
+def _serve_child(conn: socket.socket):
+    os.setsid()
+    signal.signal(signal.SIGCHLD, signal.SIG_DFL)
+    with conn, conn.makefile("rwb") as f:
+        f.write(f"{os.getpid()}\n".encode())
+        f.flush()
+        job = json.loads(f.readline())
+        result = _run_job(job)
+        f.write(json.dumps(result, ensure_ascii=False).encode())
+        f.flush()
+
+
+def main():
+    sock_path = sys.argv[1]
+    server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    server.bind(sock_path)
+    server.listen(128)
+    # 終了した子はカーネルに回収させる
+    signal.signal(signal.SIGCHLD, signal.SIG_IGN)
+    print("ready", flush=True)
+    # 以降、子プロセスが標準出力・標準エラーに書いても親には届かない
+    devnull = os.open(os.devnull, os.O_WRONLY)
+    os.dup2(devnull, 1)
+    os.dup2(devnull, 2)
+
+    while True:
+        conn, _ = server.accept()
+        if os.fork() == 0:
+            server.close()
+            code = 0
+            try:
+                _serve_child(conn)
+            except BaseException:
+                code = 1
+            finally:
+                os._exit(code)
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
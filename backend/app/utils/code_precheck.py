@@ -0,0 +1,248 @@
+"""LLMが生成した図形描画コードの静的チェック
+
+実行前に AST を調べ、構文エラー・禁止された名前や import・許可していないモジュールへの属性アクセス・
+描画呼び出しの欠落・終わらないループや反復回数の多すぎる入れ子のループを検出する。
+チェック済みのコードオブジェクトはソースのハッシュでキャッシュし、同じコードを再描画するときに parse / compile をやり直さない。
+"""
+import ast
+import hashlib
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from types import CodeType
+
+# import を許可するモジュール（先頭のパッケージ名で判定）
+ALLOWED_IMPORTS = frozenset({"matplotlib", "mpl_toolkits", "numpy", "math"})
+
+FORBIDDEN_NAMES = frozenset({
+    "eval", "exec", "compile", "open", "input", "__import__", "globals", "locals", "vars",
+    "getattr", "setattr", "delattr", "breakpoint", "exit", "quit", "help", "memoryview",
+})
+
+# 属性としてもたどらせない名前。許可したモジュール経由で他のモジュールに届くもの（matplotlib.os など）と、
+# ファイルを読み書きする関数（io.open, np.load など）
+FORBIDDEN_ATTRIBUTES = frozenset({
+    "os", "sys", "subprocess", "builtins", "importlib", "shutil", "socket", "ctypes", "pathlib",
+    "pickle", "marshal", "signal", "threading", "multiprocessing", "inspect", "gc", "urllib", "http",
+    "tempfile", "glob", "io", "cbook", "testing", "f2py", "ctypeslib", "distutils",
+    "open", "FileIO", "open_code", "load", "loadtxt", "genfromtxt", "fromfile", "tofile", "memmap",
+    "save", "savez", "savez_compressed", "savetxt", "open_memmap", "DataSource",
+    "environ", "getenv", "system", "popen", "listdir", "imread", "urlopen",
+})
+
+# いずれかが呼ばれていなければ、何も描かないコードとみなす
+PLOT_CALLS = frozenset({
+    "plot", "plot3D", "plot_surface", "plot_trisurf", "plot_wireframe", "scatter", "scatter3D",
+    "fill", "fill_between", "bar", "text", "text2D", "annotate", "arrow", "quiver",
+    "add_patch", "add_collection", "add_collection3d", "axhline", "axvline", "hlines", "vlines",
+    "imshow", "contour", "contourf", "pie", "hist",
+})
+
+# range() の上限。これを超える定数のループは描画コードとして不自然なので止める。
+# 入れ子のループ（内包表記を含む）では range の長さの積にも同じ上限を掛ける
+MAX_RANGE = 1_000_000
+
+_CACHE_SIZE = 256
+
+
+@dataclass(frozen=True)
+class PrecheckResult:
+    errors: list[str] = field(default_factory=list)
+    code: CodeType | None = None
+
+    @property
+    def ok(self) -> bool:
+        return not self.errors
+
+
+class _Checker(ast.NodeVisitor):
+    def __init__(self):
+        self.errors: list[str] = []
+        self.has_plot_call = False
+        self._iterations = 1
+        self._iterations_reported = False
+
+    def _error(self, node: ast.AST, message: str):
+        self.errors.append(f"{getattr(node, 'lineno', '?')}行目: {message}")
+
+    def visit_Import(self, node: ast.Import):
+        for alias in node.names:
+            self._check_module(node, alias.name)
+
+    def visit_ImportFrom(self, node: ast.ImportFrom):
+        if node.level:
+            self._error(node, "相対 import はできません")
+        self._check_module(node, node.module or "")
+        for alias in node.names:
+            if alias.name in FORBIDDEN_ATTRIBUTES:
+                self._error(node, f"'{alias.name}' は import できません")
+
+    def _check_module(self, node: ast.AST, module: str):
+        if not is_allowed_import(module):
+            self._error(node, f"モジュール '{module}' は import できません")
+
+    def visit_Name(self, node: ast.Name):
+        if node.id in FORBIDDEN_NAMES:
+            self._error(node, f"'{node.id}' は使用できません")
+
+    def visit_Attribute(self, node: ast.Attribute):
+        if node.attr.startswith("__") and node.attr.endswith("__"):
+            self._error(node, f"特殊属性 '{node.attr}' にはアクセスできません")
+        elif node.attr in FORBIDDEN_ATTRIBUTES:
+            self._error(node, f"属性 '{node.attr}' にはアクセスできません")
+        self.generic_visit(node)
+
+    def visit_Call(self, node: ast.Call):
+        func = node.func
+        name = func.attr if isinstance(func, ast.Attribute) else getattr(func, "id", None)
+        if name in PLOT_CALLS:
+            self.has_plot_call = True
+        if name == "range" and node.args:
+            bound = _const_int(node.args[1] if len(node.args) > 1 else node.args[0])
+            if bound is not None and bound > MAX_RANGE:
+                self._error(node, f"range の上限 {bound} が大きすぎます（{MAX_RANGE} まで）")
+        self.generic_visit(node)
+
+    def visit_For(self, node: ast.For):
+        saved = self._iterations
+        self.visit(node.target)
+        self.visit(node.iter)
+        self._enter_loop(node, node.iter)
+        for stmt in node.body:
+            self.visit(stmt)
+        self._iterations = saved
+        for stmt in node.orelse:
+            self.visit(stmt)
+
+    visit_AsyncFor = visit_For
+
+    def _visit_comprehension(self, node: ast.AST):
+        saved = self._iterations
+        for generator in node.generators:
+            self.visit(generator.target)
+            self.visit(generator.iter)
+            self._enter_loop(node, generator.iter)
+            for condition in generator.ifs:
+                self.visit(condition)
+        for name in ("elt", "key", "value"):
+            if hasattr(node, name):
+                self.visit(getattr(node, name))
+        self._iterations = saved
+
+    visit_ListComp = visit_SetComp = visit_DictComp = visit_GeneratorExp = _visit_comprehension
+
+    def _enter_loop(self, node: ast.AST, iterable: ast.AST):
+        length = _range_length(iterable)
+        if length is None:
+            return
+        self._iterations *= max(length, 1)
+        if self._iterations > MAX_RANGE and not self._iterations_reported:
+            self._iterations_reported = True
+            self._error(node, f"入れ子のループの反復回数（range の長さの積）が多すぎます（{MAX_RANGE} まで）")
+
+    def visit_While(self, node: ast.While):
+        always_true = isinstance(node.test, ast.Constant) and bool(node.test.value)
+        if always_true and not _has_exit(node.body):
+            self._error(node, "終了しない while ループがあります（break / return がありません）")
+        self.generic_visit(node)
+
+
+def _const_int(node: ast.AST) -> int | None:
+    """10 ** 9 のような定数だけの整数式を評価する（それ以外は None）"""
+    if isinstance(node, ast.Constant):
+        return node.value if isinstance(node.value, int) else None
+    if isinstance(node, ast.BinOp) and isinstance(node.op, (ast.Add, ast.Mult, ast.Pow)):
+        left, right = _const_int(node.left), _const_int(node.right)
+        if left is None or right is None:
+            return None
+        if isinstance(node.op, ast.Pow):
+            # 巨大な指数の評価自体で止まらないようにする
+            return left ** right if 0 <= right <= 64 and abs(left) <= 10 ** 6 else MAX_RANGE + 1
+        return left + right if isinstance(node.op, ast.Add) else left * right
+    return None
+
+
+def _range_length(node: ast.AST) -> int | None:
+    """range(...) の引数がすべて定数なら反復回数を返す（それ以外は None）"""
+    if not (isinstance(node, ast.Call) and getattr(node.func, "id", None) == "range" and node.args):
+        return None
+    args = [_const_int(arg) for arg in node.args]
+    if None in args or len(args) > 3:
+        return None
+    try:
+        return len(range(*args))
+    except OverflowError:
+        return MAX_RANGE + 1
+    except ValueError:
+        return None
+
+
+def _has_exit(body: list[ast.stmt]) -> bool:
+    """ループ本体（入れ子の関数・ループは除く）に break / return / raise があるか"""
+    stack = list(body)
+    while stack:
+        node = stack.pop()
+        if isinstance(node, (ast.Break, ast.Return, ast.Raise)):
+            return True
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.Lambda, ast.ClassDef, ast.For, ast.While)):
+            continue
+        stack.extend(ast.iter_child_nodes(node))
+    return False
+
+
+def is_allowed_import(module: str, fromlist=()) -> bool:
+    """許可したパッケージ配下で、禁止した名前を経由しない import か"""
+    parts = module.split(".")
+    if parts[0] not in ALLOWED_IMPORTS:
+        return False
+    return not any(name in FORBIDDEN_ATTRIBUTES for name in (*parts, *(fromlist or ())))
+
+
+def safe_import(name, globals=None, locals=None, fromlist=(), level=0):
+    """実行時の __import__ の代わり。静的チェックと同じ範囲のモジュールだけを読み込ませる"""
+    if level or not is_allowed_import(name, fromlist):
+        raise ImportError(f"モジュール '{name}' は import できません")
+    return __import__(name, globals, locals, fromlist, level)
+
+
+def _check(code: str, require_plot: bool) -> PrecheckResult:
+    try:
+        tree = ast.parse(code, filename="<figure>")
+    except SyntaxError as e:
+        return PrecheckResult(errors=[f"{e.lineno}行目: 構文エラー: {e.msg}"])
+    checker = _Checker()
+    checker.visit(tree)
+    if require_plot and not checker.has_plot_call:
+        checker.errors.append("図形を描画する呼び出し（plot, add_patch, text など）がありません")
+    if checker.errors:
+        return PrecheckResult(errors=checker.errors)
+    return PrecheckResult(code=compile(tree, "<figure>", "exec"))
+
+
+_cache: OrderedDict[tuple[str, bool], PrecheckResult] = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+def _cached_check(code: str, require_plot: bool) -> PrecheckResult:
+    key = (hashlib.sha256(code.encode()).hexdigest(), require_plot)
+    with _cache_lock:
+        cached = _cache.get(key)
+        if cached is not None:
+            _cache.move_to_end(key)
+            return cached
+    result = _check(code, require_plot)
+    with _cache_lock:
+        _cache[key] = result
+        if len(_cache) > _CACHE_SIZE:
+            _cache.popitem(last=False)
+    return result
+
+
+def precheck_figure_code(code: str) -> PrecheckResult:
+    """コードを静的にチェックし、問題なければコンパイル済みのコードオブジェクトを返す"""
+    return _cached_check(code, require_plot=True)
+
+
+def precheck_code(code: str) -> PrecheckResult:
+    """描画を伴わないコード（/execute-python）用。描画呼び出しの有無は問わない"""
+    return _cached_check(code, require_plot=False)
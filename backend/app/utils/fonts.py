@@ -0,0 +1,48 @@
+"""日本語フォントの検出（matplotlib・ReportLab・Pillow で共有）
+
+候補のフォントファイルをプロセス内で一度だけ調べ、ファミリー名とパスを返す。
+描画のたびに matplotlib のフォント一覧を走査したり、サービスごとに別々にパスを探したりしない。
+"""
+import os
+from dataclasses import dataclass
+from functools import lru_cache
+
+from PIL import ImageFont
+
+# (通常, 太字) のパス。上から順に優先する
+_FONT_CANDIDATES = [
+    ("/usr/share/fonts/opentype/noto/NotoSansCJK-Regular.ttc", "/usr/share/fonts/opentype/noto/NotoSansCJK-Bold.ttc"),
+    ("/usr/share/fonts/noto-cjk/NotoSansCJK-Regular.ttc", "/usr/share/fonts/noto-cjk/NotoSansCJK-Bold.ttc"),
+    ("/usr/share/fonts/opentype/ipaexfont-gothic/ipaexg.ttf", None),
+    ("/usr/share/fonts/opentype/ipafont-gothic/ipag.ttf", None),
+    ("/usr/share/fonts/truetype/takao-gothic/TakaoPGothic.ttf", None),
+    ("/usr/share/fonts/truetype/vlgothic/VL-PGothic-Regular.ttf", None),
+    ("/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf", "/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf"),
+]
+
+
+@dataclass(frozen=True)
+class FontInfo:
+    family: str  # フォント内のファミリー名（例: "Noto Sans CJK JP"）
+    path: str
+    bold_path: str | None = None
+
+
+@lru_cache
+def find_fonts() -> tuple[FontInfo, ...]:
+    """インストールされている候補フォントを優先順に返す"""
+    found = []
+    for path, bold_path in _FONT_CANDIDATES:
+        if not os.path.exists(path):
+            continue
+        try:
+            family, _ = ImageFont.truetype(path, 12).getname()
+        except OSError:
+            continue
+        found.append(FontInfo(family, path, bold_path if bold_path and os.path.exists(bold_path) else None))
+    return tuple(found)
+
+
+def primary_font() -> FontInfo | None:
+    fonts = find_fonts()
+    return fonts[0] if fonts else None
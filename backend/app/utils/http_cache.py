@@ -0,0 +1,23 @@
+"""HTTP条件付きリクエスト（ETag / If-None-Match）のヘルパー"""
+import hashlib
+
+# ブラウザに保存はさせるが、使う前に毎回 ETag で再検証させる
+REVALIDATE = "private, no-cache"
+# URL が内容のハッシュで決まり、同じ URL の中身が変わらないもの
+IMMUTABLE = "private, max-age=31536000, immutable"
+
+
+def etag_matches(if_none_match: str | None, etag: str) -> bool:
+    """If-None-Match が etag に一致するか（弱い比較）"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    target = etag.removeprefix("W/")
+    return any(t.strip().removeprefix("W/") == target for t in if_none_match.split(","))
+
+
+def weak_etag(*parts) -> str:
+    """parts（id・updated_at など）から弱い ETag を作る"""
+    digest = hashlib.sha1("\x1f".join(map(str, parts)).encode()).hexdigest()
+    return f'W/"{digest}"'
@@ -0,0 +1,94 @@
+"""図形画像のフォーマット・解像度ティア
+
+1回の描画結果（フル解像度PNG）から、用途ごとの縮小版やWebPを派生させる。
+"""
+import io
+
+from PIL import Image
+
+# 長辺の最大ピクセル数。None は描画したままのサイズ
+SIZE_TIERS: dict[str, int | None] = {
+    "full": None,
+    "large": 1200,
+    "medium": 640,
+    "thumb": 240,
+}
+
+MIME_TYPES: dict[str, str] = {
+    "png": "image/png",
+    "webp": "image/webp",
+    "svg": "image/svg+xml",
+}
+
+RASTER_FORMATS = ("png", "webp")
+
+
+def validate_image_options(image_format: str, image_size: str):
+    if image_format not in MIME_TYPES:
+        raise ValueError(f"未対応の画像形式です: {image_format}")
+    if image_size not in SIZE_TIERS:
+        raise ValueError(f"未対応の画像サイズです: {image_size}")
+
+
+def parse_image_specs(
+    image_format: str, image_size: str, variants: list[str] | None = None
+) -> list[tuple[str, str]]:
+    """先頭がメイン画像、続いて "形式:サイズ" で指定された追加バリアント"""
+    specs = [(image_format, image_size)]
+    for v in variants or []:
+        fmt, _, size = v.partition(":")
+        specs.append((fmt, size or "full"))
+    for fmt, size in specs:
+        validate_image_options(fmt, size)
+    return specs
+
+
+def derive_raster(png_bytes: bytes, image_format: str = "png", image_size: str = "full") -> bytes:
+    """フル解像度PNGから指定形式・サイズの画像を作る"""
+    max_side = SIZE_TIERS[image_size]
+    if image_format == "png" and max_side is None:
+        return png_bytes
+    img = Image.open(io.BytesIO(png_bytes))
+    if max_side is not None and max(img.size) > max_side:
+        img.thumbnail((max_side, max_side), Image.Resampling.LANCZOS)
+    buf = io.BytesIO()
+    if image_format == "webp":
+        # 線画は可逆圧縮の方が小さく、にじみも出ない
+        img.save(buf, format="WEBP", lossless=True, method=4)
+    else:
+        if img.mode not in ("RGB", "RGBA", "L", "P"):
+            img = img.convert("RGBA")
+        img.save(buf, format="PNG", optimize=True)
+    return buf.getvalue()
+
+
+def wants_raw_image(accept: str | None) -> bool:
+    """JSONではなく画像そのものを要求しているか"""
+    return bool(accept) and "image/" in accept and "application/json" not in accept
+
+
+def negotiate_format(accept: str | None, available: tuple[str, ...], default: str = "png") -> str | None:
+    """Acceptヘッダーから返せる画像形式を選ぶ。画像を受け付けない場合は None"""
+    if not accept:
+        return default
+    prefs: list[tuple[float, int, str]] = []
+    for i, item in enumerate(accept.split(",")):
+        media, _, params = item.strip().partition(";")
+        q = 1.0
+        for param in params.split(";"):
+            name, _, value = param.strip().partition("=")
+            if name == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        prefs.append((q, -i, media.strip().lower()))
+    for q, _, media in sorted(prefs, reverse=True):
+        if q <= 0:
+            continue
+        if media in ("*/*", "image/*"):
+            return default
+        for fmt in available:
+            if MIME_TYPES[fmt] == media:
+                return fmt
+    return None
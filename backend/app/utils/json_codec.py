@@ -0,0 +1,36 @@
+"""API レスポンスと SSE イベントの JSON エンコード
+
+orjson があればそれを使い、無ければ標準の json に戻る（出力はどちらも UTF-8 のまま、空白なし）。
+DB から取った dict は JSON の型だけでできているので、FastAPI の jsonable_encoder を通さずに直接エンコードする。
+それ以外の型（pydantic モデルなど）は default で jsonable_encoder に回す。
+"""
+import json
+from typing import Any
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson は必須依存だが、無い環境でも動くようにする
+    orjson = None
+
+_ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY if orjson else 0
+
+
+def dumps(obj: Any) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(obj, default=jsonable_encoder, option=_ORJSON_OPTIONS)
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":"), default=jsonable_encoder).encode()
+
+
+def sse_event(event: dict) -> bytes:
+    """SSE の1イベント（data 行）"""
+    return b"data: " + dumps(event) + b"\n\n"
+
+
+class FastJSONResponse(JSONResponse):
+    """アプリ既定のレスポンスクラス。大きな問題一覧はエンドポイントから直接返して jsonable_encoder を省く"""
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
@@ -0,0 +1,118 @@
+"""複数キーワードと数量の走査
+
+キーワードは共通接頭辞でまとめたトライ形の正規表現に、数値は直後の単位の候補と一緒に1つの正規表現に
+コンパイルしておき、どちらも findall で1回ずつ走査する（ループは C 側で回る）。
+1つの選言にまとめると re の先頭文字による絞り込みが効かなくなり遅くなるため、パターンは分けている。
+
+キーワードは各位置で最長のものを採り（「円錐」の中の「円」ではなく「円錐」）、タグはその語から付ける。
+採った語の内側に含まれる別のキーワードも出現として数える（keywords）。
+2文字以上の英字のキーワードは小文字・大文字・先頭だけ大文字の表記を同じ語として扱う。
+単位は大文字小文字を区別する（m と M、L と l は別のもの）。数値は全角数字も読む。
+"""
+import re
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Mapping, NamedTuple
+
+
+class Quantity(NamedTuple):
+    value: float
+    unit: str = ""  # 正規化した単位（cm, cm2, deg など）。無ければ空
+    kind: str = ""  # length / area / volume / angle / time / count など
+
+
+@dataclass
+class ScanResult:
+    keywords: dict[str, int] = field(default_factory=dict)  # キーワード → 出現回数
+    tags: set[str] = field(default_factory=set)
+    quantities: list[Quantity] = field(default_factory=list)
+
+    def numbers(self, kind: str | None = None) -> list[float]:
+        """正の数値（kind を指定すればその種類の量だけ）"""
+        return [q.value for q in self.quantities if q.value > 0 and (kind is None or q.kind == kind)]
+
+
+def _variants(word: str, fold_case: bool = True) -> set[str]:
+    if not fold_case or len(word) < 2 or not word.isascii():
+        return {word}
+    return {word, word.lower(), word.upper(), word.capitalize()}
+
+
+def _trie_pattern(words, fold_case: bool = True) -> str:
+    """語の集合を、共通接頭辞をまとめた正規表現にする（最長一致を優先）
+
+    英字は [aA] のような文字クラスにすると re の先頭文字による絞り込みが効かなくなるので、
+    大文字小文字の表記ゆれ（小文字・大文字・先頭だけ大文字）を別の語として加える。
+    """
+    trie: dict = {}
+    for word in words:
+        for variant in _variants(word, fold_case):
+            node = trie
+            for ch in variant:
+                node = node.setdefault(ch, {})
+            node[""] = {}
+
+    def emit(node: dict) -> str:
+        alts = [re.escape(ch) + emit(child) for ch, child in sorted(node.items()) if ch]
+        if not alts:
+            return ""
+        if "" in node:
+            return f"(?:{'|'.join(alts)})?"
+        return alts[0] if len(alts) == 1 else f"(?:{'|'.join(alts)})"
+
+    return emit(trie)
+
+
+class KeywordAutomaton:
+    """keywords: 語 → タグ、units: 単位の表記 → (正規化した単位, 種類)"""
+
+    def __init__(self, keywords: Mapping[str, tuple[str, ...]], units: Mapping[str, tuple[str, str]] | None = None):
+        # 表記ゆれも含めて、マッチした文字列から直接引けるようにしておく
+        self._keywords: dict[str, tuple[str, tuple[str, ...], tuple[str, ...]]] = {}
+        for word, tags in keywords.items():
+            inner = tuple(o for o in keywords if o != word and o.lower() in word.lower())
+            for variant in _variants(word):
+                self._keywords[variant] = (word, tuple(tags), inner)
+        self._units = dict(units or {})
+        self._unit_kinds = {u: kind for u, (_, kind) in self._units.items()}
+        self._keyword_re = re.compile(_trie_pattern(keywords))
+        unit = rf"(?:\s*({_trie_pattern(units, fold_case=False)}))?" if units else "()"
+        # \d より明示した文字クラスの方が re の先頭文字の絞り込みが効く
+        self._quantity_re = re.compile(rf"([0-9０-９]+(?:[.．][0-9０-９]+)?){unit}")
+
+    def scan(self, text: str, quantities: bool = True) -> ScanResult:
+        """quantities=False ならキーワードだけを走査する"""
+        result = ScanResult()
+        counts, tags, keywords = result.keywords, result.tags, self._keywords
+        for hit, n in Counter(self._keyword_re.findall(text)).items():
+            word, kw_tags, inner = keywords[hit]
+            counts[word] = counts.get(word, 0) + n
+            tags.update(kw_tags)
+            for other in inner:
+                counts[other] = counts.get(other, 0) + n
+        if quantities:
+            result.quantities = self.quantities(text)
+        return result
+
+    def quantities(self, text: str) -> list[Quantity]:
+        """数値と直後の単位だけを走査する"""
+        if "．" in text:
+            text = text.replace("．", ".")
+        units, none = self._units, ("", "")
+        return [Quantity(float(num), *units.get(unit, none)) for num, unit in self._quantity_re.findall(text)]
+
+    def numbers_by_kind(self, text: str) -> dict[str, list[float]]:
+        """種類（length など。単位なしは ""）ごとの正の数値。Quantity を作らない分 quantities より速い"""
+        if "．" in text:
+            text = text.replace("．", ".")
+        kinds = self._unit_kinds
+        result: dict[str, list[float]] = {}
+        for num, unit in self._quantity_re.findall(text):
+            value = float(num)
+            if value > 0:
+                kind = kinds.get(unit, "")
+                if kind in result:
+                    result[kind].append(value)
+                else:
+                    result[kind] = [value]
+        return result
@@ -0,0 +1,134 @@
+"""LLMステージ出力のセクションパーサー
+
+`---STAGEn_START/END---` マーカー、【問題文】/【解答・解説】などの見出し、
+フェンス付きコードブロックを1回の走査で切り出す。
+"""
+import re
+from dataclasses import dataclass, field
+
+# 行頭のトークンだけを拾う。本文はトークン間のスライスとして取り出すので行ごとの処理は発生しない。
+# 先頭を改行リテラルにしておくと、正規表現エンジンが改行位置だけを候補に探索できる
+_TOKEN_RE = re.compile(
+    r"\n[ \t]*(?:"
+    r"(?P<marker>---[ \t]*STAGE(?P<stage>\d+)_(?P<edge>START|END)[ \t]*---)"
+    # ProblemService が full_content を連結するときに挿入する区切り
+    r"|(?P<sep>---[ \t]*(?:ステージ|Stage)[ \t]*\d+[ \t]*---)[ \t]*$"
+    r"|(?P<fence>```)[ \t]*(?P<lang>[\w+-]*)[ \t]*$"
+    r"|【(?P<bracket>[^】\n]+)】"
+    r"|\#{1,6}[ \t]+(?P<markdown>[^\n#]+?)[ \t]*\#*[ \t]*$"
+    r"|(?P<label>問題|解答)[：:]"
+    r")",
+    re.MULTILINE,
+)
+# 言語指定のないフェンスは出力形式の外枠なので本文から取り除く
+_BARE_FENCE_RE = re.compile(r"^[ \t]*```[ \t]*$\n?", re.MULTILINE)
+
+_SOLUTION_HEADINGS = ("解答・解説", "解答", "解説")
+_PYTHON_LANGS = ("python", "py", "python3")
+
+# 見出しの種類ごとの優先度（小さいほど優先）。旧実装のフォールバック順と同じ
+_BRACKET, _MARKDOWN, _LABEL = 0, 1, 2
+
+
+@dataclass(frozen=True)
+class CodeBlock:
+    language: str
+    code: str
+
+
+@dataclass
+class ParsedOutput:
+    """ステージ出力の解析結果"""
+
+    problem_text: str = ""
+    solution_text: str = ""
+    code_blocks: list[CodeBlock] = field(default_factory=list)
+    stages: dict[int, str] = field(default_factory=dict)
+    sections: dict[str, str] = field(default_factory=dict)
+
+    @property
+    def python_code(self) -> str:
+        for block in self.code_blocks:
+            if block.language in _PYTHON_LANGS:
+                return block.code
+        return ""
+
+
+def _clean(text: str) -> str:
+    return _BARE_FENCE_RE.sub("", text).strip() if "```" in text else text.strip()
+
+
+def parse_stage_output(text: str) -> ParsedOutput:
+    """テキストを1回走査してセクション・コードブロック・ステージ本文を取り出す"""
+    result = ParsedOutput()
+    text = "\n" + text
+    problem: tuple[int, str] | None = None
+    solution: tuple[int, str] | None = None
+
+    # 現在のセクション: (名前, 種類, 本文の開始位置)
+    section: tuple[str, int, int] | None = None
+    code: tuple[str, int] | None = None
+    stage: tuple[int, int] | None = None
+
+    def close_section(end: int):
+        nonlocal section, problem, solution
+        if section is None:
+            return
+        name, kind, start = section
+        body = _clean(text[start:end])
+        result.sections.setdefault(name, body)
+        if name == "問題文" or (kind == _LABEL and name == "問題"):
+            if problem is None or kind < problem[0]:
+                problem = (kind, body)
+        elif name in _SOLUTION_HEADINGS:
+            if solution is None or kind < solution[0]:
+                solution = (kind, body)
+        section = None
+
+    for m in _TOKEN_RE.finditer(text):
+        kind = m.lastgroup
+        pos = m.start()
+
+        # コードブロック内では閉じフェンス以外を無視する
+        if code is not None:
+            if kind in ("fence", "lang"):
+                lang, start = code
+                result.code_blocks.append(CodeBlock(lang, text[start:pos].strip()))
+                code = None
+            continue
+
+        if kind == "marker":
+            close_section(pos)
+            if m.group("edge") == "START":
+                stage = (int(m.group("stage")), m.end())
+            elif stage is not None:
+                result.stages.setdefault(stage[0], text[stage[1]:pos].strip())
+                stage = None
+        elif kind == "sep":
+            close_section(pos)
+        elif kind in ("fence", "lang"):
+            if m.group("lang"):
+                code = (m.group("lang").lower(), m.end() + 1)
+        elif section is not None and section[0] in _SOLUTION_HEADINGS:
+            # 解答セクションは小見出しを含むことがあるため、ステージ境界まで続ける
+            continue
+        elif kind == "bracket":
+            close_section(pos)
+            section = (m.group("bracket").strip(), _BRACKET, m.end())
+        elif kind == "markdown":
+            close_section(pos)
+            section = (m.group("markdown").strip(), _MARKDOWN, m.end())
+        elif kind == "label" and (section is None or section[1] == _LABEL):
+            close_section(pos)
+            section = (m.group("label"), _LABEL, m.end())
+
+    end = len(text)
+    if code is not None:
+        result.code_blocks.append(CodeBlock(code[0], text[code[1]:end].strip()))
+    if stage is not None:
+        result.stages.setdefault(stage[0], text[stage[1]:end].strip())
+    close_section(end)
+
+    result.problem_text = problem[1] if problem else ""
+    result.solution_text = solution[1] if solution else ""
+    return result
@@ -1,76 +1,189 @@
 import os
 import re
 import logging
+import threading
+from dataclasses import dataclass, field
+
+from app.config.settings import get_settings
+from app.utils.output_parser import parse_stage_output
 
 logger = logging.getLogger(__name__)
 
 PROMPTS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), "prompts")
 DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), "data")
 
+# {USER_PROMPT} 形式のプレースホルダ。LaTeXの {x} や f文字列の {result_1} とは衝突しない
+_PLACEHOLDER_RE = re.compile(r"\{([A-Z][A-Z0-9_]+)\}")
+
+
+@dataclass(frozen=True)
+class PromptTemplate:
+    """読み込み時にトークン化済みのプロンプトテンプレート
+
+    segments はリテラルとプレースホルダ名が交互に並ぶ（偶数番目がリテラル）。
+    """
+
+    name: str
+    source: str
+    mtime: float
+    segments: tuple[str, ...]
+    placeholders: frozenset[str] = field(default_factory=frozenset)
+
+    @classmethod
+    def parse(cls, name: str, source: str, mtime: float = 0.0) -> "PromptTemplate":
+        segments: list[str] = []
+        pos = 0
+        for m in _PLACEHOLDER_RE.finditer(source):
+            segments.append(source[pos:m.start()])
+            segments.append(m.group(1))
+            pos = m.end()
+        segments.append(source[pos:])
+        return cls(
+            name=name,
+            source=source,
+            mtime=mtime,
+            segments=tuple(segments),
+            placeholders=frozenset(segments[1::2]),
+        )
+
+    def render(self, variables: dict[str, str] | None = None) -> str:
+        """1パスで変数を埋め込む。未指定のプレースホルダはそのまま残し警告する"""
+        if len(self.segments) == 1:
+            return self.source
+        variables = variables or {}
+        missing = self.placeholders.difference(variables)
+        if missing:
+            logger.warning(f"Unfilled placeholders in {self.name}: {', '.join(sorted(missing))}")
+        out = list(self.segments)
+        for i in range(1, len(out), 2):
+            key = out[i]
+            out[i] = str(variables[key]) if key in variables else f"{{{key}}}"
+        return "".join(out)
+
+
+class PromptRegistry:
+    """prompts/ と data/ のファイルを一度だけ読み込んで保持するレジストリ
+
+    hot_reload が有効な場合はアクセス時に mtime を確認し、変更されたファイルだけ読み直す。
+    """
+
+    def __init__(self, prompts_dir: str = PROMPTS_DIR, data_dir: str = DATA_DIR, hot_reload: bool = False):
+        self.prompts_dir = prompts_dir
+        self.data_dir = data_dir
+        self.hot_reload = hot_reload
+        self._lock = threading.Lock()
+        self._prompts: dict[str, PromptTemplate] = {}
+        self._samples: tuple[PromptTemplate, ...] = ()
+        self._data_dir_mtime = 0.0
+        self._load_dir(self.prompts_dir, ".txt", self._prompts)
+        self._load_samples()
+
+    # ── 読み込み ──
+
+    @staticmethod
+    def _mtime(path: str) -> float:
+        try:
+            return os.stat(path).st_mtime
+        except OSError:
+            return 0.0
+
+    @staticmethod
+    def _read(filepath: str, name: str) -> PromptTemplate | None:
+        try:
+            mtime = os.stat(filepath).st_mtime
+            with open(filepath, "r", encoding="utf-8") as f:
+                return PromptTemplate.parse(name, f.read(), mtime)
+        except Exception as e:
+            logger.error(f"Failed to load {filepath}: {e}")
+            return None
+
+    def _load_dir(self, directory: str, suffix: str, target: dict[str, PromptTemplate]):
+        if not os.path.isdir(directory):
+            logger.error(f"Prompt directory not found: {directory}")
+            return
+        for filename in sorted(os.listdir(directory)):
+            if filename.endswith(suffix):
+                tpl = self._read(os.path.join(directory, filename), filename)
+                if tpl:
+                    target[filename] = tpl
+
+    def _load_samples(self):
+        samples: dict[str, PromptTemplate] = {}
+        self._data_dir_mtime = self._mtime(self.data_dir)
+        self._load_dir(self.data_dir, ".md", samples)
+        self._samples = tuple(samples.values())
+
+    def _refresh(self, filename: str) -> PromptTemplate | None:
+        filepath = os.path.join(self.prompts_dir, filename)
+        current = self._prompts.get(filename)
+        mtime = self._mtime(filepath)
+        if mtime and (current is None or mtime != current.mtime):
+            with self._lock:
+                tpl = self._read(filepath, filename)
+                if tpl:
+                    self._prompts[filename] = tpl
+                    current = tpl
+        return current
+
+    # ── 公開API ──
+
+    def get(self, filename: str) -> PromptTemplate | None:
+        if self.hot_reload:
+            return self._refresh(filename)
+        return self._prompts.get(filename)
+
+    def render(self, filename: str, variables: dict[str, str] | None = None) -> str:
+        tpl = self.get(filename)
+        if tpl is None:
+            logger.error(f"Prompt file not found: {os.path.join(self.prompts_dir, filename)}")
+            return ""
+        return tpl.render(variables)
+
+    def samples(self) -> list[dict]:
+        if self.hot_reload:
+            stale = self._mtime(self.data_dir) != self._data_dir_mtime or any(
+                self._mtime(os.path.join(self.data_dir, s.name)) != s.mtime for s in self._samples
+            )
+            if stale:
+                with self._lock:
+                    self._load_samples()
+        return [{"filename": s.name, "content": s.source} for s in self._samples]
+
+
+_registry: PromptRegistry | None = None
+
+
+def get_prompt_registry() -> PromptRegistry:
+    """プロセス共有のレジストリを返す（初回呼び出し時に読み込む）"""
+    global _registry
+    if _registry is None:
+        _registry = PromptRegistry(hot_reload=get_settings().prompt_hot_reload)
+    return _registry
+
 
 def load_prompt(filename: str, variables: dict[str, str] | None = None) -> str:
     """プロンプトファイルを読み込み、変数を置換する"""
-    filepath = os.path.join(PROMPTS_DIR, filename)
-    try:
-        with open(filepath, "r", encoding="utf-8") as f:
-            content = f.read()
-        if variables:
-            for key, value in variables.items():
-                content = content.replace(f"{{{key}}}", str(value))
-        return content
-    except FileNotFoundError:
-        logger.error(f"Prompt file not found: {filepath}")
-        return ""
+    return get_prompt_registry().render(filename, variables)
 
 
 def load_sample_problems() -> list[dict]:
     """サンプル問題ファイル（空間図形*.md）を読み込む"""
-    samples = []
-    for filename in sorted(os.listdir(DATA_DIR)):
-        if filename.endswith(".md"):
-            filepath = os.path.join(DATA_DIR, filename)
-            try:
-                with open(filepath, "r", encoding="utf-8") as f:
-                    content = f.read()
-                samples.append({"filename": filename, "content": content})
-            except Exception as e:
-                logger.error(f"Failed to load sample {filename}: {e}")
-    return samples
+    return get_prompt_registry().samples()
 
 
 def extract_python_code(text: str) -> str:
     """テキストからPythonコードブロックを抽出する"""
-    pattern = r"```python\s*\n(.*?)```"
-    matches = re.findall(pattern, text, re.DOTALL)
-    return matches[0].strip() if matches else ""
+    return parse_stage_output(text).python_code
 
 
 def extract_problem_text(text: str) -> str:
     """問題文を抽出する"""
-    patterns = [
-        r"【問題文】\s*\n(.*?)(?=【|$)",
-        r"## 問題文\s*\n(.*?)(?=##|$)",
-        r"問題[：:]\s*\n?(.*?)(?=解答|解説|$)",
-    ]
-    for pattern in patterns:
-        match = re.search(pattern, text, re.DOTALL)
-        if match:
-            return match.group(1).strip()
-    return text.strip()
+    return parse_stage_output(text).problem_text or text.strip()
 
 
 def extract_solution_text(text: str) -> str:
     """解答・解説を抽出する"""
-    patterns = [
-        r"【解答・解説】\s*\n(.*?)$",
-        r"## 解答\s*\n(.*?)$",
-        r"解答[：:]\s*\n?(.*?)$",
-    ]
-    for pattern in patterns:
-        match = re.search(pattern, text, re.DOTALL)
-        if match:
-            return match.group(1).strip()
-    return ""
+    return parse_stage_output(text).solution_text
 
 
 def remove_import_statements(code: str) -> str:
@@ -0,0 +1,166 @@
+"""matplotlibを使わない軽量レンダラー
+
+solid_geometry の投影済みシーンから、SVGを直接文字列で組み立てる。
+PNGは Pillow の ImageDraw で2倍サイズに描いて縮小し、アンチエイリアスの代わりにする。
+"""
+import io
+from functools import lru_cache
+from xml.sax.saxutils import escape
+
+import numpy as np
+from PIL import Image, ImageDraw, ImageFont
+
+from app.utils.fonts import find_fonts
+from app.utils.solid_geometry import Scene
+
+# 既存の matplotlib 描画 (8x6インチ, 150dpi) に合わせた既定サイズ
+DEFAULT_WIDTH = 1200
+DEFAULT_HEIGHT = 900
+
+_EDGE_COLOR = "#0000ff"
+_FACE_FILL = (173, 216, 230, 38)  # lightblue, alpha 0.15
+_SECTION_FILL = (255, 165, 0, 102)  # orange, alpha 0.4
+_SECTION_EDGE = "#ff8c00"
+_LABEL_COLOR = "#ff0000"
+_SUPERSAMPLE = 2
+
+
+class _Viewport:
+    """シーン座標 → ピクセル座標（y軸反転、縦横比維持で中央寄せ）"""
+
+    def __init__(self, bounds: tuple[float, float, float, float], width: int, height: int):
+        xmin, ymin, xmax, ymax = bounds
+        self.scale = min(width / max(xmax - xmin, 1e-9), height / max(ymax - ymin, 1e-9))
+        self.ox = (width - (xmax - xmin) * self.scale) / 2 - xmin * self.scale
+        self.oy = (height - (ymax - ymin) * self.scale) / 2 + ymax * self.scale
+
+    def __call__(self, pts: np.ndarray) -> np.ndarray:
+        pts = np.asarray(pts, dtype=float)
+        out = np.empty_like(pts)
+        out[..., 0] = pts[..., 0] * self.scale + self.ox
+        out[..., 1] = self.oy - pts[..., 1] * self.scale
+        return out
+
+
+# ── SVG ──
+
+
+def _path_data(polylines, closed: bool) -> str:
+    end = "Z" if closed else ""
+    return "".join(
+        "M" + "L".join(f"{x:.1f},{y:.1f}" for x, y in line) + end for line in polylines
+    )
+
+
+def render_svg(scene: Scene, width: int = DEFAULT_WIDTH, height: int = DEFAULT_HEIGHT) -> bytes:
+    vp = _Viewport(scene.bounds, width, height)
+    lw = max(width, height) / 400
+    parts = [
+        f'<svg xmlns="http://www.w3.org/2000/svg" width="{width}" height="{height}" '
+        f'viewBox="0 0 {width} {height}">',
+        '<rect width="100%" height="100%" fill="#ffffff"/>',
+    ]
+    if scene.faces:
+        parts.append(
+            f'<path d="{_path_data((vp(f) for f in scene.faces), True)}" fill="lightblue" fill-opacity="0.15"/>'
+        )
+    if scene.section is not None:
+        parts.append(
+            f'<path d="{_path_data([vp(scene.section)], True)}" fill="orange" fill-opacity="0.4" '
+            f'stroke="{_SECTION_EDGE}" stroke-width="{lw * 0.75:.1f}"/>'
+        )
+    if len(scene.hidden_segments):
+        parts.append(
+            f'<path d="{_path_data(vp(scene.hidden_segments), False)}" fill="none" stroke="{_EDGE_COLOR}" '
+            f'stroke-width="{lw * 0.6:.1f}" stroke-dasharray="{lw * 3:.1f},{lw * 2:.1f}"/>'
+        )
+    if len(scene.visible_segments):
+        parts.append(
+            f'<path d="{_path_data(vp(scene.visible_segments), False)}" fill="none" stroke="{_EDGE_COLOR}" '
+            f'stroke-width="{lw:.1f}" stroke-linecap="round" stroke-linejoin="round"/>'
+        )
+    for x, y in vp(scene.points):
+        parts.append(f'<circle cx="{x:.1f}" cy="{y:.1f}" r="{lw * 2.5:.1f}" fill="red"/>')
+    font_size = max(width, height) / 45
+    for tx, ty, text in scene.texts:
+        x, y = vp(np.array([tx, ty]))
+        parts.append(
+            f'<text x="{x:.1f}" y="{y:.1f}" font-size="{font_size:.0f}" font-weight="bold" fill="{_LABEL_COLOR}" '
+            'font-family="Noto Sans CJK JP, sans-serif" text-anchor="middle" dominant-baseline="central">'
+            f"{escape(text)}</text>"
+        )
+    parts.append("</svg>")
+    return "".join(parts).encode()
+
+
+# ── PNG (Pillow) ──
+
+
+@lru_cache(maxsize=8)
+def _font(size: int) -> ImageFont.FreeTypeFont:
+    # ラベルは太字で描くので、各フォントの太字を優先する
+    paths = [p for font in find_fonts() for p in (font.bold_path, font.path) if p]
+    for path in paths:
+        try:
+            return ImageFont.truetype(path, size)
+        except OSError:
+            continue
+    return ImageFont.load_default(size=size)
+
+
+def _dash(segments: np.ndarray, dash: float, gap: float) -> np.ndarray:
+    """線分 (E, 2, 2) を破線の短い線分 (M, 2, 2) に分割する"""
+    if not len(segments):
+        return segments
+    start, vec = segments[:, 0], segments[:, 1] - segments[:, 0]
+    length = np.linalg.norm(vec, axis=1)
+    counts = np.ceil(length / (dash + gap)).astype(int)
+    seg_idx = np.repeat(np.arange(len(segments)), counts)
+    k = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+    safe = np.where(length > 0, length, 1.0)[seg_idx]
+    t0 = k * (dash + gap) / safe
+    t1 = np.minimum(t0 + dash / safe, 1.0)
+    d = vec[seg_idx]
+    return np.stack([start[seg_idx] + t0[:, None] * d, start[seg_idx] + t1[:, None] * d], axis=1)
+
+
+def render_png(scene: Scene, width: int = DEFAULT_WIDTH, height: int = DEFAULT_HEIGHT) -> bytes:
+    ss = _SUPERSAMPLE
+    w, h = width * ss, height * ss
+    vp = _Viewport(scene.bounds, w, h)
+    lw = max(w, h) / 400
+
+    img = Image.new("RGB", (w, h), "white")
+    # "RGBA" モードの Draw は塗りの不透明度をその場で合成するので、重ね合わせ用の画像が要らない
+    draw = ImageDraw.Draw(img, "RGBA")
+    for face in scene.faces:
+        draw.polygon([tuple(p) for p in vp(face)], fill=_FACE_FILL)
+    if scene.section is not None:
+        pts = [tuple(p) for p in vp(scene.section)]
+        draw.polygon(pts, fill=_SECTION_FILL)
+        draw.line(pts + pts[:1], fill=_SECTION_EDGE, width=max(1, round(lw * 0.75)))
+    for a, b in _dash(vp(scene.hidden_segments), lw * 3, lw * 2):
+        draw.line([tuple(a), tuple(b)], fill=_EDGE_COLOR, width=max(1, round(lw * 0.6)))
+    width_px = max(1, round(lw))
+    for a, b in vp(scene.visible_segments):
+        draw.line([tuple(a), tuple(b)], fill=_EDGE_COLOR, width=width_px)
+    # 線の継ぎ目が欠けないよう端点に丸を打つ
+    joints = np.unique(np.round(vp(scene.visible_segments).reshape(-1, 2), 1), axis=0)
+    r = width_px / 2
+    for x, y in joints:
+        draw.ellipse([x - r, y - r, x + r, y + r], fill=_EDGE_COLOR)
+    for x, y in vp(scene.points):
+        pr = lw * 2.5
+        draw.ellipse([x - pr, y - pr, x + pr, y + pr], fill="red")
+    font = _font(round(max(w, h) / 45))
+    for tx, ty, text in scene.texts:
+        x, y = vp(np.array([tx, ty]))
+        draw.text((x, y), text, fill=_LABEL_COLOR, font=font, anchor="mm")
+
+    # 整数倍の縮小は reduce (ボックスフィルタ) で十分きれいで、LANCZOS よりずっと速い
+    img = img.reduce(ss)
+    # 色数の少ない線画なのでパレット化すると、PNGのエンコードが速くなりサイズも小さくなる
+    img = img.quantize(256, method=Image.Quantize.FASTOCTREE)
+    buf = io.BytesIO()
+    img.save(buf, format="PNG")
+    return buf.getvalue()
@@ -0,0 +1,386 @@
+"""NumPyによる立体図形エンジン
+
+角柱・角錐・円柱・円錐などの頂点・辺・面を配列で持ち、投影・隠線判定・切断面・動点を
+まとめて配列演算で計算する。描画には依存しないので、matplotlib以外のバックエンドからも使える。
+立体はすべて凸であることを前提にしている（隠線判定・面の向きの決定に利用）。
+"""
+import string
+from dataclasses import dataclass
+
+import numpy as np
+
+_EPS = 1e-9
+# 正多角形の辺数・円の分割数の範囲。/draw-geometry のパラメータから来るので上限を設ける
+MIN_SIDES = 3
+MAX_SIDES = 256
+
+
+def _sides(params: dict, key: str, default: int) -> int:
+    return min(max(int(params.get(key, default)), MIN_SIDES), MAX_SIDES)
+
+
+@dataclass(frozen=True)
+class Solid:
+    name: str
+    vertices: np.ndarray  # (N, 3)
+    faces: tuple[np.ndarray, ...]  # 各面の頂点インデックス
+    normals: np.ndarray  # (F, 3) 外向き単位法線
+    edges: np.ndarray  # (E, 2)
+    edge_faces: np.ndarray  # (E, 2) 辺に接する面。境界は -1
+    smooth: np.ndarray  # (E,) 曲面の分割線。輪郭になるときだけ描く
+    labels: tuple[str, ...]  # 頂点ラベル（空文字はラベルなし）
+
+    def vertex(self, label: str) -> np.ndarray:
+        return self.vertices[self.labels.index(label)]
+
+    def resolve(self, points) -> np.ndarray:
+        """頂点ラベルまたは座標のリストを (K, 3) 配列にする"""
+        return np.array([self.vertex(p) if isinstance(p, str) else p for p in points], dtype=float).reshape(-1, 3)
+
+
+@dataclass(frozen=True)
+class Visibility:
+    visible: np.ndarray  # (E,) 実線で描く辺
+    hidden: np.ndarray  # (E,) 破線で描く辺
+    front_faces: np.ndarray  # (F,) 視点側を向いている面
+
+
+# ── 立体の構築 ──
+
+
+def _build(
+    name: str,
+    vertices: np.ndarray,
+    faces: list[np.ndarray],
+    curved_faces: np.ndarray | None = None,
+    labels: list[str] | None = None,
+) -> Solid:
+    vertices = np.asarray(vertices, dtype=float)
+    n_faces = len(faces)
+    sizes = np.array([len(f) for f in faces])
+
+    # 面ごとの頂点を最後の頂点で埋めて (F, K) にそろえる。Newell法では余分なペアの寄与は0になる
+    width = sizes.max()
+    padded = np.array([np.pad(f, (0, width - len(f)), mode="edge") for f in faces])
+    cur = vertices[padded]
+    nxt = vertices[np.roll(padded, -1, axis=1)]
+    normals = np.stack([
+        ((cur[..., 1] - nxt[..., 1]) * (cur[..., 2] + nxt[..., 2])).sum(axis=1),
+        ((cur[..., 2] - nxt[..., 2]) * (cur[..., 0] + nxt[..., 0])).sum(axis=1),
+        ((cur[..., 0] - nxt[..., 0]) * (cur[..., 1] + nxt[..., 1])).sum(axis=1),
+    ], axis=1)
+    normals /= np.linalg.norm(normals, axis=1, keepdims=True) + _EPS
+
+    mask = np.arange(width)[None, :] < sizes[:, None]
+    face_centers = (cur * mask[..., None]).sum(axis=1) / sizes[:, None]
+    outward = ((face_centers - vertices.mean(axis=0)) * normals).sum(axis=1)
+    normals[outward < 0] *= -1
+
+    # 面の各辺 (a, b) を集めて重複を除き、辺→面の対応を作る
+    pairs = np.concatenate([np.stack([f, np.roll(f, -1)], axis=1) for f in faces])
+    pair_faces = np.repeat(np.arange(n_faces), sizes)
+    pairs.sort(axis=1)
+    edges, inverse = np.unique(pairs, axis=0, return_inverse=True)
+    inverse = inverse.ravel()
+    edge_faces = np.full((len(edges), 2), -1, dtype=int)
+    order = np.argsort(inverse, kind="stable")
+    first = np.ones(len(order), dtype=bool)
+    first[1:] = inverse[order][1:] != inverse[order][:-1]
+    edge_faces[inverse[order][first], 0] = pair_faces[order][first]
+    edge_faces[inverse[order][~first], 1] = pair_faces[order][~first]
+
+    curved = np.zeros(n_faces, dtype=bool)
+    if curved_faces is not None:
+        curved[curved_faces] = True
+    smooth = curved[edge_faces[:, 0]] & (edge_faces[:, 1] >= 0) & curved[np.maximum(edge_faces[:, 1], 0)]
+
+    labels = list(labels or [])
+    labels += [""] * (len(vertices) - len(labels))
+    return Solid(
+        name=name,
+        vertices=vertices,
+        faces=tuple(np.asarray(f) for f in faces),
+        normals=normals,
+        edges=edges,
+        edge_faces=edge_faces,
+        smooth=smooth,
+        labels=tuple(labels),
+    )
+
+
+def regular_polygon(sides: int, radius: float) -> np.ndarray:
+    """中心が原点の正多角形 (sides, 2)。1辺が手前（-y側）に来る向き"""
+    angles = -np.pi / 2 - np.pi / sides + 2 * np.pi * np.arange(sides) / sides
+    return radius * np.stack([np.cos(angles), np.sin(angles)], axis=1)
+
+
+def prism(base: np.ndarray, height: float, name: str = "prism") -> Solid:
+    """底面の多角形 (K, 2) を高さ方向に押し出した角柱。ラベルは底面→上面の順 (ABC-DEF)"""
+    base = np.asarray(base, dtype=float)
+    k = len(base)
+    bottom = np.column_stack([base, np.zeros(k)])
+    top = bottom + [0, 0, height]
+    idx = np.arange(k)
+    sides = np.stack([idx, np.roll(idx, -1), np.roll(idx, -1) + k, idx + k], axis=1)
+    faces = [idx, idx + k, *sides]
+    return _build(name, np.vstack([bottom, top]), faces, labels=list(string.ascii_uppercase[:2 * k]))
+
+
+def cuboid(width: float, depth: float, height: float) -> Solid:
+    """直方体ABCD-EFGH（Aが原点、Eが Aの真上）"""
+    base = np.array([[0, 0], [width, 0], [width, depth], [0, depth]], dtype=float)
+    return prism(base, height, name="cuboid")
+
+
+def pyramid(base: np.ndarray, height: float, apex: np.ndarray | None = None, name: str = "pyramid") -> Solid:
+    """角錐O-ABC…。apex 省略時は底面の重心の真上"""
+    base = np.asarray(base, dtype=float)
+    k = len(base)
+    bottom = np.column_stack([base, np.zeros(k)])
+    top = np.array([*base.mean(axis=0), height]) if apex is None else np.asarray(apex, dtype=float)
+    idx = np.arange(k)
+    sides = np.stack([idx, np.roll(idx, -1), np.full(k, k)], axis=1)
+    labels = list(string.ascii_uppercase[:k]) + ["O"]
+    return _build(name, np.vstack([bottom, top]), [idx, *sides], labels=labels)
+
+
+def cylinder(radius: float, height: float, segments: int = 64) -> Solid:
+    circle = regular_polygon(segments, radius)
+    solid = prism(circle, height, name="cylinder")
+    curved = np.arange(2, 2 + segments)
+    return _build("cylinder", solid.vertices, list(solid.faces), curved_faces=curved)
+
+
+def cone(radius: float, height: float, segments: int = 64) -> Solid:
+    circle = regular_polygon(segments, radius)
+    solid = pyramid(circle, height, name="cone")
+    curved = np.arange(1, 1 + segments)
+    labels = [""] * segments + ["O"]
+    return _build("cone", solid.vertices, list(solid.faces), curved_faces=curved, labels=labels)
+
+
+# ── 投影・隠線 ──
+
+
+def view_basis(elev: float = 20, azim: float = -75) -> np.ndarray:
+    """(右, 上, 視点方向) の正規直交基底 (3, 3)。角度はmatplotlibの view_init と同じ定義"""
+    e, a = np.radians(elev), np.radians(azim)
+    toward = np.array([np.cos(e) * np.cos(a), np.cos(e) * np.sin(a), np.sin(e)])
+    right = np.array([-np.sin(a), np.cos(a), 0.0])
+    up = np.cross(toward, right)
+    return np.stack([right, up, toward])
+
+
+def project(points: np.ndarray, basis: np.ndarray) -> np.ndarray:
+    """正射影で (N, 3) → (N, 2)"""
+    return np.asarray(points, dtype=float) @ basis[:2].T
+
+
+def visibility(solid: Solid, basis: np.ndarray) -> Visibility:
+    front = solid.normals @ basis[2] > _EPS
+    f0 = front[solid.edge_faces[:, 0]]
+    has_f1 = solid.edge_faces[:, 1] >= 0
+    f1 = has_f1 & front[np.maximum(solid.edge_faces[:, 1], 0)]
+    seen = f0 | f1
+    silhouette = f0 != f1
+    return Visibility(
+        visible=seen & (~solid.smooth | silhouette),
+        hidden=~seen & ~solid.smooth,
+        front_faces=front,
+    )
+
+
+# ── 切断面・動点 ──
+
+
+def plane_from_points(points: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    p = np.asarray(points, dtype=float)
+    normal = np.cross(p[1] - p[0], p[2] - p[0])
+    norm = np.linalg.norm(normal)
+    if norm < _EPS:
+        raise ValueError("切断面を決める3点が一直線上にあります")
+    return p[0], normal / norm
+
+
+def cross_section(solid: Solid, point: np.ndarray, normal: np.ndarray) -> np.ndarray:
+    """平面で切ったときの切り口の多角形 (K, 3)。交わらなければ空配列"""
+    normal = np.asarray(normal, dtype=float)
+    d = (solid.vertices - np.asarray(point, dtype=float)) @ normal
+    da, db = d[solid.edges[:, 0]], d[solid.edges[:, 1]]
+    crossing = da * db < -_EPS ** 2
+    t = da[crossing] / (da[crossing] - db[crossing])
+    va, vb = solid.vertices[solid.edges[crossing, 0]], solid.vertices[solid.edges[crossing, 1]]
+    pts = np.vstack([va + t[:, None] * (vb - va), solid.vertices[np.abs(d) <= 1e-7]])
+    if len(pts) < 3:
+        return np.empty((0, 3))
+    pts = np.unique(np.round(pts, 9), axis=0)
+    if len(pts) < 3:
+        return np.empty((0, 3))
+
+    # 切断面内の2軸で角度を求めて周回順に並べる
+    center = pts.mean(axis=0)
+    u = pts[0] - center
+    u /= np.linalg.norm(u) + _EPS
+    v = np.cross(normal, u)
+    rel = pts - center
+    return pts[np.argsort(np.arctan2(rel @ v, rel @ u))]
+
+
+def point_along(path: np.ndarray, distances) -> np.ndarray:
+    """折れ線 path (K, 3) 上を始点から distances だけ進んだ点 (M, 3)。範囲外は端点に留める"""
+    path = np.asarray(path, dtype=float)
+    s = np.atleast_1d(np.asarray(distances, dtype=float))
+    seg = np.diff(path, axis=0)
+    lengths = np.linalg.norm(seg, axis=1)
+    cum = np.concatenate([[0.0], np.cumsum(lengths)])
+    s = np.clip(s, 0.0, cum[-1])
+    idx = np.clip(np.searchsorted(cum, s, side="right") - 1, 0, len(seg) - 1)
+    t = (s - cum[idx]) / np.where(lengths[idx] > 0, lengths[idx], 1.0)
+    return path[idx] + t[:, None] * seg[idx]
+
+
+# ── パラメータから構築 ──
+
+SOLID_TYPES = ("cuboid", "cube", "prism", "pyramid", "cylinder", "cone")
+
+
+def build_solid(shape_type: str, params: dict) -> Solid:
+    """APIの shape_type / parameters から立体を作る"""
+    if shape_type == "cuboid":
+        return cuboid(params.get("width", 6), params.get("depth", 6), params.get("height", 8))
+    if shape_type == "cube":
+        s = params.get("side", 6)
+        return cuboid(s, s, s)
+    if shape_type in ("prism", "pyramid"):
+        if params.get("base"):
+            base = np.asarray(params["base"], dtype=float)
+            if len(base) > MAX_SIDES:
+                raise ValueError(f"底面の頂点は{MAX_SIDES}個までです")
+        else:
+            base = regular_polygon(_sides(params, "sides", 3 if shape_type == "prism" else 4), params.get("radius", 3))
+        if shape_type == "prism":
+            return prism(base, params.get("height", 6))
+        return pyramid(base, params.get("height", 6), params.get("apex"))
+    segments = _sides(params, "segments", 64)
+    if shape_type == "cylinder":
+        return cylinder(params.get("radius", 3), params.get("height", 6), segments)
+    if shape_type == "cone":
+        return cone(params.get("radius", 3), params.get("height", 6), segments)
+    raise ValueError(f"未対応の立体です: {shape_type}")
+
+
+# ── 描画用シーン ──
+
+
+@dataclass(frozen=True)
+class Scene:
+    """投影済みの2D図形。描画バックエンドはこれを層ごとに1回で描く"""
+
+    faces: list[np.ndarray]  # 視点側の面 (k, 2)
+    section: np.ndarray | None  # 切り口 (k, 2)
+    visible_segments: np.ndarray  # (E, 2, 2)
+    hidden_segments: np.ndarray  # (E, 2, 2)
+    points: np.ndarray  # 動点など (M, 2)
+    texts: list[tuple[float, float, str]]
+    bounds: tuple[float, float, float, float]  # xmin, ymin, xmax, ymax
+
+
+PLANE_TYPES = ("triangle", "rectangle", "square", "circle")
+
+
+def build_plane_scene(shape_type: str, params: dict, labels: dict | None = None) -> Scene:
+    """平面図形（三角形・長方形・正方形・円）のシーン。寸法・ラベルは従来の描画と同じ"""
+    if shape_type == "triangle":
+        w, h = params.get("width", 5), params.get("height", 4)
+        outline = np.array([[0, 0], [w, 0], [w / 2, h]], dtype=float)
+        names = ["A", "B", "C"]
+    elif shape_type == "circle":
+        r = params.get("radius", 3)
+        outline = regular_polygon(_sides(params, "segments", 128), r)
+        names = []
+    else:
+        if shape_type == "square":
+            w = h = params.get("side", 5)
+        else:
+            w, h = params.get("width", 6), params.get("height", 4)
+        outline = np.array([[0, 0], [w, 0], [w, h], [0, h]], dtype=float)
+        names = ["A", "B", "C", "D"]
+
+    segments = np.stack([outline, np.roll(outline, -1, axis=0)], axis=1)
+    points = np.zeros((1, 2)) if shape_type == "circle" else np.empty((0, 2))
+    center = outline.mean(axis=0)
+    span = float(np.ptp(outline, axis=0).max()) or 1.0
+    texts = []
+    if labels:
+        if shape_type == "circle":
+            texts.append((0.0, -span * 0.06, "O"))
+        for p, name in zip(outline, names):
+            offset = (p - center) / (np.linalg.norm(p - center) + _EPS) * span * 0.06
+            texts.append((float(p[0] + offset[0]), float(p[1] + offset[1]), name))
+    margin = span * 0.12
+    lo, hi = outline.min(axis=0) - margin, outline.max(axis=0) + margin
+    return Scene(
+        faces=[],
+        section=None,
+        visible_segments=segments,
+        hidden_segments=np.empty((0, 2, 2)),
+        points=points,
+        texts=texts,
+        bounds=(float(lo[0]), float(lo[1]), float(hi[0]), float(hi[1])),
+    )
+
+
+def build_scene(solid: Solid, params: dict, labels: dict | None = None) -> Scene:
+    """立体と描画オプション（視点・切断面・動点・ラベル）から投影済みシーンを作る"""
+    basis = view_basis(params.get("elev", 20), params.get("azim", -75))
+    pts2d = project(solid.vertices, basis)
+    vis = visibility(solid, basis)
+
+    faces = [pts2d[f] for f, front in zip(solid.faces, vis.front_faces) if front]
+
+    section = None
+    cs = params.get("cross_section")
+    if cs:
+        if cs.get("points"):
+            point, normal = plane_from_points(solid.resolve(cs["points"]))
+        else:
+            point, normal = np.asarray(cs["point"], dtype=float), np.asarray(cs["normal"], dtype=float)
+        poly = cross_section(solid, point, normal)
+        if len(poly):
+            section = project(poly, basis)
+
+    marks: list[np.ndarray] = []
+    named: list[tuple[np.ndarray, str]] = []
+    for mp in params.get("moving_points") or []:
+        pos = point_along(solid.resolve(mp["path"]), mp.get("distance", 0))
+        mark = project(pos, basis)[0]
+        marks.append(mark)
+        if mp.get("label"):
+            named.append((mark, mp["label"]))
+    points = np.array(marks).reshape(-1, 2)
+
+    if labels:
+        names = list(labels.get("vertices", "")) or list(solid.labels)
+        named.extend((p, name) for p, name in zip(pts2d, names) if name)
+
+    # ラベルは図形の中心から外側へ少しずらして置く
+    center2d = pts2d.mean(axis=0)
+    span = float(np.ptp(pts2d, axis=0).max()) or 1.0
+    placed = []
+    for p2, name in named:
+        offset = p2 - center2d
+        offset = offset / (np.linalg.norm(offset) + _EPS) * span * 0.05
+        placed.append((float(p2[0] + offset[0]), float(p2[1] + offset[1]), name))
+
+    all_pts = np.vstack([pts2d, points] + ([np.array([[x, y] for x, y, _ in placed])] if placed else []))
+    margin = span * 0.08
+    lo, hi = all_pts.min(axis=0) - margin, all_pts.max(axis=0) + margin
+    return Scene(
+        faces=faces,
+        section=section,
+        visible_segments=pts2d[solid.edges[vis.visible]],
+        hidden_segments=pts2d[solid.edges[vis.hidden]],
+        points=points,
+        texts=placed,
+        bounds=(float(lo[0]), float(lo[1]), float(hi[0]), float(hi[1])),
+    )
@@ -0,0 +1,24 @@
+"""トークン数の見積もりと、会話履歴をトークン予算に収める処理"""
+
+
+def estimate_tokens(text: str) -> int:
+    """おおよそのトークン数（日本語はおよそ2文字で1トークン）"""
+    return max(1, len(text) // 2)
+
+
+def trim_history(messages: list[dict], budget: int) -> list[dict]:
+    """新しいメッセージから数えて budget トークンに収まる分だけ残す
+
+    最新のメッセージは予算を超えても残す。先頭は user にそろえる（assistant から始まる履歴は Anthropic が受け付けない）。
+    """
+    kept: list[dict] = []
+    total = 0
+    for m in reversed(messages):
+        total += estimate_tokens(m["content"])
+        if kept and total > budget:
+            break
+        kept.append(m)
+    kept.reverse()
+    while len(kept) > 1 and kept[0].get("role") != "user":
+        kept.pop(0)
+    return kept
@@ -0,0 +1,63 @@
+"""multipart アップロードの受け取り
+
+ファイルは Starlette の SpooledTemporaryFile（1MB を超えるとディスク）に書き出し、リクエスト全体のサイズは
+受信しながら上限を検査する。base64 文字列には変換せず、プロバイダーに渡す直前に1件ずつバイト列で読み出す。
+"""
+from fastapi import HTTPException, Request
+from starlette.datastructures import FormData, UploadFile
+from starlette.types import Message, Receive
+
+from app.config.settings import get_settings
+
+
+def _too_large(limit: int, what: str) -> HTTPException:
+    return HTTPException(status_code=413, detail=f"{what}が大きすぎます（上限 {limit // (1024 * 1024)}MB）")
+
+
+def _limited_receive(receive: Receive, limit: int) -> Receive:
+    received = 0
+
+    async def wrapped() -> Message:
+        nonlocal received
+        message = await receive()
+        if message["type"] == "http.request":
+            received += len(message.get("body", b""))
+            if received > limit:
+                raise _too_large(limit, "アップロード")
+        return message
+
+    return wrapped
+
+
+async def read_upload_form(
+    request: Request, max_files: int | None = None, max_total_bytes: int | None = None
+) -> FormData:
+    """サイズ上限を守りながらフォームを読む。呼び出し側は使い終わったら form.close() する
+
+    max_files / max_total_bytes を省くと設定の upload_max_files / upload_max_total_bytes を使う。
+    """
+    s = get_settings()
+    max_files = max_files or s.upload_max_files
+    max_total_bytes = max_total_bytes or s.upload_max_total_bytes
+    length = request.headers.get("content-length", "")
+    if length.isdigit() and int(length) > max_total_bytes:
+        raise _too_large(max_total_bytes, "アップロード")
+
+    limited = Request(request.scope, _limited_receive(request.receive, max_total_bytes))
+    form = await limited.form(max_files=max_files)
+    for value in form.values():
+        if isinstance(value, UploadFile) and (value.size or 0) > s.upload_max_file_bytes:
+            await form.close()
+            raise _too_large(s.upload_max_file_bytes, f"ファイル {value.filename or ''} ")
+    return form
+
+
+def upload_files(form: FormData, prefix: str) -> list[UploadFile]:
+    """キー名が prefix で始まるファイルを送信順に返す"""
+    return [v for k, v in form.multi_items() if k.startswith(prefix) and isinstance(v, UploadFile)]
+
+
+async def read_upload(f: UploadFile) -> bytes:
+    """スプール済みのファイルをバイト列で読む（読むたびに先頭から）"""
+    await f.seek(0)
+    return await f.read()
@@ -0,0 +1,102 @@
+"""問題文分析のベンチマーク
+
+旧実装（GEOMETRY_KEYWORDS を1語ずつ in で調べ、図形ごとに any(...) を重ね、数値は別の正規表現で拾う）と、
+キーワード・単位つき数値を1回の走査で取り出す AnalysisService.analyze_many、
+検索の図形フィルタが使う detect_shapes_many（キーワードだけ）を、
+seed_library と同じ形の問題文で比べる。
+
+    cd backend && python -m benchmarks.bench_analysis --problems 5000
+"""
+import argparse
+import asyncio
+import random
+import re
+import time
+from datetime import datetime, timezone
+
+from app.models.analysis import ProblemAnalysisResponse
+from app.services.analysis_service import AnalysisService
+from benchmarks.seed_library import make_problem
+
+
+def legacy_analyze(problem_text: str) -> ProblemAnalysisResponse:
+    needs_geometry = any(kw in problem_text for kw in AnalysisService.GEOMETRY_KEYWORDS)
+    detected_shapes: list[str] = []
+    suggested_params: dict = {}
+    if needs_geometry:
+        numbers = [float(n) for n in re.findall(r"\d+\.?\d*", problem_text) if float(n) > 0]
+        if any(w in problem_text for w in ["三角形", "triangle"]):
+            detected_shapes.append("triangle")
+            suggested_params["triangle"] = {
+                "width": numbers[0] if len(numbers) >= 1 else 5,
+                "height": numbers[1] if len(numbers) >= 2 else 4,
+            }
+        if any(w in problem_text for w in ["四角形", "正方形", "長方形", "rectangle", "square"]):
+            if "正方形" in problem_text or "square" in problem_text:
+                detected_shapes.append("square")
+                suggested_params["square"] = {"side": numbers[0] if numbers else 5}
+            else:
+                detected_shapes.append("rectangle")
+                suggested_params["rectangle"] = {
+                    "width": numbers[0] if len(numbers) >= 1 else 6,
+                    "height": numbers[1] if len(numbers) >= 2 else 4,
+                }
+        if any(w in problem_text for w in ["円", "circle"]):
+            detected_shapes.append("circle")
+            suggested_params["circle"] = {"radius": numbers[0] if numbers else 3}
+        if any(w in problem_text for w in ["直方体", "立方体", "cuboid", "cube", "ABCD-EFGH"]):
+            detected_shapes.append("cuboid")
+            if len(numbers) >= 3:
+                suggested_params["cuboid"] = {"width": numbers[0], "depth": numbers[1], "height": numbers[2]}
+            elif len(numbers) >= 1:
+                suggested_params["cuboid"] = {"width": numbers[0], "depth": numbers[0], "height": numbers[0]}
+            else:
+                suggested_params["cuboid"] = {"width": 6, "depth": 6, "height": 8}
+    return ProblemAnalysisResponse(
+        success=True, needs_geometry=needs_geometry, detected_shapes=detected_shapes,
+        suggested_parameters=suggested_params,
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--problems", type=int, default=5000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    now = datetime.now(timezone.utc)
+    texts = [make_problem(rng, "bench", [""], now)["content"] for _ in range(args.problems)]
+    chars = sum(map(len, texts))
+    svc = AnalysisService()
+    svc.analyze_text("")  # パターンのコンパイルを計測から外す
+
+    def best(fn) -> float:
+        times = []
+        for _ in range(args.repeat):
+            t0 = time.perf_counter()
+            fn()
+            times.append(time.perf_counter() - t0)
+        return min(times) * 1000
+
+    legacy_ms = best(lambda: [legacy_analyze(t) for t in texts])
+    new_ms = best(lambda: asyncio.run(svc.analyze_many(texts)))
+    shapes_ms = best(lambda: asyncio.run(svc.detect_shapes_many(texts)))
+    print(f"{args.problems} problems, {chars / args.problems:.0f} chars avg, best of {args.repeat}\n")
+    print(f"{'implementation':<36} {'total ms':>9} {'µs/problem':>11}")
+    print(f"{'legacy (in checks + regex)':<36} {legacy_ms:>9.1f} {legacy_ms * 1000 / args.problems:>11.1f}")
+    print(f"{'analyze_many (single scan + units)':<36} {new_ms:>9.1f} {new_ms * 1000 / args.problems:>11.1f}")
+    print(f"{'detect_shapes_many (keywords only)':<36} {shapes_ms:>9.1f} {shapes_ms * 1000 / args.problems:>11.1f}")
+
+    # 旧実装は「円錐」「円柱」でも circle を、「立方体」を cuboid として返していた
+    renamed = {"cube": "cuboid"}
+    agree = sum(
+        set(legacy_analyze(t).detected_shapes) - {"circle"}
+        <= {renamed.get(s, s) for s in svc.analyze_text(t).detected_shapes}
+        for t in texts
+    )
+    print(f"\nlegacy shapes (except circle) also detected: {agree}/{args.problems}")
+
+
+if __name__ == "__main__":
+    main()
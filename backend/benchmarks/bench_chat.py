@@ -0,0 +1,97 @@
+"""ラボラトリーのチャットのベンチマーク（最初の文字が届くまでの時間と、比較モードの所要時間）
+
+FAKE_LLM_ENABLED の偽クライアント（実際のプロバイダーに近い遅延とトークン速度）で、
+/chat と同じく完了まで待つ generate_with_history と、/chat/stream の ChatService.stream_chat を比べる。
+どちらも同じ会話を --turns 回続け、/chat は毎回履歴全体を送り直し、stream はサーバー側のセッションを使う。
+あわせて /chat/compare（3つの provider / model に同時に送る）の所要時間を、1モデルずつ順に送った場合の合計と比べる。
+
+    cd backend && python -m benchmarks.bench_chat --turns 6
+"""
+import argparse
+import asyncio
+import os
+import time
+
+from benchmarks.bench_e2e import percentile
+
+USER_ID = "bench-user"
+
+
+async def run(args):
+    from app.clients import get_ai_clients
+    from app.services.chat_service import ChatService
+
+    client = get_ai_clients()["gemini"]
+    svc = ChatService()
+    questions = [f"質問{i}: 直方体の対角線の長さの求め方を説明してください。" for i in range(args.turns)]
+
+    # /chat: 応答全体が返るまで何も表示できない
+    blocking, history = [], []
+    for q in questions:
+        history.append({"role": "user", "content": q})
+        t0 = time.perf_counter()
+        content = await client.generate_with_history(history, model="gemini-2.5-flash")
+        blocking.append((time.perf_counter() - t0) * 1000)
+        history.append({"role": "assistant", "content": content})
+
+    # /chat/stream: 最初の delta で表示が始まる
+    ttft, total, session_id = [], [], None
+    for q in questions:
+        t0 = time.perf_counter()
+        first = None
+        async for event in svc.stream_chat(USER_ID, q, api="gemini", model="gemini-2.5-flash", session_id=session_id):
+            if event["event"] == "session":
+                session_id = event["data"]["session_id"]
+            elif event["event"] == "delta" and first is None:
+                first = (time.perf_counter() - t0) * 1000
+        ttft.append(first or 0.0)
+        total.append((time.perf_counter() - t0) * 1000)
+
+    print(f"fake LLM: latency {args.latency_ms:g}±{args.latency_jitter_ms:g} ms, {args.tokens_per_second:g} tokens/s")
+    print(f"{args.turns} turns of one conversation\n")
+    print(f"{'':<36} {'p50 ms':>8} {'p95 ms':>8}")
+    for name, values in [
+        ("/chat: first text (= full reply)", blocking),
+        ("/chat/stream: first delta", ttft),
+        ("/chat/stream: full reply", total),
+    ]:
+        values = sorted(values)
+        print(f"{name:<36} {percentile(values, 50):>8.0f} {percentile(values, 95):>8.0f}")
+
+    # /chat/compare: 1回あたりの所要時間（wall）と、各モデルの所要時間の合計（順に送った場合）
+    targets = [("gemini", "gemini-2.5-flash"), ("claude", "claude-sonnet-4"), ("openai", "gpt-5")]
+    wall, sequential = [], []
+    for q in questions:
+        async for event in svc.compare_models(q, targets):
+            if event["event"] == "complete":
+                wall.append(event["data"]["wall_ms"])
+                sequential.append(event["data"]["sequential_ms"])
+    print(f"\n/chat/compare, {len(targets)} models x {args.turns} messages\n")
+    print(f"{'':<36} {'p50 ms':>8} {'p95 ms':>8}")
+    for name, values in [("one model at a time (sum)", sequential), ("fan-out (wall)", wall)]:
+        values = sorted(values)
+        print(f"{name:<36} {percentile(values, 50):>8.0f} {percentile(values, 95):>8.0f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--turns", type=int, default=6)
+    parser.add_argument("--latency-ms", type=float, default=600.0, help="偽LLMの最初のトークンまでの時間")
+    parser.add_argument("--latency-jitter-ms", type=float, default=150.0)
+    parser.add_argument("--tokens-per-second", type=float, default=80.0)
+    args = parser.parse_args()
+
+    # 設定はアプリの読み込み時に確定するので、先に環境変数で偽LLMを有効にする
+    os.environ.update({
+        "FAKE_LLM_ENABLED": "true",
+        "FAKE_LLM_LATENCY_MS": str(args.latency_ms),
+        "FAKE_LLM_LATENCY_JITTER_MS": str(args.latency_jitter_ms),
+        "FAKE_LLM_TOKENS_PER_SECOND": str(args.tokens_per_second),
+        "STORAGE_BACKEND": "sqlite",
+        "SQLITE_PATH": ":memory:",
+    })
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
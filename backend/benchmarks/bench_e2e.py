@@ -0,0 +1,152 @@
+"""生成系エンドポイントのエンドツーエンドベンチマーク
+
+FAKE_LLM_ENABLED で LLM を記録済み出力の偽クライアントに置き換え、実際のルーター・サービス・描画ワーカー・PDF生成を通して
+/generate-problem-sse, /generate-three-problems-sse, /problems/{id}/regenerate-geometry, /generate-pdf を叩く。
+エンドポイントごとにスループットと p50/p95/p99 レイテンシを出す。
+認証は固定ユーザーに差し替え、DB は STORAGE_BACKEND=sqlite のインメモリ SQLite（supabase/migrations を適用）を使う。
+
+    cd backend && python -m benchmarks.bench_e2e --requests 20 --concurrency 4
+    # 実際のプロバイダーに近い遅延で測る
+    cd backend && python -m benchmarks.bench_e2e --latency-ms 800 --tokens-per-second 80 --requests 8
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import time
+
+USER_ID = "bench-user"
+PDF_BYTES = b"%PDF-1.4\n% benchmark placeholder\n" + b"0" * 32 * 1024
+
+
+def percentile(sorted_values: list[float], p: float) -> float:
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, max(0, round(p / 100 * len(sorted_values)) - 1))]
+
+
+def sse_ok(body: str) -> bool:
+    events = [json.loads(line[6:])["event"] for line in body.splitlines() if line.startswith("data: ")]
+    return "complete" in events and "error" not in events
+
+
+async def run(args):
+    import httpx
+
+    from app.api.v1 import problems
+    from app.core.database import get_supabase_client
+    from app.main import app
+
+    db = get_supabase_client()
+    db.table("users").upsert({"id": USER_ID, "school_code": "bench"}).execute()
+
+    async def bench_user(request):
+        return {"user_id": USER_ID}
+
+    problems._require_user = bench_user
+    # リクエストごとに出るログで計測結果が埋もれないようにする
+    logging.getLogger("app.utils.prompt_loader").setLevel(logging.ERROR)
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+
+    async def five_stage(client, i):
+        res = await client.post("/api/v1/generate-problem-sse", json={
+            "prompt": f"直方体の切断の問題 #{i}", "units": ["空間図形"], "excluded_units": [],
+        })
+        return res.status_code == 200 and sse_ok(res.text)
+
+    async def three_problems(client, i):
+        res = await client.post(
+            "/api/v1/generate-three-problems-sse",
+            data={"excluded_units": "[]"},
+            files={"problem_file_0": (f"exam{i}.pdf", PDF_BYTES, "application/pdf")},
+        )
+        return res.status_code == 200 and sse_ok(res.text)
+
+    async def regenerate(client, i):
+        res = await client.post(f"/api/v1/problems/{seed_id}/regenerate-geometry", json={})
+        return res.status_code == 200 and res.json().get("success") is True
+
+    run_id = time.time_ns()
+
+    async def pdf(client, i):
+        # PDFキャッシュ（ディスクは実行をまたいで残る）に当たらないよう、毎回異なる内容にする
+        res = await client.post("/api/v1/generate-pdf", json={
+            "problem_text": f"{pdf_problem['content']}\n\n(#{run_id}-{i})",
+            "solution_text": pdf_problem["solution"],
+            "image_base64": pdf_problem["image_base64"],
+        })
+        return res.status_code == 200 and res.json().get("success") is True
+
+    scenarios = {
+        "generate-problem-sse": five_stage,
+        "generate-three-problems-sse": three_problems,
+        "regenerate-geometry": regenerate,
+        "generate-pdf": pdf,
+    }
+    selected = args.only or list(scenarios)
+
+    transport = httpx.ASGITransport(app=app)
+    async with app.router.lifespan_context(app):
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=600) as client:
+            # 問題を1件生成し、図形再生成とPDFの入力に使う（描画ワーカーの起動もここで済ませる）
+            await five_stage(client, -1)
+            seed = db.table("problems").select("*").order("id").limit(1).single().execute().data
+            seed_id, pdf_problem = seed["id"], seed
+
+            print(
+                f"fake LLM: latency {args.latency_ms:g}±{args.latency_jitter_ms:g} ms, "
+                f"{args.tokens_per_second:g} tokens/s, error rate {args.error_rate:g}"
+            )
+            print(f"requests per endpoint: {args.requests}  concurrency: {args.concurrency}\n")
+            print(f"{'endpoint':<28} {'ok':>5} {'req/s':>7} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+            for name in selected:
+                fn = scenarios[name]
+                semaphore = asyncio.Semaphore(args.concurrency)
+
+                async def timed(i: int):
+                    async with semaphore:
+                        t0 = time.perf_counter()
+                        ok = await fn(client, i)
+                        return ok, (time.perf_counter() - t0) * 1000
+
+                start = time.perf_counter()
+                results = await asyncio.gather(*(timed(i) for i in range(args.requests)))
+                elapsed = time.perf_counter() - start
+                latencies = sorted(ms for _, ms in results)
+                ok = sum(1 for success, _ in results if success)
+                print(
+                    f"{name:<28} {ok:>5} {args.requests / elapsed:>7.2f} "
+                    f"{percentile(latencies, 50):>9.0f} {percentile(latencies, 95):>9.0f} {percentile(latencies, 99):>9.0f}"
+                )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=20, help="エンドポイントごとのリクエスト数")
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--latency-ms", type=float, default=50.0, help="偽LLMの最初のトークンまでの時間")
+    parser.add_argument("--latency-jitter-ms", type=float, default=10.0)
+    parser.add_argument("--tokens-per-second", type=float, default=5000.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--only", nargs="*", help="計測するエンドポイント名（既定: すべて）")
+    args = parser.parse_args()
+
+    # 設定はアプリの読み込み時に確定するので、先に環境変数で偽LLMとローカルDBを有効にする
+    os.environ.update({
+        "FAKE_LLM_ENABLED": "true",
+        "FAKE_LLM_LATENCY_MS": str(args.latency_ms),
+        "FAKE_LLM_LATENCY_JITTER_MS": str(args.latency_jitter_ms),
+        "FAKE_LLM_TOKENS_PER_SECOND": str(args.tokens_per_second),
+        "FAKE_LLM_ERROR_RATE": str(args.error_rate),
+        "FAKE_LLM_SEED": str(args.seed),
+        "STARTUP_WARM_UP": "false",
+        "STORAGE_BACKEND": "sqlite",
+        "SQLITE_PATH": ":memory:",
+    })
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""フォント設定の描画ごとのオーバーヘッドのベンチマーク
+
+以前の方式（描画のたびに fontManager.ttflist の全フォント名を走査し、グローバルな rcParams を書き換える）と、
+一度だけ解決したスタイルを plt.rc_context で適用する現在の方式を比べる。
+フォント走査のコストはインストール済みフォント数に比例するため、--scale でフォント一覧を水増しした場合も測る。
+
+    cd backend && python -m benchmarks.bench_font_setup --renders 30
+"""
+import argparse
+import asyncio
+import time
+
+import matplotlib.font_manager as fm
+import matplotlib.pyplot as plt
+
+from app.services.geometry_service import figure_style, get_geometry_service
+
+CUSTOM_CODE = """
+fig, ax = plt.subplots(1, 1, figsize=(8, 6))
+ax.plot([0, 4, 2, 0], [0, 0, 3, 0])
+ax.text(2, 3.2, "A")
+"""
+
+_LEGACY_FONTS = [
+    "Noto Sans CJK JP", "Noto Sans JP", "IPAexGothic", "IPAGothic", "TakaoPGothic", "VL Gothic", "DejaVu Sans",
+]
+
+
+def legacy_setup():
+    """以前の _setup_japanese_font と同じ処理"""
+    available_fonts = [f.name for f in fm.fontManager.ttflist]
+    for font_name in _LEGACY_FONTS:
+        if font_name in available_fonts:
+            plt.rcParams["font.family"] = font_name
+            return font_name
+    plt.rcParams["axes.unicode_minus"] = False
+    return None
+
+
+def current_setup():
+    with plt.rc_context(figure_style()):
+        pass
+
+
+def per_call_us(fn, n: int) -> float:
+    start = time.perf_counter()
+    for _ in range(n):
+        fn()
+    return (time.perf_counter() - start) / n * 1e6
+
+
+def render_ms(renders: int) -> float:
+    service = get_geometry_service()
+    asyncio.run(service.generate_custom_geometry(CUSTOM_CODE))
+    start = time.perf_counter()
+    for _ in range(renders):
+        asyncio.run(service.generate_custom_geometry(CUSTOM_CODE))
+    return (time.perf_counter() - start) / renders * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--calls", type=int, default=2000)
+    parser.add_argument("--renders", type=int, default=30)
+    parser.add_argument("--scale", type=int, default=20, help="フォント一覧を何倍に水増しして測るか")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    figure_style.cache_clear()
+    style = figure_style()
+    resolve_ms = (time.perf_counter() - start) * 1000
+    print(f"resolved style: {dict(style)}  (first resolution {resolve_ms:.1f} ms, once per process)")
+
+    fonts = fm.fontManager.ttflist
+    original = list(fonts)
+    print(f"\n{'installed fonts':>16}  {'legacy setup':>14}  {'rc_context':>12}")
+    for scale in (1, args.scale):
+        fonts[:] = original * scale
+        try:
+            legacy = per_call_us(legacy_setup, args.calls)
+            current = per_call_us(current_setup, args.calls)
+        finally:
+            fonts[:] = original
+        print(f"{len(original) * scale:>16}  {legacy:>11.1f} us  {current:>9.1f} us")
+
+    print(f"\ncustom figure render (end to end): {render_ms(args.renders):.1f} ms per figure")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""図形バッチ描画のベンチマーク
+
+同じ図形群を、1件ずつ /draw-geometry・/draw-custom-geometry に送る場合と
+/draw-geometry/batch にまとめて送る場合（一括・ストリーミング）で比較する。
+
+    cd backend && python -m benchmarks.bench_geometry_batch --jobs 40
+"""
+import argparse
+import json
+import time
+
+from fastapi.testclient import TestClient
+
+from app.api.v1 import geometry
+from app.main import app
+from app.services.render_pool import get_render_pool
+
+SHAPES = [
+    ("triangle", {"width": 6, "height": 4}),
+    ("circle", {"radius": 3}),
+    ("cuboid", {"width": 6, "depth": 4, "height": 3, "cross_section": {"points": ["A", "C", "G"]}}),
+    ("cone", {"radius": 2, "height": 4}),
+]
+
+CUSTOM_CODE = """
+fig, ax = plt.subplots(1, 1, figsize=(8, 6))
+xs = np.linspace(0, 6, 200)
+ax.plot(xs, 0.5 * xs ** 2 - 2 * xs + 1)
+ax.text(2, -1, "P")
+ax.grid(True, alpha=0.3)
+"""
+
+
+def make_jobs(n: int) -> list[dict]:
+    jobs = []
+    for i in range(n):
+        if i % 5 == 4:
+            jobs.append({"python_code": CUSTOM_CODE})
+        else:
+            shape, params = SHAPES[i % len(SHAPES)]
+            jobs.append({"shape_type": shape, "parameters": params, "labels": {"show": "true"}})
+    return jobs
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--jobs", type=int, default=40)
+    args = parser.parse_args()
+    jobs = make_jobs(args.jobs)
+
+    async def bench_user(request):
+        return {"user_id": "bench-user"}
+
+    geometry._require_user = bench_user
+
+    with TestClient(app) as client:
+        # ワーカープロセスの起動（matplotlib の読み込み）は計測から外す
+        client.post("/api/v1/draw-geometry/batch", json={"jobs": jobs[: get_render_pool().max_workers]})
+
+        start = time.perf_counter()
+        for job in jobs:
+            if "python_code" in job:
+                client.post("/api/v1/draw-custom-geometry", json=job).raise_for_status()
+            else:
+                client.post("/api/v1/draw-geometry", json=job).raise_for_status()
+        single_s = time.perf_counter() - start
+
+        start = time.perf_counter()
+        res = client.post("/api/v1/draw-geometry/batch", json={"jobs": jobs})
+        res.raise_for_status()
+        batch_s = time.perf_counter() - start
+        ok = sum(r["success"] for r in res.json()["results"])
+
+        # TestClient はレスポンスをまとめて受け取るため、ここでは全件の所要時間だけを測る
+        start = time.perf_counter()
+        events = 0
+        with client.stream("POST", "/api/v1/draw-geometry/batch", json={"jobs": jobs, "stream": True}) as stream:
+            for line in stream.iter_lines():
+                if line.startswith("data: "):
+                    events += json.loads(line[6:])["event"] == "result"
+        stream_s = time.perf_counter() - start
+
+    print(f"jobs: {args.jobs}  render workers: {get_render_pool().max_workers}  succeeded: {ok}")
+    print(f"one request per figure : {single_s:7.2f} s")
+    print(f"batch (ordered)        : {batch_s:7.2f} s")
+    print(f"batch (stream)         : {stream_s:7.2f} s  ({events} result events)")
+
+
+if __name__ == "__main__":
+    main()
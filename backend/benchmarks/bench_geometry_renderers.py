@@ -0,0 +1,69 @@
+"""標準図形レンダラーのベンチマーク
+
+図形の種類ごとに、matplotlib 経路 (PNG) と native 経路 (SVG / Pillow PNG) の
+1コアあたりの描画回数 (renders/sec) を比較する。
+
+    cd backend && python -m benchmarks.bench_geometry_renderers --seconds 2
+"""
+import argparse
+import asyncio
+import time
+
+from app.services.geometry_service import GeometryService
+
+CASES = {
+    "triangle": {"width": 6, "height": 4},
+    "rectangle": {"width": 6, "height": 4},
+    "square": {"side": 5},
+    "circle": {"radius": 3},
+    "cuboid": {"width": 6, "depth": 4, "height": 3, "cross_section": {"points": ["A", "C", "G"]}},
+    "cube": {"side": 4},
+    "prism": {"sides": 6, "radius": 2, "height": 4},
+    "pyramid": {"sides": 4, "radius": 3, "height": 5},
+    "cylinder": {"radius": 2, "height": 4},
+    "cone": {"radius": 2, "height": 4},
+}
+
+# 既定の頂点ラベルを付けて描く
+LABELS = {"show": "true"}
+
+MODES = [
+    ("matplotlib png", "matplotlib", "png"),
+    ("native svg", "native", "svg"),
+    ("native png", "native", "png"),
+]
+
+
+async def measure(service: GeometryService, shape: str, params: dict, renderer: str, fmt: str, seconds: float) -> float:
+    # 初回はフォント読み込みなどを含むため計測から外す
+    res = await service.generate_geometry(shape, params, LABELS, image_format=fmt, renderer=renderer)
+    if not res.success:
+        raise RuntimeError(f"{shape}/{renderer}/{fmt}: {res.error}")
+    count = 0
+    start = time.perf_counter()
+    while time.perf_counter() - start < seconds:
+        await service.generate_geometry(shape, params, LABELS, image_format=fmt, renderer=renderer)
+        count += 1
+    return count / (time.perf_counter() - start)
+
+
+async def run(seconds: float):
+    service = GeometryService()
+    header = f"{'shape':<10}" + "".join(f"{name:>16}" for name, _, _ in MODES) + f"{'speedup(png)':>14}"
+    print("renders/sec (single core)")
+    print(header)
+    for shape, params in CASES.items():
+        rates = [await measure(service, shape, params, renderer, fmt, seconds) for _, renderer, fmt in MODES]
+        row = f"{shape:<10}" + "".join(f"{r:>16.1f}" for r in rates)
+        print(row + f"{rates[2] / rates[0]:>13.1f}x")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--seconds", type=float, default=2.0, help="モードごとの計測時間")
+    args = parser.parse_args()
+    asyncio.run(run(args.seconds))
+
+
+if __name__ == "__main__":
+    main()
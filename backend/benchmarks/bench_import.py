@@ -0,0 +1,84 @@
+"""過去問一括取り込みのベンチマーク
+
+FAKE_LLM_ENABLED の偽クライアントで PDF の書き起こしを模し、インメモリ SQLite（supabase/migrations を適用）に
+ImportService.import_exam_archive_sse で取り込む。1ファイルずつ書き起こして1件ずつ保存する従来のやり方
+（/preview-pdf-content + create_problem と同じ形）と、並列の書き起こし + まとめての保存を、
+1分あたりの取り込み問題数で比べる。
+
+    cd backend && python -m benchmarks.bench_import --files 40
+    # 実際のプロバイダーに近い遅延で測る
+    cd backend && python -m benchmarks.bench_import --files 20 --latency-ms 3000 --tokens-per-second 80
+"""
+import argparse
+import asyncio
+import io
+import logging
+import os
+import time
+
+USER_ID = "bench-user"
+PDF_BYTES = b"%PDF-1.4\n% benchmark placeholder\n" + b"0" * 256 * 1024
+
+
+async def run(args):
+    from starlette.datastructures import UploadFile
+
+    from app.core.database import get_supabase_client
+    from app.services.import_service import ImportService
+
+    db = get_supabase_client()
+    db.table("users").upsert({"id": USER_ID, "school_code": "bench"}).execute()
+    logging.getLogger("app.utils.prompt_loader").setLevel(logging.ERROR)
+    svc = ImportService()
+
+    def make_files(tag: str) -> list[UploadFile]:
+        return [UploadFile(io.BytesIO(PDF_BYTES), filename=f"{tag}-{i}.pdf") for i in range(args.files)]
+
+    async def import_all(tag: str, concurrency: int, batch_size: int) -> tuple[int, float]:
+        start = time.perf_counter()
+        complete = {}
+        async for event in svc.import_exam_archive_sse(
+            USER_ID, make_files(tag), year="2024", exam_session="前期",
+            concurrency=concurrency, batch_size=batch_size,
+        ):
+            if event["event"] == "complete":
+                complete = event["data"]
+        return complete.get("imported", 0), time.perf_counter() - start
+
+    print(
+        f"fake LLM: latency {args.latency_ms:g}±{args.latency_jitter_ms:g} ms, {args.tokens_per_second:g} tokens/s\n"
+        f"{args.files} PDFs\n"
+    )
+    print(f"{'pipeline':<34} {'problems':>9} {'seconds':>8} {'problems/min':>13}")
+    for name, concurrency, batch_size in [
+        ("sequential, row-by-row insert", 1, 1),
+        (f"concurrency {args.concurrency}, batch {args.batch_size}", args.concurrency, args.batch_size),
+    ]:
+        imported, elapsed = await import_all(name, concurrency, batch_size)
+        print(f"{name:<34} {imported:>9} {elapsed:>8.2f} {imported * 60 / elapsed:>13.0f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--files", type=int, default=40)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--batch-size", type=int, default=50)
+    parser.add_argument("--latency-ms", type=float, default=200.0, help="偽LLMの最初のトークンまでの時間")
+    parser.add_argument("--latency-jitter-ms", type=float, default=20.0)
+    parser.add_argument("--tokens-per-second", type=float, default=2000.0)
+    args = parser.parse_args()
+
+    # 設定はアプリの読み込み時に確定するので、先に環境変数で偽LLMとローカルDBを有効にする
+    os.environ.update({
+        "FAKE_LLM_ENABLED": "true",
+        "FAKE_LLM_LATENCY_MS": str(args.latency_ms),
+        "FAKE_LLM_LATENCY_JITTER_MS": str(args.latency_jitter_ms),
+        "FAKE_LLM_TOKENS_PER_SECOND": str(args.tokens_per_second),
+        "STORAGE_BACKEND": "sqlite",
+        "SQLITE_PATH": ":memory:",
+    })
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""JSON エンコードのベンチマーク（1MB あたりの時間）
+
+seed_library と同じ形の問題（会話履歴・check_info・図の base64 つき）を並べた一覧レスポンスと、
+3問生成の complete イベントを、従来の方法（jsonable_encoder + 標準 json の JSONResponse / json.dumps の f 文字列）と
+app.utils.json_codec（orjson、無ければ標準 json）でエンコードして比べる。
+
+    cd backend && python -m benchmarks.bench_json --problems 500 --repeat 10
+"""
+import argparse
+import json
+import random
+import time
+from datetime import datetime, timezone
+
+from fastapi.encoders import jsonable_encoder
+from starlette.responses import JSONResponse
+
+from app.utils import json_codec
+from benchmarks.bench_pdf_booklet import make_figure_base64
+from benchmarks.seed_library import make_problem
+
+
+def make_payload(n: int) -> list[dict]:
+    rng = random.Random(0)
+    images = [make_figure_base64(i) for i in range(8)]
+    now = datetime.now(timezone.utc)
+    return [{"id": i + 1, **make_problem(rng, "bench-teacher-0", images, now)} for i in range(n)]
+
+
+def _parse(body: bytes):
+    return json.loads(body.removeprefix(b"data: "))
+
+
+def measure(fn, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--problems", type=int, default=500, help="一覧レスポンスの問題数")
+    parser.add_argument("--repeat", type=int, default=10)
+    args = parser.parse_args()
+
+    problems = make_payload(args.problems)
+    event = {"event": "complete", "data": {"problems": problems[:3], "total": 3}}
+    cases = {
+        f"/problems ({args.problems} problems)": (
+            lambda: JSONResponse(jsonable_encoder(problems)).body,
+            lambda: json_codec.FastJSONResponse(problems).body,
+        ),
+        "SSE complete (3 problems)": (
+            lambda: f"data: {json.dumps(event, ensure_ascii=False)}\n\n".encode(),
+            lambda: json_codec.sse_event(event),
+        ),
+    }
+
+    print(f"encoder: {'orjson' if json_codec.orjson else 'json (orjson not installed)'}  repeat: {args.repeat} (best)\n")
+    print(f"{'payload':<28} {'MB':>7} {'before ms':>10} {'after ms':>9} {'before ms/MB':>13} {'after ms/MB':>12} {'speedup':>8}")
+    for name, (before, after) in cases.items():
+        mb = len(after()) / (1024 * 1024)
+        assert _parse(before()) == _parse(after())
+        t_before, t_after = measure(before, args.repeat), measure(after, args.repeat)
+        print(
+            f"{name:<28} {mb:>7.2f} {t_before:>10.2f} {t_after:>9.2f} "
+            f"{t_before / mb:>13.2f} {t_after / mb:>12.2f} {t_before / t_after:>7.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""ステージ出力パーサーのマイクロベンチマーク
+
+旧実装（抽出関数ごとに DOTALL 正規表現を毎回走らせる方式）と
+parse_stage_output の1回走査を、連結後の full_content 相当の大きな出力で比較する。
+
+    cd backend && python -m benchmarks.bench_output_parser
+"""
+import argparse
+import re
+import timeit
+
+from app.utils.output_parser import parse_stage_output
+
+
+def _legacy_python_code(text: str) -> str:
+    matches = re.findall(r"```python\s*\n(.*?)```", text, re.DOTALL)
+    return matches[0].strip() if matches else ""
+
+
+def _legacy_problem_text(text: str) -> str:
+    for pattern in [
+        r"【問題文】\s*\n(.*?)(?=【|$)",
+        r"## 問題文\s*\n(.*?)(?=##|$)",
+        r"問題[：:]\s*\n?(.*?)(?=解答|解説|$)",
+    ]:
+        match = re.search(pattern, text, re.DOTALL)
+        if match:
+            return match.group(1).strip()
+    return text.strip()
+
+
+def _legacy_solution_text(text: str) -> str:
+    for pattern in [
+        r"【解答・解説】\s*\n(.*?)$",
+        r"## 解答\s*\n(.*?)$",
+        r"解答[：:]\s*\n?(.*?)$",
+    ]:
+        match = re.search(pattern, text, re.DOTALL)
+        if match:
+            return match.group(1).strip()
+    return ""
+
+
+def legacy_extract(text: str) -> tuple[str, str, str]:
+    return _legacy_problem_text(text), _legacy_solution_text(text), _legacy_python_code(text)
+
+
+def parser_extract(text: str) -> tuple[str, str, str]:
+    parsed = parse_stage_output(text)
+    return parsed.problem_text, parsed.solution_text, parsed.python_code
+
+
+def build_full_content(filler_lines: int, with_headings: bool = True) -> str:
+    """5ステージ分の出力を連結した full_content を合成する"""
+    body = "\n".join(f"直方体ABCD-EFGHにおいて AB={i} cm, 点Pは辺上を毎秒1cmで動く。" for i in range(filler_lines))
+    code = "\n".join(f"ax.plot([{i}, {i + 1}], [0, 1], 'k-')" for i in range(filler_lines))
+    stages = [
+        f"---STAGE1_START---\n【問題テーマ】\n空間図形\n【小問構成】\n{body}\n---STAGE1_END---",
+        f"---STAGE2_START---\n【設定パラメータ】\n{body}\n【検証プログラム】\n```python\nprint(1)\n```\n---STAGE2_END---",
+        f"---STAGE3_START---\n【図形描画コード】\n```python\nfig = plt.figure()\n{code}\n```\n---STAGE3_END---",
+        f"---STAGE4_START---\n{'【問題文】' if with_headings else ''}\n{body}\n---STAGE4_END---",
+        f"---STAGE5_START---\n{'【解答・解説】' if with_headings else ''}\n{body}\n---STAGE5_END---",
+    ]
+    return "".join(f"\n\n--- ステージ{i} ---\n```\n{s}\n```" for i, s in enumerate(stages, 1))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--number", type=int, default=20)
+    args = parser.parse_args()
+
+    print(f"{'case':<28}{'size':>10}{'legacy ms':>12}{'parser ms':>12}{'speedup':>10}")
+    for filler in (20, 200, 1000):
+        for with_headings in (True, False):
+            text = build_full_content(filler, with_headings)
+            results = {}
+            for name, fn in (("legacy", legacy_extract), ("parser", parser_extract)):
+                t = min(timeit.repeat(lambda: fn(text), repeat=args.repeat, number=args.number))
+                results[name] = t / args.number * 1000
+            label = f"filler={filler}" + ("" if with_headings else " (no headings)")
+            size_kb = f"{len(text.encode()) / 1024:.0f} KB"
+            print(
+                f"{label:<28}{size_kb:>10}{results['legacy']:>12.3f}{results['parser']:>12.3f}"
+                f"{results['legacy'] / results['parser']:>9.1f}x"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""問題集PDFのベンチマーク
+
+50問（図つき）の問題集を1回で組み立てる場合と、従来どおり1問ずつ
+generate_pdf を呼ぶ場合の所要時間・出力サイズを比較する。
+
+    cd backend && python -m benchmarks.bench_pdf_booklet --problems 50
+"""
+import argparse
+import asyncio
+import base64
+import io
+import time
+
+from PIL import Image, ImageDraw
+
+from app.services.pdf_service import PDFService
+
+
+def make_figure_base64(seed: int, size: tuple[int, int] = (1200, 900)) -> str:
+    """GeometryService の出力に近い大きさの線画PNGを作る"""
+    img = Image.new("RGB", size, "white")
+    draw = ImageDraw.Draw(img)
+    w, h = size
+    for k in range(12):
+        draw.line([(k * 80 + seed % 40, 100), (w - 100, h - k * 60)], fill="blue", width=3)
+    draw.polygon([(200, h - 150), (w - 200, h - 150), (w // 2, 150)], outline="black", width=4)
+    buf = io.BytesIO()
+    img.save(buf, format="PNG")
+    return base64.b64encode(buf.getvalue()).decode()
+
+
+def make_problems(n: int) -> list[dict]:
+    body = "\n".join(
+        f"({k}) 直方体ABCD-EFGHにおいて、AB=6cm、AD=4cm、AE=8cmである。点Pが辺上を毎秒1cmで動くとき、"
+        "三角錐の体積を求めなさい。" for k in range(1, 4)
+    )
+    return [
+        {
+            "id": i,
+            "content": f"{body}\n\n図のように点Pをとる。",
+            "solution": "\n\n".join(f"({k}) V = 1/3 × S × h より {k * 16} cm³" for k in range(1, 4)),
+            "image_base64": make_figure_base64(i),
+        }
+        for i in range(n)
+    ]
+
+
+async def run(n: int):
+    service = PDFService()
+    problems = make_problems(n)
+
+    start = time.perf_counter()
+    pdf = await service.generate_booklet(problems)
+    booklet_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    total_b64 = 0
+    for p in problems:
+        res = await service.generate_pdf(p["content"], p["image_base64"], p["solution"])
+        total_b64 += len(res.pdf_base64 or "")
+    single_s = time.perf_counter() - start
+
+    print(f"problems: {n}")
+    print(f"booklet  : {booklet_s:8.2f} s  {len(pdf) / 1024:8.0f} KB (1 response, application/pdf)")
+    print(f"per-item : {single_s:8.2f} s  {total_b64 / 1024:8.0f} KB ({n} responses, base64 JSON)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--problems", type=int, default=50)
+    args = parser.parse_args()
+    asyncio.run(run(args.problems))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""Pythonサンドボックスの同時実行ベンチマーク
+
+50件を同時に投入し、スループットと隔離性（各ジョブの出力が他のジョブに混ざらないこと、
+無限ループ・メモリ浪費・巨大出力のジョブが他に影響しないこと）を確認する。
+
+    cd backend && python -m benchmarks.bench_python_sandbox --jobs 50
+"""
+import argparse
+import asyncio
+import time
+
+from app.config.settings import get_settings
+from app.services.python_sandbox import get_python_sandbox
+
+NORMAL = """
+import numpy as np
+x = np.linspace(0, 1, 1000)
+print("job-{i}", round(float((x ** 2).sum()), 3))
+"""
+
+# 静的な事前チェックは通り、実行時の上限（CPU時間・メモリ・出力量）で止まるもの
+ABUSIVE = {
+    "infinite_loop": "x = 0\nwhile x >= 0:\n    x += 1\n",
+    "memory_hog": "blocks = []\nwhile len(blocks) >= 0:\n    blocks.append([0] * (8 * 1024 * 1024))\n",
+    "huge_output": "for i in range(10 ** 6):\n    print('x' * 1000)\n",
+    "raises": "1 / 0\n",
+}
+
+
+async def run(jobs: int, abusive: bool = True):
+    sandbox = get_python_sandbox()
+    await sandbox.start()
+
+    codes = []
+    for i in range(jobs):
+        if abusive and i % 10 == 9:
+            kind = list(ABUSIVE)[(i // 10) % len(ABUSIVE)]
+            codes.append((kind, ABUSIVE[kind]))
+        else:
+            codes.append(("normal", NORMAL.format(i=i)))
+
+    async def timed(code: str):
+        t0 = time.perf_counter()
+        res = await sandbox.run(code)
+        return res, time.perf_counter() - t0
+
+    start = time.perf_counter()
+    timed_results = await asyncio.gather(*(timed(code) for _, code in codes))
+    elapsed = time.perf_counter() - start
+    results = [res for res, _ in timed_results]
+    normal_latency = sorted(t for (kind, _), (_, t) in zip(codes, timed_results) if kind == "normal")
+
+    leaked = 0
+    for i, ((kind, _), res) in enumerate(zip(codes, results)):
+        if kind == "normal":
+            if not res.success or res.stdout.split()[:1] != [f"job-{i}"] or res.stdout.count("job-") != 1:
+                leaked += 1
+                print(f"  unexpected result for job {i}: {res}")
+        else:
+            print(f"  {kind:<14} success={res.success} error={res.error!r} stdout={len(res.stdout)} chars")
+
+    s = get_settings()
+    print(f"jobs: {jobs} (max concurrent {s.sandbox_max_concurrent}, timeout {s.sandbox_timeout_seconds:g}s)")
+    print(f"elapsed: {elapsed:.2f} s  throughput: {jobs / elapsed:.1f} jobs/s")
+    if normal_latency:
+        p50 = normal_latency[len(normal_latency) // 2]
+        print(f"normal job latency: p50 {p50 * 1000:.0f} ms  max {normal_latency[-1] * 1000:.0f} ms")
+    print(f"normal jobs with wrong/missing output: {leaked}")
+    await sandbox.shutdown()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--jobs", type=int, default=50)
+    parser.add_argument("--no-abusive", action="store_true", help="正常なジョブだけを投入する")
+    args = parser.parse_args()
+    asyncio.run(run(args.jobs, abusive=not args.no_abusive))
+
+
+if __name__ == "__main__":
+    main()
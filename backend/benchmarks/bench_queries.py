@@ -0,0 +1,92 @@
+"""データ層のクエリベンチマーク（SQLite のローカル代替で測る）
+
+seed_library で作った問題ライブラリに対して、ProblemService と問題集PDFが発行するクエリ
+（一覧・キーワード検索・check_info での絞り込み・詳細・画像取得・check_info 更新・生成回数の加算・問題集の in 検索）を
+繰り返し実行し、p50/p95 と返した行数を出す。--path を省略すると一時ファイルにライブラリを作ってから測る。
+
+    cd backend && python -m benchmarks.bench_queries --users 3 --problems 2000 --repeat 30
+    cd backend && python -m benchmarks.seed_library --path /tmp/lib.db && python -m benchmarks.bench_queries --path /tmp/lib.db
+"""
+import argparse
+import asyncio
+import os
+import random
+import tempfile
+import time
+
+from benchmarks.bench_e2e import percentile
+
+
+async def run(args, path: str):
+    from app.core.database import get_supabase_client
+    from app.services.problem_service import ProblemService, insert_problems
+
+    db = get_supabase_client()
+    user_id = db.table("users").select("id").order("id").limit(1).single().execute().data["id"]
+    ids = [r["id"] for r in db.table("problems").select("id").eq("user_id", user_id).execute().data]
+    if not ids:
+        raise SystemExit(f"{path} に {user_id} の問題がありません")
+    svc = ProblemService()
+    rng = random.Random(0)
+
+    def booklet():
+        sample = rng.sample(ids, min(50, len(ids)))
+        return db.table("problems").select("id,content,solution,image_base64").in_("id", sample).eq("user_id", user_id).execute().data
+
+    async def sync(fn):
+        return fn()
+
+    queries = {
+        "get_user_problems": lambda: svc.get_user_problems(user_id),
+        "search keyword": lambda: svc.search_problems(user_id, {"keyword": "円錐"}),
+        "search units+year": lambda: svc.search_problems(user_id, {"units": ["空間図形"], "year": "2020"}),
+        "search is_checked": lambda: svc.search_problems(user_id, {"is_checked": True}),
+        "get_problem": lambda: svc.get_problem(rng.choice(ids), user_id),
+        "get_problem_image": lambda: svc.get_problem_image(rng.choice(ids), user_id),
+        "update_check_info": lambda: svc.update_check_info(rng.choice(ids), user_id, {"problem_text_ok": True}),
+        "increment generation": lambda: sync(
+            lambda: insert_problems(db, user_id, [], counter="problem_generation_count")
+        ),
+        "booklet in_ (50 ids)": lambda: sync(booklet),
+    }
+
+    print(f"library: {path}  user: {user_id} ({len(ids)} problems)  repeat: {args.repeat}\n")
+    print(f"{'query':<24} {'rows':>6} {'p50 ms':>9} {'p95 ms':>9}")
+    for name, fn in queries.items():
+        latencies, rows = [], 0
+        for _ in range(args.repeat):
+            t0 = time.perf_counter()
+            result = await fn()
+            latencies.append((time.perf_counter() - t0) * 1000)
+            rows = len(result) if isinstance(result, list) else int(result is not None)
+        latencies.sort()
+        print(f"{name:<24} {rows:>6} {percentile(latencies, 50):>9.2f} {percentile(latencies, 95):>9.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--path", help="seed_library で作った SQLite ファイル（省略時は一時ファイルに作る）")
+    parser.add_argument("--users", type=int, default=3)
+    parser.add_argument("--problems", type=int, default=2000, help="教員1人あたりの問題数（--path 省略時）")
+    parser.add_argument("--repeat", type=int, default=30)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = args.path or os.path.join(tmp, "library.db")
+        # 設定は最初の get_settings() で確定するので、アプリを読み込む前に環境変数で SQLite を選ぶ
+        os.environ.update({"STORAGE_BACKEND": "sqlite", "SQLITE_PATH": path, "STARTUP_WARM_UP": "false"})
+        if not args.path:
+            from app.core.database import DEFAULT_MIGRATIONS_DIR
+            from app.core.sqlite_client import SQLiteClient
+            from benchmarks.seed_library import seed_library
+
+            start = time.perf_counter()
+            db = SQLiteClient(path, DEFAULT_MIGRATIONS_DIR)
+            seed_library(db, args.users, args.problems)
+            db.close()
+            print(f"seeded {args.users} x {args.problems} problems in {time.perf_counter() - start:.1f} s")
+        asyncio.run(run(args, path))
+
+
+if __name__ == "__main__":
+    main()
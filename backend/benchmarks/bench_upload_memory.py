@@ -0,0 +1,134 @@
+"""PDFアップロードのピークメモリのベンチマーク
+
+/preview-pdf-content に複数のPDF（ダミーのバイト列）を送り、サーバー側で確保されたメモリのピークを tracemalloc で測る。
+リクエスト本体は ASGI の receive にチャンクで流し込むため、クライアント側のコピーは計測に含まれない。
+以前の実装（全ファイルを read() して base64 文字列にし、クライアントで再度デコード）とも比べる。
+認証・DB・Gemini は計測用の偽物に差し替える。
+
+    cd backend && python -m benchmarks.bench_upload_memory --files 4 --size-mb 8
+"""
+import argparse
+import asyncio
+import base64
+import os
+import tracemalloc
+
+from fastapi import FastAPI, Request
+
+from app.api.v1 import problems
+from app.config.settings import get_settings
+from app.main import app
+
+BOUNDARY = "benchboundary"
+CHUNK = 64 * 1024
+
+
+class FakeGemini:
+    async def generate_with_pdf(self, prompt: str, pdf_data, model: str = "gemini-2.5-flash") -> str:
+        # 実際の SDK と同じく、生のバイト列が必要
+        data = base64.b64decode(pdf_data) if isinstance(pdf_data, str) else pdf_data
+        return f"{len(data)} bytes"
+
+
+class FakeProblemService:
+    clients = {"gemini": FakeGemini()}
+
+    async def increment_preview_count(self, user_id: str):
+        pass
+
+
+async def fake_require_user(request: Request) -> dict:
+    return {"user_id": "bench"}
+
+
+legacy_app = FastAPI()
+
+
+@legacy_app.post("/api/v1/preview-pdf-content")
+async def legacy_preview_pdf_content(request: Request):
+    """変更前の実装（全ファイルを base64 文字列にしてから順に渡す）"""
+    form = await request.form()
+    files = []
+    for key in form:
+        if key.startswith("file"):
+            data = await form[key].read()
+            files.append(base64.b64encode(data).decode())
+    gemini = FakeGemini()
+    return {"texts": [await gemini.generate_with_pdf("", f) for f in files]}
+
+
+def body_chunks(files: int, size: int):
+    block = os.urandom(CHUNK)
+    for i in range(files):
+        yield (
+            f"--{BOUNDARY}\r\nContent-Disposition: form-data; name=\"file{i}\"; filename=\"p{i}.pdf\"\r\n"
+            "Content-Type: application/pdf\r\n\r\n"
+        ).encode()
+        for _ in range(size // CHUNK):
+            yield block
+        yield b"\r\n"
+    yield f"--{BOUNDARY}--\r\n".encode()
+
+
+async def post(asgi_app, files: int, size: int) -> tuple[int, int]:
+    """(ステータス, ピークメモリ) を返す"""
+    chunks = body_chunks(files, size)
+    total = sum(len(c) for c in body_chunks(files, size))
+    scope = {
+        "type": "http", "http_version": "1.1", "method": "POST", "scheme": "http",
+        "path": "/api/v1/preview-pdf-content", "raw_path": b"/api/v1/preview-pdf-content",
+        "query_string": b"", "root_path": "", "server": ("bench", 80), "client": ("bench", 1),
+        "headers": [
+            (b"host", b"bench"),
+            (b"content-type", f"multipart/form-data; boundary={BOUNDARY}".encode()),
+            (b"content-length", str(total).encode()),
+        ],
+    }
+
+    async def receive():
+        chunk = next(chunks, None)
+        if chunk is None:
+            return {"type": "http.request", "body": b"", "more_body": False}
+        return {"type": "http.request", "body": chunk, "more_body": True}
+
+    status = 0
+
+    async def send(message):
+        nonlocal status
+        if message["type"] == "http.response.start":
+            status = message["status"]
+
+    tracemalloc.start()
+    await asyncio.wait_for(asgi_app(scope, receive, send), timeout=120)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return status, peak
+
+
+async def run(files: int, size: int):
+    problems._require_user = fake_require_user
+    problems._get_problem_service = lambda: FakeProblemService()
+
+    upload_mb = files * size / 1024 / 1024
+    print(f"upload: {files} files x {size / 1024 / 1024:.1f} MB = {upload_mb:.1f} MB")
+    for name, asgi_app in (("legacy (base64 copies)", legacy_app), ("spooled", app)):
+        status, peak = await post(asgi_app, files, size)
+        print(f"{name:<24} status {status}  peak {peak / 1024 / 1024:7.1f} MB  ({peak / (files * size):.2f}x upload)")
+
+    s = get_settings()
+    status, _ = await post(app, 1, (s.upload_max_file_bytes // CHUNK + 1) * CHUNK)
+    print(f"file over UPLOAD_MAX_FILE_BYTES  -> status {status}")
+    status, _ = await post(app, s.upload_max_total_bytes // s.upload_max_file_bytes + 1, s.upload_max_file_bytes)
+    print(f"body over UPLOAD_MAX_TOTAL_BYTES -> status {status}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--files", type=int, default=4)
+    parser.add_argument("--size-mb", type=float, default=8)
+    args = parser.parse_args()
+    asyncio.run(run(args.files, int(args.size_mb * 1024 * 1024) // CHUNK * CHUNK))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""API プロセスの起動時インポート時間のチェック
+
+`python -X importtime -c "import app.main"` を別プロセスで実行し、累計時間の大きいモジュールを表示する。
+合計が予算（IMPORT_TIME_BUDGET_MS）を超えるか、遅延読み込みにしているはずの重いモジュールが
+起動時に読み込まれていれば終了コード1で終わるので、CI のチェックとしても使える。
+
+    cd backend && python -m benchmarks.check_import_time --runs 3 --top 15
+"""
+import argparse
+import os
+import subprocess
+import sys
+
+from app.config.settings import get_settings
+
+# 最初の利用時・ウォームアップで読み込むため、起動時には読み込まれてはいけないもの
+LAZY_MODULES = (
+    "matplotlib",
+    "mpl_toolkits",
+    "numpy",
+    "reportlab",
+    "anthropic",
+    "openai",
+    "google.genai",
+    "supabase",
+)
+
+
+def profile_once() -> dict[str, int]:
+    """モジュール名 → 累計インポート時間 (us)"""
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import app.main"],
+        capture_output=True,
+        text=True,
+        cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+        check=True,
+    )
+    cumulative: dict[str, int] = {}
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cum, name = line.split("|")
+        try:
+            cumulative[name.strip()] = int(cum)
+        except ValueError:
+            continue  # ヘッダー行
+    return cumulative
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=3, help="最小値を採用する試行回数")
+    parser.add_argument("--top", type=int, default=15)
+    parser.add_argument("--budget-ms", type=int, default=get_settings().import_time_budget_ms)
+    args = parser.parse_args()
+
+    runs = [profile_once() for _ in range(args.runs)]
+    best = min(runs, key=lambda r: r.get("app.main", 0))
+    total_ms = best.get("app.main", 0) / 1000
+
+    print(f"{'cumulative ms':>14}  module")
+    for name, us in sorted(best.items(), key=lambda kv: kv[1], reverse=True)[: args.top]:
+        print(f"{us / 1000:14.1f}  {name}")
+
+    failures = []
+    if total_ms > args.budget_ms:
+        failures.append(f"import app.main took {total_ms:.0f} ms (budget {args.budget_ms} ms)")
+    eager = [m for m in LAZY_MODULES if m in best]
+    if eager:
+        failures.append(f"heavy modules imported at startup: {', '.join(eager)}")
+
+    print(f"\nimport app.main: {total_ms:.0f} ms (budget {args.budget_ms} ms)")
+    for f in failures:
+        print(f"FAIL: {f}")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""ベンチマーク用の問題ライブラリを SQLite に作る
+
+supabase/migrations を適用した SQLite ファイルに、教員ごとに数千件の問題（図のPNG・会話履歴・check_info つき）を入れる。
+本番に近い大きさ・分布のデータで、一覧・検索・詳細取得などのクエリを測るために使う（benchmarks/bench_queries.py）。
+書き込み先は常にローカルの SQLite で、Supabase には接続しない。
+
+    cd backend && python -m benchmarks.seed_library --path /tmp/mongene-bench.db --users 5 --problems 2000
+"""
+import argparse
+import os
+import random
+import time
+from datetime import datetime, timedelta, timezone
+
+from app.core.database import DEFAULT_MIGRATIONS_DIR
+from app.core.sqlite_client import SQLiteClient
+from benchmarks.bench_pdf_booklet import make_figure_base64
+
+UNITS = [
+    "正負の数", "文字式", "一次方程式", "比例・反比例", "平面図形", "空間図形", "連立方程式", "一次関数",
+    "図形の性質", "確率", "多項式", "平方根", "二次方程式", "関数y=ax²", "相似", "三平方の定理", "円",
+]
+SHAPES = ["直方体", "三角柱", "正四角錐", "円錐", "立方体", "三角形", "平行四辺形", "台形", "円"]
+SESSIONS = ["前期", "後期", "一般", "推薦"]
+INSERT_BATCH = 200
+
+
+def make_problem(rng: random.Random, user_id: str, images: list[str], created_at: datetime) -> dict:
+    shape, units = rng.choice(SHAPES), rng.sample(UNITS, rng.randint(1, 3))
+    content = "\n".join(
+        f"({k}) {shape}ABCDにおいて、AB={rng.randint(3, 12)}cm、AD={rng.randint(3, 12)}cmである。"
+        f"{rng.choice(['面積', '体積', '長さ', '角度'])}を求めなさい。"
+        for k in range(1, rng.randint(2, 5))
+    )
+    solution = "\n".join(f"({k}) 三平方の定理より、求める値は{rng.randint(2, 99)}である。" for k in range(1, 4))
+    history = []
+    for turn in range(5):
+        history.append({"role": "user", "content": f"ステージ{turn + 1}: {shape}の問題を{units[0]}で作成してください。" * 4})
+        history.append({"role": "assistant", "content": f"{content}\n\n{solution}" if turn == 4 else content})
+    checked = rng.random() < 0.4
+    return {
+        "user_id": user_id,
+        "subject": "math",
+        "prompt": f"{shape}の{units[0]}の問題",
+        "content": content,
+        "solution": solution,
+        "image_base64": rng.choice(images) if rng.random() < 0.8 else None,
+        "conversation_history": history,
+        "check_info": {
+            "problem_text_ok": checked, "solution_ok": checked, "figure_ok": checked,
+            "units": units, "year": str(rng.randint(2015, 2025)), "exam_session": rng.choice(SESSIONS),
+        },
+        "created_at": created_at.isoformat(),
+        "updated_at": created_at.isoformat(),
+    }
+
+
+def seed_library(
+    db: SQLiteClient, users: int = 5, problems_per_user: int = 2000, seed: int = 0, image_variants: int = 16,
+) -> list[str]:
+    """教員 users 人ぶんの問題を入れ、教員IDの一覧を返す"""
+    rng = random.Random(seed)
+    images = [make_figure_base64(i * 7 + seed) for i in range(image_variants)]
+    now = datetime.now(timezone.utc)
+    user_ids = [f"bench-teacher-{u}" for u in range(users)]
+    for u, user_id in enumerate(user_ids):
+        db.table("users").upsert({"id": user_id, "school_code": f"bench-{u:04d}", "email": f"{user_id}@example.com"}).execute()
+        rows = [
+            make_problem(rng, user_id, images, now - timedelta(minutes=problems_per_user - i))
+            for i in range(problems_per_user)
+        ]
+        with db.transaction():
+            for i in range(0, len(rows), INSERT_BATCH):
+                db.table("problems").insert(rows[i:i + INSERT_BATCH]).execute()
+    return user_ids
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--path", required=True, help="作成する SQLite ファイル（既存なら削除して作り直す）")
+    parser.add_argument("--users", type=int, default=5)
+    parser.add_argument("--problems", type=int, default=2000, help="教員1人あたりの問題数")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(args.path + suffix):
+            os.remove(args.path + suffix)
+    start = time.perf_counter()
+    db = SQLiteClient(args.path, DEFAULT_MIGRATIONS_DIR)
+    seed_library(db, args.users, args.problems, args.seed)
+    db.close()
+    size_mb = os.path.getsize(args.path) / (1024 * 1024)
+    print(f"{args.users} users x {args.problems} problems -> {args.path} ({size_mb:.1f} MB, {time.perf_counter() - start:.1f} s)")
+
+
+if __name__ == "__main__":
+    main()
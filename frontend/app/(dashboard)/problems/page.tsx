@@ -372,7 +372,7 @@ export default function ProblemsPage() {
         const mapped: ProblemCardProblem[] = data.map((p) => ({
           id: String(p.id),
           content: p.content ?? "",
-          image_base64: p.image_base64 ?? null,
+          has_image: p.has_image ?? false,
           check_info: p.check_info
             ? {
                 checked:
@@ -427,11 +427,35 @@ export default function ProblemsPage() {
   // Preview handlers
   // =========================================================================
 
-  const handlePreviewCard = useCallback((problem: ProblemCardProblem) => {
-    setPreviewProblem(problem);
-    setPreviewSolution(undefined);
-    setShowPreviewModal(true);
-  }, []);
+  const handlePreviewCard = useCallback(
+    async (problem: ProblemCardProblem) => {
+      setPreviewProblem(problem);
+      setPreviewSolution(undefined);
+      setShowPreviewModal(true);
+      if (!problem.has_image || problem.image_base64) return;
+      // The list omits the full figure; load it from the detail endpoint
+      try {
+        const token = await getToken();
+        const res = await fetch(`${API_CONFIG.API_URL}/problems/${problem.id}`, {
+          headers: {
+            "Content-Type": "application/json",
+            ...(token ? { Authorization: `Bearer ${token}` } : {}),
+          },
+        });
+        if (res.ok) {
+          const data: Problem = await res.json();
+          setPreviewProblem((current) =>
+            current && "id" in current && current.id === problem.id
+              ? { ...current, image_base64: data.image_base64 ?? null }
+              : current,
+          );
+        }
+      } catch (err) {
+        console.error("Failed to fetch problem:", err);
+      }
+    },
+    [getToken],
+  );
 
   const handlePreviewGenerated = useCallback(
     (index: number) => {
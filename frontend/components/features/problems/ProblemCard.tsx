@@ -1,16 +1,57 @@
 "use client";
 
 import { Eye, Trash2, CheckCircle2, Circle } from "lucide-react";
-import { useState } from "react";
+import { useEffect, useState } from "react";
+import { useAuth } from "@clerk/nextjs";
+import { API_CONFIG } from "@/lib/config/api";
 
 export interface ProblemCardProblem {
   id: string;
   content: string;
+  has_image?: boolean;
   image_base64?: string | null;
   check_info?: { checked: boolean } | null;
   created_at: string;
 }
 
+// The list API omits image_base64; fetch the small thumbnail (WebP) only for cards that have a figure.
+function useProblemThumbnail(problemId: string, enabled: boolean): string | null {
+  const { getToken } = useAuth();
+  const [url, setUrl] = useState<string | null>(null);
+
+  useEffect(() => {
+    if (!enabled) return;
+    let objectUrl: string | null = null;
+    let cancelled = false;
+    (async () => {
+      try {
+        const token = await getToken();
+        const res = await fetch(`${API_CONFIG.API_URL}/problems/${problemId}/image?size=thumb`, {
+          headers: {
+            Accept: "image/webp,image/png",
+            ...(token ? { Authorization: `Bearer ${token}` } : {}),
+          },
+        });
+        if (!res.ok || cancelled) return;
+        objectUrl = URL.createObjectURL(await res.blob());
+        if (cancelled) {
+          URL.revokeObjectURL(objectUrl);
+          return;
+        }
+        setUrl(objectUrl);
+      } catch (err) {
+        console.error("Failed to fetch thumbnail:", err);
+      }
+    })();
+    return () => {
+      cancelled = true;
+      if (objectUrl) URL.revokeObjectURL(objectUrl);
+    };
+  }, [problemId, enabled, getToken]);
+
+  return url;
+}
+
 interface ProblemCardProps {
   problem: ProblemCardProblem;
   onPreview: (problem: ProblemCardProblem) => void;
@@ -19,6 +60,7 @@ interface ProblemCardProps {
 
 export default function ProblemCard({ problem, onPreview, onDelete }: ProblemCardProps) {
   const [confirmDelete, setConfirmDelete] = useState(false);
+  const thumbnailUrl = useProblemThumbnail(problem.id, problem.has_image ?? false);
 
   const isChecked = problem.check_info?.checked ?? false;
 
@@ -68,10 +110,10 @@ export default function ProblemCard({ problem, onPreview, onDelete }: ProblemCar
       </div>
 
       {/* Image preview */}
-      {problem.image_base64 && (
+      {thumbnailUrl && (
         <div className="px-4 pb-2">
           <img
-            src={`data:image/png;base64,${problem.image_base64}`}
+            src={thumbnailUrl}
             alt="問題の画像"
             className="max-h-32 rounded-lg border border-gray-100 object-contain"
           />
@@ -22,6 +22,7 @@ export interface Problem {
   content?: string;
   solution?: string;
   image_base64?: string;
+  has_image?: boolean; // list/search responses only (they omit image_base64)
   conversation_history?: Array<{ role: string; content: string }>;
   check_info?: CheckInfo;
   opinion_profile_v2?: OpinionProfileV2;
@@ -0,0 +1,40 @@
+-- =============================================================
+-- 0002_create_problems_batch.sql
+-- Bulk insert of generated / imported problems in one statement,
+-- in the same transaction as the user's quota counter update
+-- =============================================================
+
+-- p_rows: JSON array of {subject, prompt, content, solution, image_base64,
+--         conversation_history, check_info}
+-- p_counter: users column to add p_increment to (NULL: no quota update)
+-- Returns the inserted rows in input order.
+CREATE OR REPLACE FUNCTION create_problems_batch(
+  p_user_id   TEXT,
+  p_rows      JSONB,
+  p_counter   TEXT DEFAULT NULL,
+  p_increment INT  DEFAULT 1
+)
+RETURNS SETOF problems AS $$
+BEGIN
+  IF p_counter IS NOT NULL THEN
+    IF p_counter NOT IN ('problem_generation_count', 'figure_regeneration_count', 'preview_count') THEN
+      RAISE EXCEPTION 'unknown counter: %', p_counter;
+    END IF;
+    EXECUTE format('UPDATE users SET %I = %I + $1 WHERE id = $2', p_counter, p_counter)
+      USING p_increment, p_user_id;
+  END IF;
+
+  RETURN QUERY
+    WITH inserted AS (
+      INSERT INTO problems (user_id, subject, prompt, content, solution, image_base64, conversation_history, check_info)
+      SELECT p_user_id, coalesce(r.subject, 'math'), r.prompt, r.content, r.solution, r.image_base64,
+             coalesce(r.conversation_history, '[]'::jsonb), r.check_info
+      FROM jsonb_to_recordset(p_rows) AS r(
+        subject TEXT, prompt TEXT, content TEXT, solution TEXT, image_base64 TEXT,
+        conversation_history JSONB, check_info JSONB
+      )
+      RETURNING *
+    )
+    SELECT * FROM inserted ORDER BY id;
+END;
+$$ LANGUAGE plpgsql;